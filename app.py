@@ -5,12 +5,16 @@ Flask-based web interface for Code Integrity Detection Engine.
 Provides visual interface for code similarity analysis and plagiarism detection.
 """
 
-from flask import Flask, render_template, request, jsonify, session, send_file, make_response
+from flask import Flask, render_template, request, jsonify, session, send_file, make_response, Response
 from werkzeug.utils import secure_filename
 import os
 import difflib
 from pathlib import Path
 import json
+import tempfile
+import threading
+import time
+import uuid
 from datetime import datetime
 from io import BytesIO
 
@@ -18,17 +22,55 @@ from io import BytesIO
 from code_similarity import CodeSimilarityAnalyzer
 from ast_analyzer import HybridSimilarityAnalyzer
 from report_generator import generate_report
-from batch_comparator import BatchComparator
+from batch_comparator import BatchComparator, CancellationToken
+from batch_export import EXPORT_FORMATS, iter_export
+from fingerprint_store import FingerprintStore
+from segmented_index import SegmentedIndex
+from corpus_matcher import CorpusMatcher, ingest_directory
+from boilerplate import BoilerplateFilter
+from snippet_search import SnippetSearcher
+from time_budget import BUDGET_METRICS
+from result_store import DEFAULT_MAX_BYTES, open_result_store
+from lexers import has_structure, language_for_filename
 
 app = Flask(__name__)
 app.secret_key = 'cide-secret-key-change-in-production'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'py', 'java', 'js', 'cpp', 'c', 'h', 'txt'}
+app.config['FINGERPRINT_DB'] = os.environ.get('CIDE_FINGERPRINT_DB')  # optional SQLite cache
+app.config['INDEX_DIR'] = os.environ.get('CIDE_INDEX_DIR')  # optional corpus index for /search
+app.config['REFERENCE_DIR'] = os.environ.get('CIDE_REFERENCE_DIR')  # files preloaded into the index
+app.config['RESULT_DB'] = os.environ.get('CIDE_RESULT_DB')  # optional SQLite result store
+app.config['RESULT_STORE_BYTES'] = int(os.environ.get('CIDE_RESULT_STORE_BYTES', DEFAULT_MAX_BYTES))
+app.config['BATCH_JOB_TTL'] = float(os.environ.get('CIDE_BATCH_JOB_TTL', 3600))  # seconds finished jobs are kept
+app.config['BATCH_WORKERS'] = int(os.environ.get('CIDE_BATCH_WORKERS', 1))  # language groups scored in parallel
+app.config['COMPARISON_BUDGET'] = float(os.environ['CIDE_COMPARISON_BUDGET']) \
+    if os.environ.get('CIDE_COMPARISON_BUDGET') else None  # seconds per comparison (None: unlimited)
 
 # Create upload folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Shared cache of prepared documents (None when FINGERPRINT_DB is unset)
+fingerprint_store = FingerprintStore(app.config['FINGERPRINT_DB']) if app.config['FINGERPRINT_DB'] else None
+
+# Reference corpus index for /search (None when neither INDEX_DIR nor
+# REFERENCE_DIR is set; a reference directory alone gets a temporary index)
+corpus_index = None
+if app.config['INDEX_DIR'] or app.config['REFERENCE_DIR']:
+    corpus_index = SegmentedIndex(app.config['INDEX_DIR'] or tempfile.mkdtemp(prefix='cide-index-'))
+    if app.config['REFERENCE_DIR']:
+        ingest_directory(corpus_index, app.config['REFERENCE_DIR'])
+snippet_searcher = SnippetSearcher(corpus_index) if corpus_index else None
+
+# Analysis results (the session only keeps their ids), see result_store
+result_store = open_result_store(app.config['RESULT_DB'], app.config['RESULT_STORE_BYTES'])
+
+# Background batch jobs (job id -> state dict), see /batch/jobs; their
+# results live in result_store
+batch_jobs = {}
+batch_jobs_lock = threading.Lock()
+
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -38,17 +80,7 @@ def allowed_file(filename):
 
 def get_file_language(filename):
     """Detect programming language from file extension."""
-    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'txt'
-    language_map = {
-        'py': 'python',
-        'java': 'java',
-        'js': 'javascript',
-        'cpp': 'cpp',
-        'c': 'c',
-        'h': 'c',
-        'txt': 'text'
-    }
-    return language_map.get(ext, 'text')
+    return language_for_filename(filename)
 
 
 def generate_diff_html(code1, code2, filename1='File 1', filename2='File 2'):
@@ -105,13 +137,14 @@ def analyze():
         language = get_file_language(file1.filename)
         
         # Initialize analyzers
-        basic_analyzer = CodeSimilarityAnalyzer()
+        basic_analyzer = CodeSimilarityAnalyzer(store=fingerprint_store)
         
         # Perform analysis based on mode
-        if mode == 'hybrid' and language == 'python':
-            # Use hybrid analyzer for Python
-            hybrid_analyzer = HybridSimilarityAnalyzer()
-            ast_result = hybrid_analyzer.analyze(code1, code2)
+        if mode == 'hybrid' and has_structure(language):
+            # Hybrid analysis: Python ASTs, token streams for other languages
+            hybrid_analyzer = HybridSimilarityAnalyzer(store=fingerprint_store)
+            ast_result = hybrid_analyzer.analyze(code1, code2, language,
+                                                 app.config['COMPARISON_BUDGET'])
             
             result = {
                 'mode': 'hybrid',
@@ -122,13 +155,16 @@ def analyze():
                 'sequence_similarity': ast_result['sequence_similarity'],
                 'feature_similarity': ast_result['feature_similarity'],
                 'identical_structure': ast_result['identical_structure'],
+                'approximate': ast_result['approximate'],
+                'approximate_reasons': ast_result['approximate_reasons'],
                 'features1': ast_result['features1'],
                 'features2': ast_result['features2'],
                 'error': ast_result.get('error')
             }
             
-            # Check for plagiarism
-            plagiarism_result = hybrid_analyzer.detect_plagiarism(code1, code2, threshold=0.75)
+            # Check for plagiarism (from the same analysis, so one request
+            # stays within one COMPARISON_BUDGET)
+            plagiarism_result = hybrid_analyzer.plagiarism_verdict(ast_result, threshold=0.75)
             result['plagiarism'] = {
                 'is_plagiarism': plagiarism_result['is_plagiarism'],
                 'confidence': plagiarism_result['confidence'],
@@ -137,7 +173,8 @@ def analyze():
             }
         else:
             # Use basic analyzer
-            basic_result = basic_analyzer.analyze(code1, code2, mode='basic', language=language)
+            basic_result = basic_analyzer.analyze(code1, code2, mode='basic', language=language,
+                                                  time_budget=app.config['COMPARISON_BUDGET'])
             
             result = {
                 'mode': 'basic',
@@ -145,7 +182,9 @@ def analyze():
                 'similarity_score': basic_result['similarity_score'],
                 'similarity_percentage': basic_result['similarity_percentage'],
                 'code1_length': basic_result['code1_length'],
-                'code2_length': basic_result['code2_length']
+                'code2_length': basic_result['code2_length'],
+                'approximate': basic_result.get('approximate', False),
+                'approximate_reasons': basic_result.get('approximate_reasons', [])
             }
         
         # Generate diff view
@@ -159,8 +198,10 @@ def analyze():
         result['timestamp'] = datetime.now().isoformat()
         result['diff_html'] = diff_html
         
-        # Store analysis result in session for report generation
-        session['last_analysis'] = result
+        # Keep the result server-side for report generation; the session
+        # only carries its id
+        result['result_id'] = result_store.put(result)
+        session['last_analysis_id'] = result['result_id']
         
         return jsonify(result)
     
@@ -176,6 +217,42 @@ def about():
     return render_template('about.html')
 
 
+def read_batch_files():
+    """Read the uploaded batch files from the current request."""
+    files_data = []
+    
+    for key in request.files:
+        if key == 'base_files':
+            continue
+        file = request.files[key]
+        
+        if file.filename == '' or not allowed_file(file.filename):
+            continue
+        
+        content = file.read().decode('utf-8')
+        files_data.append({
+            'name': file.filename,
+            'content': content
+        })
+    
+    return files_data
+
+
+def read_boilerplate():
+    """Starter-code filter from the request's 'base_files' uploads (or None)."""
+    boilerplate = BoilerplateFilter()
+    for file in request.files.getlist('base_files'):
+        if file.filename == '' or not allowed_file(file.filename):
+            continue
+        boilerplate.add_base(file.read().decode('utf-8'), get_file_language(file.filename))
+    return boilerplate if boilerplate else None
+
+
+def read_cross_language():
+    """Whether pairs of files in different languages should be scored ('cross_language' form field)."""
+    return request.form.get('cross_language', 'true').lower() not in ('0', 'false', 'no', 'off')
+
+
 @app.route('/batch', methods=['GET', 'POST'])
 def batch():
     """Batch comparison page and endpoint."""
@@ -184,35 +261,35 @@ def batch():
     
     try:
         # Get uploaded files
-        files_data = []
-        
-        for key in request.files:
-            file = request.files[key]
-            
-            if file.filename == '' or not allowed_file(file.filename):
-                continue
-            
-            content = file.read().decode('utf-8')
-            files_data.append({
-                'name': file.filename,
-                'content': content
-            })
+        files_data = read_batch_files()
         
         if len(files_data) < 2:
             return jsonify({'error': 'At least 2 files are required for batch comparison'}), 400
         
-        # Get mode and language
+        # Get mode and output format (languages are detected per file)
         mode = request.form.get('mode', 'hybrid')
-        language = get_file_language(files_data[0]['name'])
+        cross_language = read_cross_language()
+        export_format = request.form.get('format', 'json')
         
-        # Perform batch comparison
-        comparator = BatchComparator(mode=mode)
-        result = comparator.compare_all_pairs(files_data, language)
+        if export_format != 'json' and export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported format: {export_format}. '
+                                     f'Use json, {", ".join(EXPORT_FORMATS)}.'}), 400
         
-        # Store in session
-        session['last_batch_analysis'] = result
+        # Perform batch comparison (starter code excluded if base files were sent)
+        comparator = BatchComparator(mode=mode, store=fingerprint_store,
+                                     boilerplate=read_boilerplate(),
+                                     pair_budget=app.config['COMPARISON_BUDGET'])
+        batch_result = comparator.compare_mixed(files_data, cross_language=cross_language,
+                                                workers=app.config['BATCH_WORKERS'])
         
-        return jsonify(result)
+        if export_format in EXPORT_FORMATS:
+            # Stream as a chunked download instead of one JSON document
+            response = Response(iter_export(batch_result, export_format),
+                                mimetype=EXPORT_FORMATS[export_format])
+            response.headers['Content-Disposition'] = f'attachment; filename=cide_batch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+            return response
+        
+        return jsonify(batch_result.to_dict())
     
     except UnicodeDecodeError:
         return jsonify({'error': 'Unable to decode files. Please ensure all files are text-based.'}), 400
@@ -220,18 +297,188 @@ def batch():
         return jsonify({'error': f'Batch analysis error: {str(e)}'}), 500
 
 
+def run_batch_job(job, files_data, mode, cross_language=True, boilerplate=None):
+    """Worker thread body for a background batch job."""
+    def on_progress(event):
+        job['progress'] = event
+    
+    try:
+        comparator = BatchComparator(mode=mode, store=fingerprint_store, boilerplate=boilerplate,
+                                     pair_budget=app.config['COMPARISON_BUDGET'])
+        result = comparator.compare_mixed(files_data, cross_language=cross_language,
+                                          workers=app.config['BATCH_WORKERS'],
+                                          progress=on_progress, cancel_token=job['token'])
+        job['result_id'] = result_store.put(result.to_dict())
+        if job['result_id'] is None:
+            job['error'] = ('Batch result is too large to keep '
+                            f"({app.config['RESULT_STORE_BYTES']} bytes at most); "
+                            "use the streaming /batch export (format=csv, jsonl or npy)")
+            job['status'] = 'failed'
+        else:
+            job['status'] = 'cancelled' if result.cancelled else 'done'
+    except Exception as e:
+        job['error'] = f'Batch analysis error: {str(e)}'
+        job['status'] = 'failed'
+    finally:
+        job['finished'] = time.monotonic()
+
+
+def expire_batch_jobs():
+    """Forget jobs that finished more than BATCH_JOB_TTL seconds ago."""
+    cutoff = time.monotonic() - app.config['BATCH_JOB_TTL']
+    with batch_jobs_lock:
+        expired = [job_id for job_id, job in batch_jobs.items()
+                   if job['finished'] is not None and job['finished'] < cutoff]
+        expired = [batch_jobs.pop(job_id) for job_id in expired]
+    for job in expired:
+        if job['result_id']:
+            result_store.delete(job['result_id'])
+
+
+@app.route('/batch/jobs', methods=['POST'])
+def start_batch_job():
+    """Start a batch comparison in the background and return its job id."""
+    try:
+        files_data = read_batch_files()
+        boilerplate = read_boilerplate()
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Unable to decode files. Please ensure all files are text-based.'}), 400
+    
+    if len(files_data) < 2:
+        return jsonify({'error': 'At least 2 files are required for batch comparison'}), 400
+    
+    mode = request.form.get('mode', 'hybrid')
+    cross_language = read_cross_language()
+    
+    expire_batch_jobs()
+    job_id = uuid.uuid4().hex
+    job = {
+        'status': 'running',
+        'token': CancellationToken(),
+        'progress': None,
+        'result_id': None,
+        'error': None,
+        'finished': None
+    }
+    with batch_jobs_lock:
+        batch_jobs[job_id] = job
+    
+    worker = threading.Thread(target=run_batch_job,
+                              args=(job, files_data, mode, cross_language, boilerplate),
+                              daemon=True)
+    worker.start()
+    
+    return jsonify({'job_id': job_id, 'status': job['status']}), 202
+
+
+@app.route('/batch/jobs/<job_id>', methods=['GET', 'DELETE'])
+def batch_job(job_id):
+    """Poll (GET) or cancel (DELETE) a background batch job."""
+    expire_batch_jobs()
+    with batch_jobs_lock:
+        job = batch_jobs.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': f'Unknown batch job: {job_id}'}), 404
+    
+    if request.method == 'DELETE':
+        if job['status'] != 'running':
+            # Finished jobs are forgotten once the client deletes them (or
+            # BATCH_JOB_TTL after they finished)
+            with batch_jobs_lock:
+                batch_jobs.pop(job_id, None)
+            if job['result_id']:
+                result_store.delete(job['result_id'])
+            return jsonify({'job_id': job_id, 'status': job['status']})
+        job['token'].cancel()
+        return jsonify({'job_id': job_id, 'status': 'cancelling'}), 202
+    
+    response = {
+        'job_id': job_id,
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error']
+    }
+    if job['status'] in ('done', 'cancelled'):
+        response['result'] = result_store.get(job['result_id'])
+        if response['result'] is None:
+            response['error'] = 'Batch result is no longer available (evicted from the result store)'
+    
+    return jsonify(response)
+
+
+@app.route('/search/snippet', methods=['POST'])
+def search_snippet():
+    """Find where a code snippet appears in the corpus index."""
+    if snippet_searcher is None:
+        return jsonify({'error': 'No corpus index configured. Set CIDE_INDEX_DIR.'}), 503
+    
+    data = request.get_json(silent=True) or request.form
+    snippet = data.get('snippet', '')
+    if not snippet.strip():
+        return jsonify({'error': 'A code snippet is required'}), 400
+    
+    try:
+        top_k = int(data.get('top_k', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k must be an integer'}), 400
+    
+    try:
+        result = snippet_searcher.search(snippet, top_k=top_k,
+                                         language=data.get('language', 'python'))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': f'Search error: {str(e)}'}), 500
+
+
+@app.route('/search/matches', methods=['POST'])
+def search_matches():
+    """Top-k most similar reference corpus documents for one uploaded file."""
+    if corpus_index is None:
+        return jsonify({'error': 'No corpus index configured. Set CIDE_INDEX_DIR or CIDE_REFERENCE_DIR.'}), 503
+    
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'A file is required'}), 400
+    uploaded = request.files['file']
+    if not allowed_file(uploaded.filename):
+        return jsonify({'error': f'Allowed file types: {", ".join(app.config["ALLOWED_EXTENSIONS"])}'}), 400
+    
+    try:
+        top_k = int(request.form.get('top_k', 10))
+    except ValueError:
+        return jsonify({'error': 'top_k must be an integer'}), 400
+    
+    try:
+        content = uploaded.read().decode('utf-8')
+        matcher = CorpusMatcher(corpus_index, mode=request.form.get('mode', 'hybrid'),
+                                store=fingerprint_store)
+        result = matcher.top_matches(content, top_k=top_k,
+                                     language=get_file_language(uploaded.filename))
+        result['file'] = secure_filename(uploaded.filename)
+        return jsonify(result)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Unable to decode file. Please ensure it is text-based.'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Search error: {str(e)}'}), 500
+
+
 @app.route('/download/report/<format_type>')
 def download_report(format_type):
     """Download analysis report in specified format."""
     try:
-        # Get the last analysis result from session
-        analysis_result = session.get('last_analysis')
+        # The requested result, or the last analysis of this session
+        result_id = request.args.get('result_id') or session.get('last_analysis_id')
+        analysis_result = result_store.get(result_id)
         
         if not analysis_result:
             return jsonify({'error': 'No analysis result available. Please run an analysis first.'}), 400
+        if 'matrix' in analysis_result:
+            # Batch results are exported by /batch itself (its 'format' field)
+            return jsonify({'error': 'Reports are only available for pairwise analyses.'}), 400
         
-        # Remove diff_html from report (too large for downloads)
-        report_data = {k: v for k, v in analysis_result.items() if k != 'diff_html'}
+        # Remove diff_html and the store id from report (too large / internal)
+        report_data = {k: v for k, v in analysis_result.items()
+                       if k not in ('diff_html', 'result_id')}
         
         # Generate report based on format
         if format_type == 'text':
@@ -279,6 +526,16 @@ def health():
     })
 
 
+@app.route('/api/metrics')
+def metrics():
+    """Process-wide counters: time-budget overruns and fingerprint cache use."""
+    return jsonify({
+        'time_budget': {'seconds': app.config['COMPARISON_BUDGET'], **BUDGET_METRICS.snapshot()},
+        'fingerprint_store': fingerprint_store.stats() if fingerprint_store else None,
+        'result_store': result_store.stats()
+    })
+
+
 if __name__ == '__main__':
     print("=" * 70)
     print("🚀 CIDE - Code Integrity Detection Engine")
@@ -7,10 +7,18 @@ resilient to variable renaming, comment changes, and formatting differences.
 
 import ast
 import hashlib
+from array import array
 from typing import Dict, List, Any, Tuple, Optional
 from difflib import SequenceMatcher
 import json
 
+from chunked_matcher import LARGE_INPUT_THRESHOLD, is_large_input, sequence_ratio
+from clone_detector import SubtreeHasher, multiset_similarity, subtree_multiset
+from fingerprint_store import component_version
+import lexers
+from time_budget import TimeBudget, make_budget
+from tree_edit import DEFAULT_MAX_NODES, bounded_distance, edit_units
+
 
 class ASTNormalizer(ast.NodeVisitor):
     """
@@ -28,7 +36,26 @@ class ASTNormalizer(ast.NodeVisitor):
         self.const_map = {}
         self.class_map = {}
         self.structure = []
+        self.lines = []
+        self._current_line = 1
         
+    def visit(self, node):
+        """Visit a node, recording the source line of every structure entry."""
+        # Entries appended so far belong to the enclosing node
+        self._sync_lines()
+        previous = self._current_line
+        self._current_line = getattr(node, 'lineno', previous)
+        result = super().visit(node)
+        self._sync_lines()
+        self._current_line = previous
+        return result
+    
+    def _sync_lines(self):
+        """Give new structure entries the line of the node being visited."""
+        missing = len(self.structure) - len(self.lines)
+        if missing:
+            self.lines.extend([self._current_line] * missing)
+    
     def _get_var_placeholder(self, name: str) -> str:
         """Get or create placeholder for variable name."""
         if name not in self.var_map:
@@ -332,90 +359,295 @@ class ASTStructureAnalyzer:
         return weighted_similarity / total_weight if total_weight > 0 else 0.0
 
 
+# Cached result of HybridSimilarityAnalyzer.prepare_version()
+_PREPARE_VERSION = None
+
+
+class PreparedDocument:
+    """
+    Per-file artefacts of the hybrid analysis: normalized structure,
+    its string form and hash, code features and the statement subtree
+    multiset (sorted hashes with their node counts).
+    """
+    
+    def __init__(self, code: str, structure: Optional[List[Tuple]] = None,
+                 structure_string: str = '', structure_hash: str = '',
+                 features: Optional[Dict[str, int]] = None,
+                 error: Optional[str] = None,
+                 subtree_hashes: Optional[array] = None,
+                 subtree_weights: Optional[array] = None):
+        self.code = code
+        self.structure = structure if structure is not None else []
+        self.structure_string = structure_string
+        self.structure_hash = structure_hash
+        self.features = features if features is not None else {}
+        self.error = error
+        self.subtree_hashes = subtree_hashes if subtree_hashes is not None else array('Q')
+        self.subtree_weights = subtree_weights if subtree_weights is not None else array('I')
+        # Tree edit units, built on first use (see tree_edit.edit_units)
+        self.edit_units = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (without the code itself)."""
+        return {
+            'structure': self.structure,
+            'structure_string': self.structure_string,
+            'structure_hash': self.structure_hash,
+            'features': self.features,
+            'error': self.error,
+            'subtree_hashes': self.subtree_hashes.tolist(),
+            'subtree_weights': self.subtree_weights.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, code: str, data: Dict[str, Any]) -> 'PreparedDocument':
+        """Rebuild a prepared document from to_dict() output."""
+        return cls(
+            code,
+            structure=[_as_tuple(item) for item in data['structure']],
+            structure_string=data['structure_string'],
+            structure_hash=data['structure_hash'],
+            features=data['features'],
+            error=data['error'],
+            subtree_hashes=array('Q', data['subtree_hashes']),
+            subtree_weights=array('I', data['subtree_weights'])
+        )
+
+
+def _as_tuple(value: Any) -> Any:
+    """Turn JSON lists back into the (nested) tuples used by structures."""
+    if isinstance(value, list):
+        return tuple(_as_tuple(item) for item in value)
+    return value
+
+
 class HybridSimilarityAnalyzer:
     """
     Combines AST-based structural analysis with sequence-based text analysis.
     Uses weighted scoring: 70% structure + 30% sequence.
     """
     
-    def __init__(self, structure_weight: float = 0.7, sequence_weight: float = 0.3):
+    STRUCTURE_METRICS = ('sequence', 'subtree', 'tree_edit')
+    
+    def __init__(self, structure_weight: float = 0.7, sequence_weight: float = 0.3,
+                 store=None, structure_metric: str = 'sequence', threshold: float = 0.75,
+                 max_tree_nodes: int = DEFAULT_MAX_NODES,
+                 large_input_threshold: Optional[int] = LARGE_INPUT_THRESHOLD):
         """
         Initialize hybrid analyzer.
         
         Args:
             structure_weight: Weight for structural similarity (default: 0.7)
             sequence_weight: Weight for sequence similarity (default: 0.3)
+            store: Optional FingerprintStore caching prepared documents
+            structure_metric: 'sequence' matches the linear structure
+                strings; 'subtree' uses the weighted Jaccard of the subtree
+                multisets instead, which ignores reordered functions and
+                statements and skips the structure SequenceMatcher;
+                'tree_edit' uses a per-function tree edit distance (a
+                precise but costly confirm-stage option)
+            threshold: Weighted score of interest in 'tree_edit' mode; the
+                edit distance stops once the pair cannot reach it
+            max_tree_nodes: In 'tree_edit' mode, pairs with a function (or
+                module remainder) larger than this use the sequence score
+            large_input_threshold: Combined length (characters) above which
+                the code and structure strings of a pair are compared in
+                content-defined chunks (see chunked_matcher); None never
+                chunks
         """
+        if structure_metric not in self.STRUCTURE_METRICS:
+            raise ValueError(f'Unknown structure metric: {structure_metric}')
         self.structure_weight = structure_weight
         self.sequence_weight = sequence_weight
+        self.structure_metric = structure_metric
+        self.threshold = threshold
+        self.max_tree_nodes = max_tree_nodes
+        self.large_input_threshold = large_input_threshold
         self.ast_analyzer = ASTStructureAnalyzer()
+        self.store = store
     
-    def analyze(self, code1: str, code2: str, language: str = 'python') -> Dict[str, Any]:
+    def prepare_version(self) -> str:
+        """
+        Version of the preparation pipeline used to key cached documents.
+        
+        Derived from the source of every component that shapes a prepared
+        document, so editing any of them invalidates the cache.
+        """
+        global _PREPARE_VERSION
+        if _PREPARE_VERSION is None:
+            _PREPARE_VERSION = component_version(
+                ASTNormalizer, ASTStructureAnalyzer, PreparedDocument,
+                HybridSimilarityAnalyzer._prepare_uncached, SubtreeHasher, subtree_multiset,
+                lexers
+            )
+        return _PREPARE_VERSION
+    
+    def prepare(self, code: str, language: str = 'python') -> 'PreparedDocument':
+        """
+        Run the per-file half of the analysis (parse, normalize, features).
+        
+        The result only depends on one file, so batch callers prepare each
+        file once and reuse it for every pair it takes part in. With a
+        fingerprint store, files seen in earlier runs are not re-parsed.
+        
+        Args:
+            code: Source code string
+            language: 'python' is parsed into an AST; languages with a
+                registered lexer (see lexers) are normalized from tokens
+        
+        Returns:
+            PreparedDocument (with ``error`` set if parsing failed)
+        """
+        if self.store is None:
+            return self._prepare_uncached(code, language)
+        
+        version = self.prepare_version()
+        namespace = 'hybrid' if language == 'python' else f"hybrid:{language}"
+        cached = self.store.get(namespace, version, code)
+        if cached is not None:
+            return PreparedDocument.from_dict(code, cached)
+        
+        doc = self._prepare_uncached(code, language)
+        self.store.put(namespace, version, code, doc.to_dict())
+        return doc
+    
+    def _prepare_uncached(self, code: str, language: str = 'python') -> 'PreparedDocument':
+        """Parse, normalize and extract features without consulting the store."""
+        if language != 'python':
+            lexer = lexers.get_lexer(language)
+            if lexer is None:
+                return PreparedDocument(code, error='unsupported_language')
+            structure, _ = lexer.normalize(code)
+            return PreparedDocument(
+                code,
+                structure=structure,
+                structure_string=self.ast_analyzer.structure_to_string(structure),
+                structure_hash=self.ast_analyzer.get_structure_hash(structure),
+                features=lexer.features(structure)
+            )
+        
+        tree = self.ast_analyzer.parse_python(code)
+        if tree is None:
+            return PreparedDocument(code, error='parse_failed')
+        
+        structure, _ = self.ast_analyzer.normalize_ast(tree)
+        features = self.ast_analyzer.analyze_code_features(tree)
+        subtree_hashes, subtree_weights = subtree_multiset(tree)
+        return PreparedDocument(
+            code,
+            structure=structure,
+            structure_string=self.ast_analyzer.structure_to_string(structure),
+            structure_hash=self.ast_analyzer.get_structure_hash(structure),
+            features=features,
+            subtree_hashes=subtree_hashes,
+            subtree_weights=subtree_weights
+        )
+    
+    def analyze(self, code1: str, code2: str, language: str = 'python',
+                time_budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Perform hybrid analysis on two code samples.
         
         Args:
             code1: First code string
             code2: Second code string
-            language: Programming language (currently only 'python' supported)
+            language: 'python' or a language with a registered lexer
+            time_budget: Optional seconds allowed for the whole analysis;
+                stages reached after it is spent use cheaper engines or
+                bounds (see compare_prepared)
             
         Returns:
             Dictionary with detailed similarity metrics
         """
-        result = {
-            'language': language,
-            'structure_similarity': 0.0,
-            'sequence_similarity': 0.0,
-            'feature_similarity': 0.0,
-            'weighted_score': 0.0,
-            'weighted_percentage': '0.0%',
-            'identical_structure': False,
-            'features1': {},
-            'features2': {},
-            'structure1': [],
-            'structure2': [],
-            'error': None
-        }
+        budget = make_budget(time_budget)
+        try:
+            doc1 = self.prepare(code1, language)
+            doc2 = self.prepare(code2, language)
+        except Exception as e:
+            result = self._empty_result(language)
+            result['error'] = str(e)
+            return result
+        
+        result = self.compare_prepared(doc1, doc2, language, budget)
+        if budget is not None:
+            budget.finish()
+        return result
+    
+    def compare_prepared(self, doc1: 'PreparedDocument', doc2: 'PreparedDocument',
+                         language: str = 'python',
+                         budget: Optional[TimeBudget] = None) -> Dict[str, Any]:
+        """
+        Perform the pairwise half of the hybrid analysis on prepared documents.
+        
+        Args:
+            doc1: First prepared document
+            doc2: Second prepared document
+            language: Programming language of both documents
+            budget: Optional TimeBudget checked between stages; once it is
+                spent, sequence matching falls back to its quick_ratio()
+                upper bound, the tree edit distance is skipped and Python
+                structure is scored by the subtree multiset, and the result
+                is marked 'approximate' with the reasons
+        
+        Returns:
+            Dictionary with detailed similarity metrics (same shape as analyze);
+            the 'subtree' and 'tree_edit' metrics need Python ASTs, so other
+            languages always use the 'sequence' structure score
+        """
+        result = self._empty_result(language)
         
         try:
-            # Parse both code samples
-            tree1 = self.ast_analyzer.parse_python(code1)
-            tree2 = self.ast_analyzer.parse_python(code2)
-            
-            if tree1 is None or tree2 is None:
+            if doc1.error or doc2.error:
                 result['error'] = 'Failed to parse one or both code samples'
                 return result
             
-            # Normalize ASTs
-            struct1, mappings1 = self.ast_analyzer.normalize_ast(tree1)
-            struct2, mappings2 = self.ast_analyzer.normalize_ast(tree2)
+            result['structure1'] = doc1.structure
+            result['structure2'] = doc2.structure
+            
+            # Order-insensitive subtree multiset overlap (one linear merge)
+            subtree_similarity, subtree_containment = multiset_similarity(
+                doc1.subtree_hashes, doc1.subtree_weights,
+                doc2.subtree_hashes, doc2.subtree_weights)
+            result['subtree_similarity'] = subtree_similarity
+            result['subtree_containment'] = subtree_containment
             
-            result['structure1'] = struct1
-            result['structure2'] = struct2
+            # Compute sequence similarity (basic text comparison)
+            threshold = self.large_input_threshold
+            result['large_input'] = (threshold is not None and
+                                     is_large_input(doc1.code, doc2.code, threshold))
+            sequence_similarity = sequence_ratio(doc1.code, doc2.code, threshold, budget)
+            result['sequence_similarity'] = sequence_similarity
             
             # Compute structural similarity
-            structure_similarity = self.ast_analyzer.compute_structure_similarity(struct1, struct2)
+            structure_similarity = None
+            if language == 'python' and self.structure_metric == 'subtree':
+                structure_similarity = subtree_similarity
+            elif language == 'python' and self.structure_metric == 'tree_edit':
+                if budget is not None and budget.expired:
+                    budget.degrade('structure_similarity', 'tree edit distance skipped')
+                else:
+                    structure_similarity = self._tree_edit_similarity(doc1, doc2,
+                                                                      sequence_similarity, result)
+            if structure_similarity is None and language == 'python' and \
+                    budget is not None and budget.expired:
+                budget.degrade('structure_similarity', 'subtree multiset score')
+                structure_similarity = subtree_similarity
+            if structure_similarity is None:
+                structure_similarity = sequence_ratio(doc1.structure_string, doc2.structure_string,
+                                                      threshold, budget, 'structure_similarity')
             result['structure_similarity'] = structure_similarity
             
             # Check if structures are identical
-            hash1 = self.ast_analyzer.get_structure_hash(struct1)
-            hash2 = self.ast_analyzer.get_structure_hash(struct2)
-            result['identical_structure'] = (hash1 == hash2)
+            result['identical_structure'] = (doc1.structure_hash == doc2.structure_hash)
             
-            # Extract and compare features
-            features1 = self.ast_analyzer.analyze_code_features(tree1)
-            features2 = self.ast_analyzer.analyze_code_features(tree2)
-            result['features1'] = features1
-            result['features2'] = features2
+            # Compare features
+            result['features1'] = doc1.features
+            result['features2'] = doc2.features
             
-            feature_similarity = self.ast_analyzer.compute_feature_similarity(features1, features2)
+            feature_similarity = self.ast_analyzer.compute_feature_similarity(
+                doc1.features, doc2.features)
             result['feature_similarity'] = feature_similarity
             
-            # Compute sequence similarity (basic text comparison)
-            matcher = SequenceMatcher(None, code1, code2)
-            sequence_similarity = matcher.ratio()
-            result['sequence_similarity'] = sequence_similarity
-            
             # Calculate weighted score
             weighted_score = (
                 structure_similarity * self.structure_weight +
@@ -427,10 +659,89 @@ class HybridSimilarityAnalyzer:
         except Exception as e:
             result['error'] = str(e)
         
+        if budget is not None:
+            budget.annotate(result)
         return result
     
+    def align_functions(self, code1: str, code2: str, min_score: float = 0.5) -> Dict[str, Any]:
+        """
+        Match the functions, methods and classes of two files one-to-one.
+        
+        Args:
+            code1: First code string
+            code2: Second code string
+            min_score: Unit pairs scoring below this are left unmatched
+        
+        Returns:
+            Dictionary with per-unit 'pairs' and scores, unmatched units and
+            coverage (see function_alignment.align_units); 'error' is set if
+            either file does not parse
+        """
+        from function_alignment import align_units, extract_units
+        
+        units1 = extract_units(code1)
+        units2 = extract_units(code2)
+        if units1 is None or units2 is None:
+            return {'pairs': [], 'unmatched1': [], 'unmatched2': [], 'coverage1': 0.0,
+                    'coverage2': 0.0, 'comparisons': {'hash_matches': 0, 'pruned': 0, 'scored': 0},
+                    'error': 'Failed to parse one or both code samples'}
+        result = align_units(units1, units2, self.structure_weight, self.sequence_weight, min_score)
+        result['error'] = None
+        return result
+    
+    def _tree_edit_similarity(self, doc1: 'PreparedDocument', doc2: 'PreparedDocument',
+                              sequence_similarity: float, result: Dict[str, Any]) -> Optional[float]:
+        """
+        Structure similarity from the bounded tree edit distance.
+        
+        The distance budget is the largest distance that still lets the
+        weighted score reach the threshold given the sequence similarity.
+        When the budget is exceeded, the returned value is an upper bound of
+        the true similarity (already too low to reach the threshold).
+        
+        Returns:
+            Similarity, or None when the trees exceed max_tree_nodes
+        """
+        units1, units2 = edit_units(doc1), edit_units(doc2)
+        if units1 is None or units2 is None:
+            return None
+        nodes = max(units1.node_count, units2.node_count)
+        needed = (self.threshold - sequence_similarity * self.sequence_weight) / self.structure_weight
+        bound = None if needed <= 0 else max(int((1 - needed) * nodes), 0)
+        
+        outcome = bounded_distance(units1, units2, bound, self.max_tree_nodes)
+        result['tree_edit_status'] = outcome['status']
+        result['tree_edit_distance'] = outcome['distance']
+        if outcome['status'] == 'too_large':
+            return None
+        return max(0.0, 1.0 - outcome['distance'] / nodes) if nodes else 1.0
+    
+    @staticmethod
+    def _empty_result(language: str) -> Dict[str, Any]:
+        """Result skeleton shared by analyze and compare_prepared."""
+        return {
+            'language': language,
+            'structure_similarity': 0.0,
+            'sequence_similarity': 0.0,
+            'feature_similarity': 0.0,
+            'subtree_similarity': 0.0,
+            'subtree_containment': 0.0,
+            'weighted_score': 0.0,
+            'weighted_percentage': '0.0%',
+            'identical_structure': False,
+            'large_input': False,
+            'approximate': False,
+            'approximate_reasons': [],
+            'features1': {},
+            'features2': {},
+            'structure1': [],
+            'structure2': [],
+            'error': None
+        }
+    
     def detect_plagiarism(self, code1: str, code2: str, 
-                         threshold: float = 0.75) -> Dict[str, Any]:
+                         threshold: float = 0.75, language: str = 'python',
+                         time_budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Detect potential plagiarism between two code samples.
         
@@ -438,12 +749,25 @@ class HybridSimilarityAnalyzer:
             code1: First code string
             code2: Second code string
             threshold: Similarity threshold for plagiarism detection (default: 0.75)
+            language: Programming language of both samples
+            time_budget: Optional seconds allowed for the analysis (see analyze)
             
         Returns:
             Dictionary with plagiarism detection results
         """
-        analysis = self.analyze(code1, code2)
+        return self.plagiarism_verdict(self.analyze(code1, code2, language, time_budget), threshold)
+    
+    def plagiarism_verdict(self, analysis: Dict[str, Any], threshold: float = 0.75) -> Dict[str, Any]:
+        """
+        Plagiarism verdict for an existing analyze() result.
+        
+        Args:
+            analysis: Result of analyze()
+            threshold: Similarity threshold for plagiarism detection (default: 0.75)
         
+        Returns:
+            Dictionary with plagiarism detection results (as detect_plagiarism)
+        """
         is_plagiarism = analysis['weighted_score'] >= threshold
         confidence = analysis['weighted_score']
         
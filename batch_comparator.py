@@ -4,124 +4,865 @@ Batch Comparison Module
 Process multiple code files and generate comparison matrices.
 """
 
-from typing import List, Dict, Any
+import hashlib
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Iterator, MutableSequence, Optional, Sequence, Tuple
+from chunked_matcher import LARGE_INPUT_THRESHOLD
 from code_similarity import CodeSimilarityAnalyzer
 from ast_analyzer import HybridSimilarityAnalyzer
+from batch_result import BatchResult
+from fragment_miner import FragmentMiner, FragmentPruner
+from function_alignment import FunctionIndex
+from lexers import has_structure, language_for_filename
+from time_budget import TimeBudget, make_budget
 import itertools
 
 
+# Shard partial-result file format (all little-endian):
+#   header: magic, file count, shard index, shard count, flags, pair count,
+#           SHA-256 digest of the batch (mode, language, names, contents)
+#   body:   uint32 i[], uint32 j[], float64 similarity[],
+#           float64 structure_similarity[], uint8 identical_structure[]
+SHARD_MAGIC = b'CIDESHD2'
+SHARD_HEADER = struct.Struct('<8sIIIIQQ32s')
+SHARD_FLAG_HYBRID = 1
+
+
+def pair_cost(size1: int, size2: int) -> int:
+    """
+    Estimate the relative cost of comparing two files.
+    
+    SequenceMatcher work grows with the product of the input lengths, so the
+    product (plus one to keep empty files from being free) is the estimate.
+    """
+    return (size1 + 1) * (size2 + 1)
+
+
+def shard_pairs(sizes: List[int], shard_index: int, shard_count: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield the (i, j) pairs of the upper triangle that belong to one shard.
+    
+    Pairs are walked in row-major order and cut into ``shard_count``
+    contiguous runs of roughly equal estimated cost; a pair belongs to the
+    shard its cost midpoint falls into. The partition depends only on the
+    file sizes, so every machine computes the same one independently. Row
+    totals come from suffix sums of the sizes, so only the rows that
+    overlap the shard are walked pair by pair.
+    
+    Args:
+        sizes: Per-file sizes (e.g. character counts)
+        shard_index: Zero-based index of the shard to yield
+        shard_count: Total number of shards
+    
+    Yields:
+        (i, j) index pairs with i < j
+    """
+    if shard_count < 1:
+        raise ValueError('shard_count must be at least 1')
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f'shard_index must be in [0, {shard_count})')
+    
+    n = len(sizes)
+    # pair_cost factorizes, so row i costs (sizes[i] + 1) * suffix[i + 1]
+    suffix = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + sizes[i] + 1
+    row_costs = [(sizes[i] + 1) * suffix[i + 1] for i in range(n)]
+    total = sum(row_costs)
+    
+    def owner(position: float) -> int:
+        return min(int(position * shard_count / total), shard_count - 1) if total else 0
+    
+    # Owners grow with the position, so only rows overlapping the shard are walked
+    cumulative = 0
+    for i in range(n):
+        if owner(cumulative) > shard_index:
+            break
+        if owner(cumulative + row_costs[i]) < shard_index:
+            cumulative += row_costs[i]
+            continue
+        for j in range(i + 1, n):
+            cost = pair_cost(sizes[i], sizes[j])
+            midpoint = cumulative + cost / 2
+            cumulative += cost
+            if owner(midpoint) == shard_index:
+                yield i, j
+
+
+def shard_filename(shard_index: int, shard_count: int) -> str:
+    """File name used for one shard's partial result in the shared directory."""
+    return f"shard-{shard_index:04d}-of-{shard_count:04d}.cide"
+
+
+def _little_endian(values: array) -> array:
+    """Return a copy of ``values`` in little-endian byte order."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def write_shard(path: str, file_count: int, shard_index: int, shard_count: int,
+                digest: bytes, hybrid: bool, pairs: List[Tuple[int, int, float, float, bool]],
+                approximate: int = 0) -> None:
+    """
+    Write a shard partial result atomically (temp file + rename).
+    
+    Args:
+        path: Destination file path
+        file_count: Number of files in the whole batch
+        shard_index: Zero-based shard index
+        shard_count: Total number of shards
+        digest: Batch digest (see BatchComparator.batch_digest)
+        hybrid: Whether structure scores were computed
+        pairs: (i, j, similarity, structure_similarity, identical_structure) tuples
+        approximate: Number of pairs scored with cheaper bounds (see pair_budget)
+    """
+    header = SHARD_HEADER.pack(SHARD_MAGIC, file_count, shard_index, shard_count,
+                               SHARD_FLAG_HYBRID if hybrid else 0, len(pairs), approximate,
+                               digest)
+    
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        _little_endian(array('I', (p[0] for p in pairs))).tofile(f)
+        _little_endian(array('I', (p[1] for p in pairs))).tofile(f)
+        _little_endian(array('d', (p[2] for p in pairs))).tofile(f)
+        _little_endian(array('d', (p[3] for p in pairs))).tofile(f)
+        array('B', (1 if p[4] else 0 for p in pairs)).tofile(f)
+    os.replace(tmp_path, path)
+
+
+def read_shard(path: str) -> Dict[str, Any]:
+    """
+    Read a shard partial result written by write_shard.
+    
+    Args:
+        path: Shard file path
+    
+    Returns:
+        Dictionary with the header fields (including the 'approximate' pair
+        count) and a 'pairs' list of
+        (i, j, similarity, structure_similarity, identical_structure) tuples
+    """
+    with open(path, 'rb') as f:
+        raw = f.read(SHARD_HEADER.size)
+        if len(raw) != SHARD_HEADER.size:
+            raise ValueError(f'Truncated shard file: {path}')
+        (magic, file_count, shard_index, shard_count, flags, count, approximate,
+         digest) = SHARD_HEADER.unpack(raw)
+        if magic != SHARD_MAGIC:
+            raise ValueError(f'Not a CIDE shard file: {path}')
+        
+        columns = []
+        for typecode in ('I', 'I', 'd', 'd', 'B'):
+            column = array(typecode)
+            try:
+                column.fromfile(f, count)
+            except EOFError:
+                raise ValueError(f'Truncated shard file: {path}')
+            columns.append(_little_endian(column))
+    
+    return {
+        'file_count': file_count,
+        'shard_index': shard_index,
+        'shard_count': shard_count,
+        'hybrid': bool(flags & SHARD_FLAG_HYBRID),
+        'approximate': approximate,
+        'digest': digest,
+        'pairs': [(i, j, sim, struct_sim, bool(ident))
+                  for i, j, sim, struct_sim, ident in zip(*columns)]
+    }
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag for long batch runs.
+    
+    Call cancel() from any thread; the comparator checks the token between
+    chunks of work and returns the pairs completed so far.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._event.is_set()
+
+
+class ProgressReporter:
+    """
+    Builds progress events and hands them to a callback.
+    
+    Events are plain dictionaries with the keys: stage ('prepare',
+    'compare', 'aggregate', 'done' or 'cancelled'), files_prepared,
+    files_total, pairs_done, pairs_pruned, pairs_approximate (pairs whose
+    time budget ran out), pairs_total, elapsed_seconds, pairs_per_second and
+    eta_seconds (None until a rate is known).
+    """
+    
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]],
+                 files_total: int, pairs_total: int):
+        self.callback = callback
+        self.files_total = files_total
+        self.pairs_total = pairs_total
+        self.files_prepared = 0
+        self.pairs_done = 0
+        self.pairs_pruned = 0
+        self.pairs_approximate = 0
+        self.stage = 'prepare'
+        self.started = time.monotonic()
+        self.compare_started = None
+    
+    def set_stage(self, stage: str) -> None:
+        """Switch to a new stage and report it."""
+        self.stage = stage
+        if stage == 'compare' and self.compare_started is None:
+            self.compare_started = time.monotonic()
+        self.report()
+    
+    def event(self) -> Dict[str, Any]:
+        """Snapshot of the current progress."""
+        now = time.monotonic()
+        rate = None
+        eta = None
+        if self.compare_started is not None:
+            compare_elapsed = now - self.compare_started
+            handled = self.pairs_done + self.pairs_pruned
+            if compare_elapsed > 0 and handled:
+                rate = handled / compare_elapsed
+                eta = (self.pairs_total - handled) / rate
+        
+        return {
+            'stage': self.stage,
+            'files_prepared': self.files_prepared,
+            'files_total': self.files_total,
+            'pairs_done': self.pairs_done,
+            'pairs_pruned': self.pairs_pruned,
+            'pairs_approximate': self.pairs_approximate,
+            'pairs_total': self.pairs_total,
+            'elapsed_seconds': now - self.started,
+            'pairs_per_second': rate,
+            'eta_seconds': eta
+        }
+    
+    def report(self) -> None:
+        """Send the current progress to the callback, if any."""
+        if self.callback is not None:
+            self.callback(self.event())
+
+
 class BatchComparator:
     """Compare multiple code files against each other."""
     
-    def __init__(self, mode='hybrid'):
+    # Pairs compared between two progress reports / cancellation checks
+    CHUNK_SIZE = 256
+    
+    def __init__(self, mode='hybrid', store=None, boilerplate=None, pruner=None,
+                 structure_metric='sequence', large_input_threshold=LARGE_INPUT_THRESHOLD,
+                 pair_budget=None):
+        """
+        Initialize batch comparator.
+        
+        Args:
+            mode: Analysis mode ('basic' or 'hybrid')
+            store: Optional FingerprintStore shared by both analyzers, so
+                files seen in earlier runs are not prepared again
+            boilerplate: Optional BoilerplateFilter; starter code is
+                stripped from every file before it is prepared
+            pruner: Optional CandidatePruner (or FragmentPruner);
+                compare_all_pairs then only scores pairs sharing uncommon
+                fingerprints (or shared fragments) and leaves the others
+                out of the result (similarity 0.0)
+            structure_metric: Hybrid structure score: 'sequence', the
+                order-insensitive 'subtree' or the bounded 'tree_edit'
+                (see HybridSimilarityAnalyzer)
+            large_input_threshold: Combined length (characters) above which
+                a pair is compared in content-defined chunks, so a huge
+                generated or vendored file does not stall the batch (see
+                chunked_matcher); None never chunks
+            pair_budget: Optional seconds allowed per pair; pairs that run
+                out fall back to cheaper bounds (see time_budget) and are
+                counted in the result's 'approximate_pairs'
+        """
         self.mode = mode
-        self.basic_analyzer = CodeSimilarityAnalyzer()
-        self.hybrid_analyzer = HybridSimilarityAnalyzer()
+        self.store = store
+        self.boilerplate = boilerplate
+        self.pruner = pruner
+        self.large_input_threshold = large_input_threshold
+        self.pair_budget = pair_budget
+        self.basic_analyzer = CodeSimilarityAnalyzer(store=store,
+                                                     large_input_threshold=large_input_threshold)
+        self.hybrid_analyzer = HybridSimilarityAnalyzer(store=store,
+                                                        structure_metric=structure_metric,
+                                                        large_input_threshold=large_input_threshold)
+    
+    def _uses_hybrid(self, language: str) -> bool:
+        """Whether pairs in this language go through the hybrid analyzer."""
+        return self.mode == 'hybrid' and has_structure(language)
     
-    def compare_all_pairs(self, files: List[Dict[str, str]], language='python') -> Dict[str, Any]:
+    def strip_boilerplate(self, content: str, language='python') -> Tuple[str, float]:
         """
-        Compare all file pairs and generate a comparison matrix.
+        Remove registered starter code from a file.
+        
+        Returns:
+            (remaining content, fraction of non-blank lines excluded)
+        """
+        if not self.boilerplate:
+            return content, 0.0
+        stripped = self.boilerplate.strip(content, language)
+        return stripped['code'], stripped['excluded_fraction']
+    
+    def prepare_document(self, content: str, language='python') -> Any:
+        """
+        Prepare one file for pairwise scoring.
+        
+        Args:
+            content: File content
+            language: Programming language of the file
+        
+        Returns:
+            PreparedDocument in hybrid mode, preprocessed text in basic mode
+        """
+        content, _ = self.strip_boilerplate(content, language)
+        return self.prepare_stripped(content, language)
+    
+    def prepare_stripped(self, content: str, language: str) -> Any:
+        """Prepare content already passed through strip_boilerplate."""
+        if self._uses_hybrid(language):
+            return self.hybrid_analyzer.prepare(content, language)
+        return self.basic_analyzer.preprocess(content, language)
+    
+    def prepare_documents(self, files: List[Dict[str, str]], language='python',
+                          indices: Optional[Iterable[int]] = None,
+                          reporter: Optional[ProgressReporter] = None,
+                          cancel_token: Optional[CancellationToken] = None,
+                          excluded: Optional[MutableSequence[float]] = None,
+                          stripped: Optional[MutableSequence[str]] = None) -> Dict[int, Any]:
+        """
+        Run the per-file part of the analysis once for each file.
         
         Args:
             files: List of dicts with 'name' and 'content' keys
             language: Programming language of the files
+            indices: Only prepare these file indices (default: all)
+            reporter: Optional progress reporter updated per file
+            cancel_token: Optional token; preparation stops early when set
+            excluded: Optional sequence receiving each file's excluded
+                boilerplate fraction at its index
+            stripped: Optional sequence receiving each file's content
+                without boilerplate at its index
+        
+        Returns:
+            Mapping of file index to prepared document (a PreparedDocument in
+            hybrid mode, the preprocessed text in basic mode)
+        """
+        if indices is None:
+            indices = range(len(files))
+        
+        prepared = {}
+        for count, idx in enumerate(indices, 1):
+            if cancel_token is not None and cancel_token.cancelled:
+                break
+            content, fraction = self.strip_boilerplate(files[idx]['content'], language)
+            prepared[idx] = self.prepare_stripped(content, language)
+            if excluded is not None:
+                excluded[idx] = fraction
+            if stripped is not None:
+                stripped[idx] = content
             
+            if reporter is not None:
+                reporter.files_prepared = count
+                if count % self.CHUNK_SIZE == 0:
+                    reporter.report()
+        return prepared
+    
+    def _score_pairs(self, pairs: Iterable[Tuple[int, int]], prepared: Dict[int, Any],
+                     language: str, sink: Callable[..., None], reporter: ProgressReporter,
+                     cancel_token: Optional[CancellationToken]) -> bool:
+        """
+        Score pairs chunk by chunk, reporting progress and honouring cancellation.
+        
+        Args:
+            pairs: (i, j) index pairs to score
+            prepared: Prepared documents by file index
+            language: Programming language of the files
+            sink: Called as sink(i, j, similarity, structure_similarity,
+                identical_structure) for every scored pair
+            reporter: Progress reporter
+            cancel_token: Optional cancellation token
+        
         Returns:
-            Dictionary containing comparison matrix and summary statistics
+            Whether the run was cancelled
+        """
+        reporter.set_stage('compare')
+        for i, j in pairs:
+            if reporter.pairs_done % self.CHUNK_SIZE == 0:
+                if reporter.pairs_done:
+                    reporter.report()
+                if cancel_token is not None and cancel_token.cancelled:
+                    return True
+            
+            budget = make_budget(self.pair_budget)
+            sink(i, j, *self.compare_prepared(prepared[i], prepared[j], language, budget))
+            reporter.pairs_done += 1
+            if budget is not None:
+                budget.finish()
+                if budget.approximate:
+                    reporter.pairs_approximate += 1
+        
+        return cancel_token is not None and cancel_token.cancelled
+    
+    def compare_prepared(self, doc1, doc2, language: str,
+                         budget: Optional[TimeBudget] = None) -> Tuple[float, float, bool]:
+        """
+        Score one pair of prepared documents.
+        
+        Args:
+            doc1: First prepared document
+            doc2: Second prepared document
+            language: Programming language of both documents
+            budget: Optional TimeBudget of this pair
+        
+        Returns:
+            (similarity, structure_similarity, identical_structure); the last
+            two are only meaningful in hybrid mode
+        """
+        if self._uses_hybrid(language):
+            result = self.hybrid_analyzer.compare_prepared(doc1, doc2, language, budget)
+            return (result['weighted_score'], result['structure_similarity'],
+                    result['identical_structure'])
+        
+        similarity = self.basic_analyzer.compute_similarity(doc1, doc2, budget)
+        return similarity, 0.0, False
+    
+    def _new_result(self, files: List[Dict[str, str]], language: str) -> BatchResult:
+        """Empty columnar result for a batch."""
+        return BatchResult(
+            [f['name'] for f in files],
+            [len(f['content'].splitlines()) for f in files],
+            self.mode, language, self._uses_hybrid(language)
+        )
+    
+    def compare_all_pairs(self, files: List[Dict[str, str]], language='python',
+                          progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          cancel_token: Optional[CancellationToken] = None) -> BatchResult:
+        """
+        Compare all file pairs and generate a comparison matrix.
+        
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            language: Programming language of the files
+            progress: Optional callback receiving progress event dictionaries
+                (see ProgressReporter)
+            cancel_token: Optional CancellationToken checked between chunks;
+                when cancelled, the pairs finished so far are returned
+        
+        Returns:
+            BatchResult, a read-only mapping with the comparison matrix,
+            comparisons, statistics and rankings built lazily from compact
+            columns; 'cancelled' is True if the run was aborted and the
+            result is partial
         """
         n = len(files)
+        reporter = ProgressReporter(progress, n, n * (n - 1) // 2)
+        result = self._new_result(files, language)
         
-        # Initialize matrix
-        matrix = [[0.0 for _ in range(n)] for _ in range(n)]
-        comparisons = []
+        reporter.set_stage('prepare')
+        if self.boilerplate:
+            result.excluded = array('f', [0.0]) * n
+        stripped = [''] * n if self.pruner is not None else None
+        prepared = self.prepare_documents(files, language, reporter=reporter,
+                                          cancel_token=cancel_token, excluded=result.excluded,
+                                          stripped=stripped)
         
-        # Compare all pairs
-        for i in range(n):
-            for j in range(i + 1, n):
-                file1 = files[i]
-                file2 = files[j]
-                
-                # Perform comparison
-                if self.mode == 'hybrid' and language == 'python':
-                    result = self.hybrid_analyzer.analyze(file1['content'], file2['content'])
-                    similarity = result['weighted_score']
-                    
-                    comparison = {
-                        'file1': file1['name'],
-                        'file2': file2['name'],
-                        'similarity': similarity,
-                        'percentage': f"{similarity * 100:.1f}%",
-                        'structure_similarity': result['structure_similarity'],
-                        'identical_structure': result['identical_structure']
-                    }
-                else:
-                    result = self.basic_analyzer.analyze(
-                        file1['content'], 
-                        file2['content'], 
-                        mode='basic', 
-                        language=language
-                    )
-                    similarity = result['similarity_score']
-                    
-                    comparison = {
-                        'file1': file1['name'],
-                        'file2': file2['name'],
-                        'similarity': similarity,
-                        'percentage': result['similarity_percentage']
-                    }
-                
-                # Store in matrix (symmetric)
-                matrix[i][j] = similarity
-                matrix[j][i] = similarity
-                
-                comparisons.append(comparison)
-            
-            # Diagonal (self-comparison) is always 1.0
-            matrix[i][i] = 1.0
+        cancelled = True
+        if len(prepared) == n:
+            pairs = ((i, j) for i in range(n) for j in range(i + 1, n))
+            if self.pruner is not None:
+                pairs = sorted(self.candidate_pairs(files, language, stripped))
+                reporter.pairs_pruned = result.pruned = reporter.pairs_total - len(pairs)
+            cancelled = self._score_pairs(pairs, prepared, language, result.append,
+                                          reporter, cancel_token)
+        
+        result.cancelled = cancelled
+        result.approximate = reporter.pairs_approximate
+        reporter.set_stage('cancelled' if cancelled else 'done')
+        return result
+    
+    def candidate_pairs(self, files: List[Dict[str, str]], language='python',
+                        stripped: Optional[Sequence[str]] = None) -> set:
+        """
+        Pairs worth a full comparison according to the pruner.
         
-        # Calculate statistics
-        similarities = [comp['similarity'] for comp in comparisons]
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            language: Programming language of the files
+            stripped: Contents without boilerplate, if already stripped (e.g.
+                collected by prepare_documents)
         
-        avg_similarity = sum(similarities) / len(similarities) if similarities else 0
-        max_similarity = max(similarities) if similarities else 0
-        min_similarity = min(similarities) if similarities else 0
+        Returns:
+            Set of (i, j) index pairs, i < j
+        """
+        documents = stripped if stripped is not None else \
+            [self.strip_boilerplate(f['content'], language)[0] for f in files]
+        if isinstance(self.pruner, FragmentPruner):
+            return self.pruner.candidate_pairs(documents, language)
+        fingerprinter = self.pruner.fingerprinter
+        return self.pruner.candidate_pairs([fingerprinter.fingerprints(code, language)
+                                            for code in documents])
+    
+    def file_languages(self, files: List[Dict[str, str]]) -> List[str]:
+        """Language of every file: its 'language' key, else its extension's."""
+        return [f.get('language') or language_for_filename(f['name']) for f in files]
+    
+    def compare_mixed(self, files: List[Dict[str, str]], cross_language: bool = True,
+                      workers: int = 1,
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> BatchResult:
+        """
+        Compare a batch whose files may be in different languages.
         
-        # Find most similar pair
-        most_similar = max(comparisons, key=lambda x: x['similarity']) if comparisons else None
+        Files are grouped by language (see file_languages); every group is
+        prepared and scored with its own engine by compare_all_pairs (the
+        hybrid analyzer for languages with structure in hybrid mode, text
+        comparison otherwise) and the groups are merged into one result.
+        Pairs of files in different languages have no common structure and
+        are compared as preprocessed text, or skipped.
         
-        # Find files with high average similarity (potential plagiarism sources)
-        file_avg_similarities = []
-        for i in range(n):
-            avg = sum(matrix[i][j] for j in range(n) if i != j) / (n - 1) if n > 1 else 0
-            file_avg_similarities.append({
-                'file': files[i]['name'],
-                'average_similarity': avg,
-                'percentage': f"{avg * 100:.1f}%"
-            })
+        Args:
+            files: List of dicts with 'name' and 'content' keys and an
+                optional 'language' key overriding the file extension
+            cross_language: Score pairs of files in different languages
+                (text similarity); when False they are left out
+                (similarity 0.0)
+            workers: Number of groups scored at the same time (threads;
+                analyzers and FingerprintStore are safe to share)
+            progress: Optional callback receiving progress events (see
+                ProgressReporter) for the whole batch
+            cancel_token: Optional CancellationToken checked between chunks
         
-        file_avg_similarities.sort(key=lambda x: x['average_similarity'], reverse=True)
+        Returns:
+            BatchResult with language 'mixed' when several languages are
+            present, per-file languages in the 'files' view and per-group
+            summaries under statistics['partitions']
+        """
+        n = len(files)
+        languages = self.file_languages(files)
+        partitions: Dict[str, List[int]] = {}
+        for idx, language in enumerate(languages):
+            partitions.setdefault(language, []).append(idx)
         
+        if len(partitions) <= 1:
+            language = languages[0] if languages else 'text'
+            result = self.compare_all_pairs(files, language, progress=progress,
+                                            cancel_token=cancel_token)
+            result.languages = languages
+            result.partitions = [self._partition_summary(language, n, result)]
+            return result
+        
+        within = sum(len(indices) * (len(indices) - 1) // 2 for indices in partitions.values())
+        cross_pairs = [(i, j) for i in range(n) for j in range(i + 1, n)
+                       if languages[i] != languages[j]]
+        reporter = ProgressReporter(progress, n, within + (len(cross_pairs) if cross_language else 0))
+        
+        # Every group reports into its own slot; the sums go to the caller
+        lock = threading.Lock()
+        latest: Dict[str, Dict[str, Any]] = {}
+        
+        def forward(key: str) -> Callable[[Dict[str, Any]], None]:
+            def on_progress(event: Dict[str, Any]) -> None:
+                with lock:
+                    latest[key] = event
+                    reporter.files_prepared = sum(e['files_prepared'] for e in latest.values())
+                    reporter.pairs_done = sum(e['pairs_done'] for e in latest.values())
+                    reporter.pairs_pruned = sum(e['pairs_pruned'] for e in latest.values())
+                    reporter.pairs_approximate = sum(e['pairs_approximate'] for e in latest.values())
+                    if event['stage'] == 'compare' and reporter.stage == 'prepare':
+                        reporter.set_stage('compare')
+                    else:
+                        reporter.report()
+            return on_progress
+        
+        def run_partition(language: str) -> BatchResult:
+            return self.compare_all_pairs([files[idx] for idx in partitions[language]], language,
+                                          progress=forward(language), cancel_token=cancel_token)
+        
+        cross_approximate = []
+        
+        def run_cross() -> List[Tuple[int, int, float, float, bool]]:
+            scored = []
+            # Each file is preprocessed for its own language; the pairs are
+            # then scored as plain text (compare_prepared with 'text')
+            texts = {idx: self.basic_analyzer.preprocess(
+                         self.strip_boilerplate(files[idx]['content'], languages[idx])[0],
+                         languages[idx])
+                     for idx in range(n)}
+            cross_reporter = ProgressReporter(forward(''), 0, len(cross_pairs))
+            self._score_pairs(cross_pairs, texts, 'text',
+                              lambda *pair: scored.append(pair), cross_reporter, cancel_token)
+            cross_reporter.set_stage('done')
+            cross_approximate.append(cross_reporter.pairs_approximate)
+            return scored
+        
+        # Largest groups first, so parallel workers finish together
+        order = sorted(partitions, key=lambda language: -len(partitions[language]))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {language: executor.submit(run_partition, language) for language in order}
+                cross_future = executor.submit(run_cross) if cross_language else None
+                results = {language: future.result() for language, future in futures.items()}
+                cross_scores = cross_future.result() if cross_future else []
+        else:
+            results = {language: run_partition(language) for language in order}
+            cross_scores = run_cross() if cross_language else []
+        
+        hybrid = any(self._uses_hybrid(language) for language in partitions)
+        merged = BatchResult([f['name'] for f in files],
+                             [len(f['content'].splitlines()) for f in files],
+                             self.mode, 'mixed', hybrid)
+        merged.languages = languages
+        merged.partitions = []
+        if self.boilerplate:
+            merged.excluded = array('f', [0.0]) * n
+        
+        scores = list(cross_scores)
+        merged.approximate = sum(cross_approximate)
+        for language in partitions:
+            indices = partitions[language]
+            result = results[language]
+            for i, j, sim, struct_sim, ident in result.iter_pairs():
+                scores.append((indices[i], indices[j], sim, struct_sim, ident))
+            if result.excluded is not None:
+                for local, idx in enumerate(indices):
+                    merged.excluded[idx] = result.excluded[local]
+            merged.pruned += result.pruned
+            merged.approximate += result.approximate
+            merged.cancelled = merged.cancelled or result.cancelled
+            merged.partitions.append(self._partition_summary(language, len(indices), result))
+        
+        merged.partitions.append({
+            'language': 'cross-language',
+            'engine': 'basic',
+            'file_count': n,
+            'comparison_count': len(cross_scores),
+            'skipped_pairs': 0 if cross_language else len(cross_pairs)
+        })
+        for pair in sorted(scores):
+            merged.append(*pair)
+        
+        merged.cancelled = merged.cancelled or (cancel_token is not None and cancel_token.cancelled)
+        reporter.set_stage('cancelled' if merged.cancelled else 'done')
+        return merged
+    
+    def _partition_summary(self, language: str, file_count: int,
+                           result: BatchResult) -> Dict[str, Any]:
+        """Summary of one language group of a compare_mixed run."""
         return {
-            'mode': self.mode,
             'language': language,
-            'file_count': n,
-            'comparison_count': len(comparisons),
-            'matrix': matrix,
-            'comparisons': comparisons,
-            'statistics': {
-                'average_similarity': avg_similarity,
-                'average_percentage': f"{avg_similarity * 100:.1f}%",
-                'max_similarity': max_similarity,
-                'max_percentage': f"{max_similarity * 100:.1f}%",
-                'min_similarity': min_similarity,
-                'min_percentage': f"{min_similarity * 100:.1f}%",
-                'most_similar_pair': most_similar
-            },
-            'file_rankings': file_avg_similarities,
-            'files': [{'name': f['name'], 'lines': len(f['content'].splitlines())} for f in files]
+            'engine': 'hybrid' if self._uses_hybrid(language) else 'basic',
+            'file_count': file_count,
+            'comparison_count': result.comparison_count,
+            'pruned_pairs': result.pruned
         }
     
-    def find_clusters(self, files: List[Dict[str, str]], threshold=0.75, language='python') -> Dict[str, Any]:
+    def compare_fragments(self, files: List[Dict[str, str]], language='python',
+                          min_length: int = 20) -> BatchResult:
+        """
+        Score all pairs by shared-fragment coverage in one pass.
+        
+        Builds one suffix array over the whole batch (see FragmentMiner)
+        instead of comparing pairs; pairs sharing no fragment score 0.0.
+        
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            language: Programming language of the files
+            min_length: Shortest counted fragment, in normalized tokens
+        
+        Returns:
+            BatchResult in mode 'fragments' (no structure columns)
+        """
+        miner = FragmentMiner(min_length=min_length)
+        for f in files:
+            miner.add_document(f['name'], self.strip_boilerplate(f['content'], language)[0], language)
+        coverage = miner.pair_coverage()
+        
+        n = len(files)
+        result = BatchResult([f['name'] for f in files],
+                             [len(f['content'].splitlines()) for f in files],
+                             'fragments', language, False)
+        for i in range(n):
+            for j in range(i + 1, n):
+                result.append(i, j, coverage.get((i, j), 0.0))
+        return result
+    
+    def function_matches(self, files: List[Dict[str, str]], language='python',
+                         min_score: float = 0.75, min_size: int = 10) -> Dict[str, Any]:
+        """
+        Functions copied between files, whatever their whole-file scores.
+        
+        Every function, method and class body of every file is indexed by
+        normalized fingerprint (see FunctionIndex); only units found by hash
+        lookup are scored.
+        
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            language: Programming language of the files (only Python files
+                are split into functions)
+            min_score: Smallest reported unit similarity
+            min_size: Smallest unit (in structure entries) to index
+        
+        Returns:
+            Dictionary with 'matches' and 'comparisons' counters
+        """
+        index = FunctionIndex(min_size=min_size, min_score=min_score,
+                              structure_weight=self.hybrid_analyzer.structure_weight,
+                              sequence_weight=self.hybrid_analyzer.sequence_weight)
+        for f in files:
+            index.add_document(f['name'], self.strip_boilerplate(f['content'], language)[0], language)
+        return index.matches()
+    
+    def batch_digest(self, files: List[Dict[str, str]], language='python') -> bytes:
+        """
+        Fingerprint a batch so shards of different batches are never mixed.
+        
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            language: Programming language of the files
+        
+        Returns:
+            32-byte SHA-256 digest over mode, language, every other scoring
+            setting, names and contents
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{self.mode}\0{language}\0{len(files)}\0".encode('utf-8'))
+        boilerplate = self.boilerplate.digest if self.boilerplate else None
+        digest.update(f"boilerplate:{boilerplate}\0"
+                      f"structure:{self.hybrid_analyzer.structure_metric}\0"
+                      f"large_input:{self.large_input_threshold}\0"
+                      f"pair_budget:{self.pair_budget}\0".encode('utf-8'))
+        for f in files:
+            digest.update(f['name'].encode('utf-8') + b'\0')
+            digest.update(hashlib.sha256(f['content'].encode('utf-8')).digest())
+        return digest.digest()
+    
+    def compare_shard(self, files: List[Dict[str, str]], shard_index: int, shard_count: int,
+                      output_dir: str, language='python',
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Optional[str]:
+        """
+        Compare only the pairs of one shard and write its partial result.
+        
+        Every machine gets the full file list and the same shard_count;
+        coordination happens through ``output_dir`` only. Files are prepared
+        only if they appear in one of the shard's pairs.
+        
+        Args:
+            files: List of dicts with 'name' and 'content' keys
+            shard_index: Zero-based index of the shard to run
+            shard_count: Total number of shards
+            output_dir: Shared directory the partial result is written to
+            language: Programming language of the files
+            progress: Optional progress callback (see compare_all_pairs)
+            cancel_token: Optional CancellationToken checked between chunks
+        
+        Returns:
+            Path of the written shard file, or None if the run was cancelled
+            (no partial file is written, so the shard can simply be re-run)
+        """
+        sizes = [len(f['content']) for f in files]
+        shard = list(shard_pairs(sizes, shard_index, shard_count))
+        reporter = ProgressReporter(progress, 0, len(shard))
+        
+        needed = sorted(set(idx for pair in shard for idx in pair))
+        reporter.files_total = len(needed)
+        reporter.set_stage('prepare')
+        prepared = self.prepare_documents(files, language, indices=needed,
+                                          reporter=reporter, cancel_token=cancel_token)
+        
+        pairs = []
+        cancelled = len(prepared) != len(needed)
+        if not cancelled:
+            cancelled = self._score_pairs(shard, prepared, language,
+                                          lambda *scored: pairs.append(scored),
+                                          reporter, cancel_token)
+        if cancelled:
+            reporter.set_stage('cancelled')
+            return None
+        
+        reporter.set_stage('aggregate')
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, shard_filename(shard_index, shard_count))
+        write_shard(path, len(files), shard_index, shard_count,
+                    self.batch_digest(files, language), self._uses_hybrid(language), pairs,
+                    reporter.pairs_approximate)
+        reporter.set_stage('done')
+        return path
+    
+    def merge_shards(self, files: List[Dict[str, str]], input_dir: str, shard_count: int,
+                     language='python') -> BatchResult:
+        """
+        Combine all shard partial results into the full batch result.
+        
+        Args:
+            files: The same file list the shards were computed from
+            input_dir: Shared directory holding the shard files
+            shard_count: Total number of shards
+            language: Programming language of the files
+        
+        Returns:
+            BatchResult with the pairs, scores and approximate-pair count
+            (summed over the shards) of a compare_all_pairs run
+        
+        Raises:
+            FileNotFoundError: If a shard file is missing
+            ValueError: If a shard belongs to another batch or pairs are
+                missing or duplicated
+        """
+        n = len(files)
+        digest = self.batch_digest(files, language)
+        
+        pairs = []
+        approximate = 0
+        for shard_index in range(shard_count):
+            path = os.path.join(input_dir, shard_filename(shard_index, shard_count))
+            shard = read_shard(path)
+            if shard['digest'] != digest or shard['file_count'] != n:
+                raise ValueError(f'Shard {path} was computed for a different batch')
+            pairs.extend(shard['pairs'])
+            approximate += shard['approximate']
+        
+        pairs.sort(key=lambda p: (p[0], p[1]))
+        expected = n * (n - 1) // 2
+        distinct = len(set((p[0], p[1]) for p in pairs))
+        if len(pairs) != expected or distinct != expected:
+            raise ValueError(f'Shards cover {distinct} distinct of {expected} pairs '
+                             f'({len(pairs)} entries)')
+        
+        result = self._new_result(files, language)
+        for pair in pairs:
+            result.append(*pair)
+        result.approximate = approximate
+        if self.boilerplate:
+            result.excluded = array('f', (self.strip_boilerplate(f['content'], language)[1]
+                                          for f in files))
+        return result
+    
+    def find_clusters(self, files: List[Dict[str, str]], threshold=0.75, language='python',
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """
         Find clusters of similar files (potential plagiarism groups).
         
@@ -129,12 +870,15 @@ class BatchComparator:
             files: List of dicts with 'name' and 'content' keys
             threshold: Similarity threshold for clustering (0.0 to 1.0)
             language: Programming language of the files
-            
+            progress: Optional progress callback (see compare_all_pairs)
+            cancel_token: Optional CancellationToken checked between chunks
+        
         Returns:
             Dictionary containing identified clusters
         """
-        result = self.compare_all_pairs(files, language)
-        matrix = result['matrix']
+        result = self.compare_all_pairs(files, language, progress=progress,
+                                        cancel_token=cancel_token)
+        similarity = result.similarity
         n = len(files)
         
         # Simple clustering: group files with similarity above threshold
@@ -147,7 +891,7 @@ class BatchComparator:
             
             cluster = [i]
             for j in range(i + 1, n):
-                if matrix[i][j] >= threshold:
+                if similarity(i, j) >= threshold:
                     cluster.append(j)
                     processed.add(j)
             
@@ -156,7 +900,7 @@ class BatchComparator:
                     'cluster_id': len(clusters) + 1,
                     'file_count': len(cluster),
                     'files': [files[idx]['name'] for idx in cluster],
-                    'average_similarity': sum(matrix[cluster[i]][cluster[j]] 
+                    'average_similarity': sum(similarity(cluster[i], cluster[j]) 
                                             for i in range(len(cluster)) 
                                             for j in range(i + 1, len(cluster))) / 
                                          (len(cluster) * (len(cluster) - 1) / 2)
@@ -171,7 +915,7 @@ class BatchComparator:
         }
 
 
-def batch_compare(file_list: List[Dict[str, str]], mode='hybrid', language='python') -> Dict[str, Any]:
+def batch_compare(file_list: List[Dict[str, str]], mode='hybrid', language='python') -> BatchResult:
     """
     Convenience function for batch comparison.
     
@@ -179,9 +923,9 @@ def batch_compare(file_list: List[Dict[str, str]], mode='hybrid', language='pyth
         file_list: List of files with 'name' and 'content'
         mode: Analysis mode ('basic' or 'hybrid')
         language: Programming language
-        
+    
     Returns:
-        Comparison results dictionary
+        BatchResult (see BatchComparator.compare_all_pairs)
     """
     comparator = BatchComparator(mode=mode)
     return comparator.compare_all_pairs(file_list, language)
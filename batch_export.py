@@ -0,0 +1,194 @@
+"""
+Batch Export Module
+===================
+Streaming exporters for BatchComparator results.
+
+Pairs are written one line at a time as JSON Lines or CSV, and the matrix
+one row at a time as a NumPy ``.npy`` file (float32, C order) that numpy
+can memory-map with ``numpy.load(path, mmap_mode='r')``. Nothing here
+builds the full comparisons list or nested-list matrix.
+"""
+
+import csv
+import io
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Iterator, TextIO, Tuple
+
+from batch_result import BatchResult
+
+
+EXPORT_FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'npy': 'application/octet-stream'
+}
+
+NPY_MAGIC = b'\x93NUMPY'
+
+
+def csv_columns(result: BatchResult) -> list:
+    """Column names of the CSV export."""
+    columns = ['file1', 'file2', 'similarity', 'percentage']
+    if result.hybrid:
+        columns += ['structure_similarity', 'identical_structure']
+    return columns
+
+
+def iter_jsonl(result: BatchResult) -> Iterator[str]:
+    """
+    Yield one JSON line per compared pair.
+    
+    Args:
+        result: Batch result to export
+    
+    Yields:
+        Newline-terminated JSON objects (same fields as 'comparisons')
+    """
+    for comparison in result.iter_comparisons():
+        yield json.dumps(comparison) + '\n'
+
+
+def iter_csv(result: BatchResult) -> Iterator[str]:
+    """
+    Yield the CSV export line by line, header first.
+    
+    Args:
+        result: Batch result to export
+    
+    Yields:
+        CSV lines
+    """
+    columns = csv_columns(result)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    
+    writer.writerow(columns)
+    for comparison in result.iter_comparisons():
+        writer.writerow([comparison[column] for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Header-only export for empty results
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def npy_header(shape: Tuple[int, ...], descr: str = '<f4') -> bytes:
+    """
+    Build a version 1.0 ``.npy`` header.
+    
+    Args:
+        shape: Array shape
+        descr: NumPy dtype descriptor
+    
+    Returns:
+        Header bytes (magic, version, length, padded dict literal)
+    """
+    shape_text = '(' + ', '.join(str(dim) for dim in shape) + (',)' if len(shape) == 1 else ')')
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape_text}, }}"
+    # Magic (6) + version (2) + length (2) + header + newline, padded to 64 bytes
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = header + ' ' * (padding % 64) + '\n'
+    return NPY_MAGIC + b'\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def iter_npy(result: BatchResult) -> Iterator[bytes]:
+    """
+    Yield the similarity matrix as ``.npy`` bytes, one row per chunk.
+    
+    Args:
+        result: Batch result to export
+    
+    Yields:
+        The header, then each row as little-endian float32
+    """
+    n = result.file_count
+    yield npy_header((n, n))
+    for i in range(n):
+        row = result.row(i)
+        if sys.byteorder == 'big':
+            row.byteswap()
+        yield row.tobytes()
+
+
+def write_jsonl(result: BatchResult, fp: TextIO) -> None:
+    """Write pairs as JSON Lines to a text file object."""
+    for line in iter_jsonl(result):
+        fp.write(line)
+
+
+def write_csv(result: BatchResult, fp: TextIO) -> None:
+    """Write pairs as CSV to a text file object (open with newline='')."""
+    for line in iter_csv(result):
+        fp.write(line)
+
+
+def write_npy(result: BatchResult, fp: BinaryIO) -> None:
+    """Write the similarity matrix as ``.npy`` to a binary file object."""
+    for chunk in iter_npy(result):
+        fp.write(chunk)
+
+
+def iter_export(result: BatchResult, format_type: str) -> Iterator[Any]:
+    """
+    Stream a result in one of EXPORT_FORMATS.
+    
+    Args:
+        result: Batch result to export
+        format_type: 'jsonl', 'csv' or 'npy'
+    
+    Returns:
+        Iterator of str chunks (jsonl, csv) or bytes chunks (npy)
+    """
+    if format_type == 'jsonl':
+        return iter_jsonl(result)
+    if format_type == 'csv':
+        return iter_csv(result)
+    if format_type == 'npy':
+        return iter_npy(result)
+    raise ValueError(f"Unsupported export format: {format_type}. "
+                     f"Use {', '.join(EXPORT_FORMATS)}.")
+
+
+def open_npy_matrix(path: str) -> Tuple[Tuple[int, ...], memoryview]:
+    """
+    Memory-map a float32 matrix written by write_npy, without numpy.
+    
+    Only the pages that are read get loaded, so rows of very large
+    matrices can be inspected cheaply. Requires a little-endian host.
+    
+    Args:
+        path: Path of the ``.npy`` file
+    
+    Returns:
+        (shape, flat float32 memoryview); element (i, j) is at i * n + j
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(10)
+        if prefix[:6] != NPY_MAGIC:
+            raise ValueError(f'Not a .npy file: {path}')
+        header_length = struct.unpack('<H', prefix[8:10])[0]
+        header = f.read(header_length).decode('latin1')
+        if "'descr': '<f4'" not in header or "'fortran_order': False" not in header:
+            raise ValueError(f'Expected a C-order float32 matrix: {path}')
+        if sys.byteorder != 'little':
+            raise ValueError('open_npy_matrix requires a little-endian host')
+        
+        shape_text = header[header.index("'shape': (") + 10:header.index(')')]
+        shape = tuple(int(dim) for dim in shape_text.split(',') if dim.strip())
+        
+        count = 1
+        for dim in shape:
+            count *= dim
+        if count == 0:
+            return shape, memoryview(array('f'))
+        
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    offset = 10 + header_length
+    return shape, memoryview(mapped)[offset:offset + 4 * count].cast('f')
@@ -0,0 +1,336 @@
+"""
+Batch Result Module
+===================
+Compact, columnar storage for BatchComparator results.
+
+Scores live in typed arrays and file names in a single table; the familiar
+dictionary views (comparisons, matrix, statistics, rankings, formatted
+percentages) are only built when they are accessed or serialized.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+RESULT_KEYS = (
+    'mode', 'language', 'file_count', 'comparison_count', 'matrix',
+    'comparisons', 'statistics', 'file_rankings', 'files', 'cancelled'
+)
+
+
+def format_percentage(value: float) -> str:
+    """Format a 0.0-1.0 score the way every CIDE report does."""
+    return f"{value * 100:.1f}%"
+
+
+def score_value(value: float) -> float:
+    """
+    Plain float for a stored float32 score.
+    
+    float32 carries about seven significant digits; rounding to them keeps
+    serialized scores readable (0.4 rather than 0.4000000059604645).
+    """
+    return float(f"{value:.7g}")
+
+
+def pair_offset(i: int, j: int, n: int) -> int:
+    """Position of pair (i, j), i < j, in row-major upper-triangle order."""
+    return i * (2 * n - i - 1) // 2 + (j - i - 1)
+
+
+class BatchResult(Mapping):
+    """
+    Columnar result of a batch comparison.
+    
+    Per pair it stores a float32 similarity and, in hybrid mode, a float32
+    structure similarity and a one-byte identical-structure flag. Pair
+    indices are implicit while pairs arrive in row-major upper-triangle
+    order (full runs, merged shards, cancelled prefixes) and are only kept
+    in uint16/uint32 arrays otherwise.
+    
+    The object is a read-only Mapping with the same keys as the dictionary
+    compare_all_pairs used to return, so ``result['statistics']`` keeps
+    working; each access builds that view on the fly. Use to_dict() for
+    serialization and iter_pairs()/similarity() for compact access.
+    """
+    
+    def __init__(self, names: List[str], line_counts: List[int], mode: str,
+                 language: str, hybrid: bool):
+        self.names = list(names)
+        self.line_counts = array('I', line_counts)
+        self.mode = mode
+        self.language = language
+        self.hybrid = hybrid
+        self.cancelled = False
+        # Pairs skipped by candidate pruning (left out, similarity 0.0)
+        self.pruned = 0
+        # Pairs scored with cheaper bounds after their time budget ran out
+        self.approximate = 0
+        # Per-file fraction of lines excluded as boilerplate (None if no filter)
+        self.excluded = None
+        # Per-file language and per-language partition summaries of
+        # mixed-language runs (None otherwise, see BatchComparator.compare_mixed)
+        self.languages = None
+        self.partitions = None
+        
+        n = len(self.names)
+        self._index_typecode = 'H' if n <= 0xFFFF else 'I'
+        self._first = None
+        self._second = None
+        self._similarity = array('f')
+        self._structure = array('f')
+        self._identical = array('B')
+        # Sorted i*n+j keys and storage positions of explicitly indexed pairs
+        self._lookup = None
+        self._dense = None
+    
+    @property
+    def file_count(self) -> int:
+        """Number of files in the batch."""
+        return len(self.names)
+    
+    @property
+    def comparison_count(self) -> int:
+        """Number of scored pairs."""
+        return len(self._similarity)
+    
+    def append(self, i: int, j: int, similarity: float,
+               structure_similarity: float = 0.0, identical_structure: bool = False) -> None:
+        """Record one scored pair (i < j)."""
+        k = len(self._similarity)
+        if self._first is None and pair_offset(i, j, self.file_count) != k:
+            # Out of row-major order: materialize explicit indices
+            self._first = array(self._index_typecode)
+            self._second = array(self._index_typecode)
+            for a, b in self._implicit_pairs(k):
+                self._first.append(a)
+                self._second.append(b)
+        if self._first is not None:
+            self._first.append(i)
+            self._second.append(j)
+        
+        self._similarity.append(similarity)
+        if self.hybrid:
+            self._structure.append(structure_similarity)
+            self._identical.append(1 if identical_structure else 0)
+        self._lookup = None
+        self._dense = None
+    
+    def _implicit_pairs(self, count: int) -> Iterator[Tuple[int, int]]:
+        """First ``count`` pairs in row-major upper-triangle order."""
+        n = self.file_count
+        produced = 0
+        for i in range(n):
+            for j in range(i + 1, n):
+                if produced == count:
+                    return
+                yield i, j
+                produced += 1
+    
+    def pair_indices(self) -> Iterator[Tuple[int, int]]:
+        """Yield (i, j) for every scored pair in storage order."""
+        if self._first is None:
+            return self._implicit_pairs(self.comparison_count)
+        return zip(self._first, self._second)
+    
+    def iter_pairs(self) -> Iterator[Tuple[int, int, float, float, bool]]:
+        """
+        Yield scored pairs without building dictionaries.
+        
+        Yields:
+            (i, j, similarity, structure_similarity, identical_structure)
+        """
+        if self.hybrid:
+            for (i, j), sim, struct_sim, ident in zip(self.pair_indices(), self._similarity,
+                                                      self._structure, self._identical):
+                yield i, j, sim, struct_sim, bool(ident)
+        else:
+            for (i, j), sim in zip(self.pair_indices(), self._similarity):
+                yield i, j, sim, 0.0, False
+    
+    def similarity(self, i: int, j: int) -> float:
+        """Similarity of files i and j (1.0 on the diagonal, 0.0 if not scored)."""
+        if i == j:
+            return 1.0
+        if i > j:
+            i, j = j, i
+        if self._first is None:
+            k = pair_offset(i, j, self.file_count)
+            return self._similarity[k] if k < self.comparison_count else 0.0
+        keys, positions = self._pair_lookup()
+        key = i * self.file_count + j
+        k = bisect_left(keys, key)
+        return self._similarity[positions[k]] if k < len(keys) and keys[k] == key else 0.0
+    
+    def _pair_lookup(self) -> Tuple[array, array]:
+        """Sorted pair keys (i*n+j) and their storage positions, for explicit indices."""
+        if self._lookup is None:
+            n = self.file_count
+            order = sorted(range(self.comparison_count),
+                           key=lambda k: self._first[k] * n + self._second[k])
+            keys = array('Q', (self._first[k] * n + self._second[k] for k in order))
+            self._lookup = (keys, array('I', order))
+        return self._lookup
+    
+    def _dense_matrix(self) -> array:
+        """Dense float32 n*n matrix, only built by matrix() for explicit indices."""
+        if self._dense is None:
+            n = self.file_count
+            dense = array('f', bytes(4 * n * n))
+            for i in range(n):
+                dense[i * n + i] = 1.0
+            for (i, j), sim in zip(self.pair_indices(), self._similarity):
+                dense[i * n + j] = sim
+                dense[j * n + i] = sim
+            self._dense = dense
+        return self._dense
+    
+    def row(self, i: int) -> array:
+        """Row i of the similarity matrix as a float32 array."""
+        return array('f', (self.similarity(i, j) for j in range(self.file_count)))
+    
+    def iter_comparisons(self) -> Iterator[Dict[str, Any]]:
+        """Yield the per-pair dictionaries of the 'comparisons' view one at a time."""
+        for i, j, sim, struct_sim, ident in self.iter_pairs():
+            yield self._comparison(i, j, sim, struct_sim, ident)
+    
+    def _comparison(self, i: int, j: int, sim: float, struct_sim: float,
+                    ident: bool) -> Dict[str, Any]:
+        """Dictionary view of one pair."""
+        comparison = {
+            'file1': self.names[i],
+            'file2': self.names[j],
+            'similarity': score_value(sim),
+            'percentage': format_percentage(sim)
+        }
+        if self.hybrid:
+            comparison['structure_similarity'] = score_value(struct_sim)
+            comparison['identical_structure'] = ident
+        return comparison
+    
+    def file_averages(self) -> array:
+        """Average similarity of each file to all others, as float64 array."""
+        n = self.file_count
+        totals = array('d', bytes(8 * n))
+        for (i, j), sim in zip(self.pair_indices(), self._similarity):
+            totals[i] += sim
+            totals[j] += sim
+        if n > 1:
+            for i in range(n):
+                totals[i] /= (n - 1)
+        return totals
+    
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Summary statistics view (numbers plus formatted percentages).
+        
+        Pruned pairs count as 0.0, as they do in matrix() and
+        file_rankings().
+        """
+        count = self.comparison_count
+        total = count + self.pruned
+        avg_similarity = sum(self._similarity) / total if total else 0
+        max_similarity = max(self._similarity) if count else 0
+        min_similarity = min(self._similarity) if count else 0
+        if self.pruned:
+            min_similarity = 0.0
+        
+        most_similar = None
+        if count:
+            best = max(range(count), key=self._similarity.__getitem__)
+            for k, pair in enumerate(self.iter_pairs()):
+                if k == best:
+                    most_similar = self._comparison(*pair)
+                    break
+        
+        statistics = {
+            'average_similarity': score_value(avg_similarity),
+            'average_percentage': format_percentage(avg_similarity),
+            'max_similarity': score_value(max_similarity),
+            'max_percentage': format_percentage(max_similarity),
+            'min_similarity': score_value(min_similarity),
+            'min_percentage': format_percentage(min_similarity),
+            'most_similar_pair': most_similar,
+            'pruned_pairs': self.pruned,
+            'approximate_pairs': self.approximate
+        }
+        if self.partitions is not None:
+            statistics['partitions'] = [dict(partition) for partition in self.partitions]
+        return statistics
+    
+    def file_rankings(self) -> List[Dict[str, Any]]:
+        """Files sorted by average similarity, highest first."""
+        averages = self.file_averages()
+        order = sorted(range(self.file_count), key=averages.__getitem__, reverse=True)
+        return [{
+            'file': self.names[i],
+            'average_similarity': score_value(averages[i]),
+            'percentage': format_percentage(averages[i])
+        } for i in order]
+    
+    def matrix(self) -> List[List[float]]:
+        """Full similarity matrix as nested lists."""
+        n = self.file_count
+        if self._first is not None:
+            dense = self._dense_matrix()
+            return [[score_value(value) for value in dense[i * n:(i + 1) * n]]
+                    for i in range(n)]
+        return [[score_value(value) for value in self.row(i)] for i in range(n)]
+    
+    def files(self) -> List[Dict[str, Any]]:
+        """File table view."""
+        files = [{'name': name, 'lines': lines}
+                 for name, lines in zip(self.names, self.line_counts)]
+        if self.excluded is not None:
+            for entry, fraction in zip(files, self.excluded):
+                entry['excluded_fraction'] = score_value(fraction)
+        if self.languages is not None:
+            for entry, language in zip(files, self.languages):
+                entry['language'] = language
+        return files
+    
+    def __getitem__(self, key: str) -> Any:
+        if key == 'mode':
+            return self.mode
+        if key == 'language':
+            return self.language
+        if key == 'file_count':
+            return self.file_count
+        if key == 'comparison_count':
+            return self.comparison_count
+        if key == 'matrix':
+            return self.matrix()
+        if key == 'comparisons':
+            return list(self.iter_comparisons())
+        if key == 'statistics':
+            return self.statistics()
+        if key == 'file_rankings':
+            return self.file_rankings()
+        if key == 'files':
+            return self.files()
+        if key == 'cancelled':
+            return self.cancelled
+        raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(RESULT_KEYS)
+    
+    def __len__(self) -> int:
+        return len(RESULT_KEYS)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the full dictionary form (e.g. for jsonify)."""
+        return {key: self[key] for key in RESULT_KEYS}
+    
+    def memory_bytes(self) -> int:
+        """Bytes held by the per-pair columns and any lookup tables built from them."""
+        columns = [self._similarity, self._structure, self._identical]
+        if self._first is not None:
+            columns += [self._first, self._second]
+        if self._lookup is not None:
+            columns += list(self._lookup)
+        if self._dense is not None:
+            columns.append(self._dense)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -0,0 +1,189 @@
+"""
+Lexer Benchmarks
+================
+Throughput of every registered lexer (see lexers) on generated sources.
+
+Each language has a representative sample program; it is repeated, with
+its identifiers renamed per copy, until the requested size is reached.
+Tokenizing (raw scan) and normalizing (scan plus placeholder mapping) are
+timed separately, best of several runs, and reported in MB/s and tokens/s.
+
+Usage:
+    python benchmark_lexers.py --size-kb 1024 --repeat 5
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+from lexers import LEXERS, get_lexer
+
+
+SAMPLES = {
+    'c': '''#include <stdio.h>
+#include <stdlib.h>
+
+/* Sorts numbers read from stdin */
+static int compare_NAME(const void *a, const void *b) {
+    int x = *(const int *)a, y = *(const int *)b;
+    return (x > y) - (x < y);
+}
+
+int run_NAME(void) {
+    int capacity = 16, count = 0, value;
+    int *values = malloc(capacity * sizeof(int));
+    while (scanf("%d", &value) == 1) {
+        if (count == capacity) {
+            capacity *= 2;
+            values = realloc(values, capacity * sizeof(int));
+        }
+        values[count++] = value;
+    }
+    qsort(values, count, sizeof(int), compare_NAME);
+    for (int i = 0; i < count; i++) printf("%d\\n", values[i]);
+    free(values);
+    return 0;
+}
+''',
+    'cpp': '''#include <algorithm>
+#include <vector>
+
+namespace shapes_NAME {
+class Polygon {
+public:
+    explicit Polygon(std::vector<double> sides) : sides_(std::move(sides)) {}
+    double perimeter() const {
+        double total = 0.0;
+        for (double side : sides_) total += side;
+        return total;
+    }
+    bool regular() const noexcept {
+        return std::all_of(sides_.begin(), sides_.end(),
+                           [this](double s) { return s == sides_.front(); });
+    }
+private:
+    std::vector<double> sides_;
+};
+}  // namespace shapes_NAME
+''',
+    'java': '''package bank;
+
+import java.util.ArrayList;
+import java.util.List;
+
+public class Account_NAME {
+    private final List<Double> history = new ArrayList<>();
+    private double balance = 0.0;
+    
+    public void deposit(double amount) throws IllegalArgumentException {
+        if (amount <= 0) {
+            throw new IllegalArgumentException("Amount must be positive");
+        }
+        balance += amount;
+        history.add(amount);
+    }
+    
+    public double average() {
+        double total = 0;
+        for (double entry : history) {
+            total += entry;
+        }
+        return history.isEmpty() ? 0 : total / history.size();
+    }
+}
+''',
+    'javascript': '''import { format } from './format.js';
+
+// Groups words by their first letter
+export function groupWords_NAME(text) {
+  const groups = new Map();
+  for (const word of text.split(/\\s+/)) {
+    if (!word) continue;
+    const key = word[0].toLowerCase();
+    groups.set(key, [...(groups.get(key) || []), word]);
+  }
+  return groups;
+}
+
+class Counter_NAME {
+  constructor(start = 0) { this.value = start; }
+  increment(step = 1) { this.value += step; return this; }
+  toString() { return `Counter(${format(this.value)})`; }
+}
+''',
+}
+
+
+def generate_source(language: str, size: int) -> str:
+    """Sample program of a language repeated to at least ``size`` characters."""
+    sample = SAMPLES[language]
+    copies = []
+    total = 0
+    while total < size:
+        copy = sample.replace('NAME', str(len(copies)))
+        copies.append(copy)
+        total += len(copy)
+    return '\n'.join(copies)
+
+
+def benchmark(language: str, size: int = 1 << 20, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time one lexer.
+    
+    Args:
+        language: Registered language name
+        size: Source size in characters
+        repeat: Runs per measurement (the best is kept)
+    
+    Returns:
+        Dictionary with source size, token counts and the best times and
+        throughputs of tokenize() and normalize()
+    """
+    lexer = get_lexer(language)
+    source = generate_source(language, size)
+    result = {'language': language, 'bytes': len(source.encode('utf-8'))}
+    for stage in ('tokenize', 'normalize'):
+        run = getattr(lexer, stage)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = run(source)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        tokens = len(output if stage == 'tokenize' else output[0])
+        result[f'{stage}_tokens'] = tokens
+        result[f'{stage}_seconds'] = best
+        result[f'{stage}_mb_per_second'] = result['bytes'] / best / 1e6 if best else 0.0
+        result[f'{stage}_tokens_per_second'] = tokens / best if best else 0.0
+    return result
+
+
+def run_benchmarks(languages: List[str], size: int, repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark several lexers, printing one line per lexer."""
+    results = []
+    print(f"{'language':<12}{'size':>10}{'tokenize':>14}{'normalize':>14}{'tokens/s':>14}")
+    for language in languages:
+        result = benchmark(language, size, repeat)
+        results.append(result)
+        print(f"{language:<12}{result['bytes'] / 1024:>8.0f}KB"
+              f"{result['tokenize_mb_per_second']:>10.2f}MB/s"
+              f"{result['normalize_mb_per_second']:>10.2f}MB/s"
+              f"{result['normalize_tokens_per_second']:>14,.0f}")
+    return results
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description='Lexer throughput benchmarks')
+    parser.add_argument('--size-kb', type=int, default=1024, help='Source size per language')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+    parser.add_argument('--languages', default=','.join(sorted(SAMPLES)),
+                        help='Comma-separated languages')
+    args = parser.parse_args()
+    
+    languages = [language for language in args.languages.split(',') if language in LEXERS]
+    run_benchmarks(languages, args.size_kb * 1024, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Boilerplate Filter Module
+=========================
+Excludes instructor-provided starter code from submissions before they are
+prepared for comparison.
+
+Base (template) files are registered once. Each submission is then
+stripped once, before any pairwise work:
+
+- Python that parses: statements whose whole subtree also occurs in a base
+  file are removed (an emptied block keeps a ``pass``), so the remaining
+  code still parses.
+- Other languages or unparsable code: lines that also occur in a base file
+  (comments removed, whitespace and case normalized) are removed.
+- Index fingerprints: k-grams of the base files are dropped (see
+  Fingerprinter's ``boilerplate`` argument).
+
+Tiny statements and short lines (``return x``, ``}``) are never treated as
+boilerplate on their own, since students write them independently.
+"""
+
+import ast
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from code_similarity import CodePreprocessor
+
+
+# Smallest statement subtree (in AST nodes) removed as boilerplate;
+# imports are removed at any size
+MIN_STATEMENT_NODES = 6
+
+# Shortest normalized line removed as boilerplate
+MIN_LINE_LENGTH = 8
+
+
+def statement_key(node: ast.stmt) -> bytes:
+    """Digest of a statement subtree, ignoring positions."""
+    dump = ast.dump(node, annotate_fields=False, include_attributes=False)
+    return hashlib.blake2b(dump.encode('utf-8'), digest_size=16).digest()
+
+
+def normalized_lines(code: str, language: str = 'auto') -> List[str]:
+    """Comment-free, whitespace- and case-normalized lines, one per source line."""
+    stripped = CodePreprocessor.remove_comments(code, language, keep_lines=True)
+    return [re.sub(r'\s+', ' ', line.strip()).lower() for line in stripped.split('\n')]
+
+
+def _child_blocks(node: ast.AST) -> Iterable[List[ast.stmt]]:
+    """Statement lists nested directly in a statement (bodies, handlers, cases)."""
+    for value in ast.iter_fields(node):
+        items = value[1]
+        if not isinstance(items, list) or not items:
+            continue
+        if isinstance(items[0], ast.stmt):
+            yield items
+        elif isinstance(items[0], (ast.excepthandler, ast.match_case)):
+            for item in items:
+                yield item.body
+
+
+class BoilerplateFilter:
+    """
+    Registry of starter-code statements, lines and fingerprints.
+    """
+    
+    def __init__(self, base_files: Iterable[str] = (), language: str = 'python'):
+        """
+        Args:
+            base_files: Contents of the template files
+            language: Language of the template files
+        """
+        self.statements: Set[bytes] = set()
+        self.lines: Set[str] = set()
+        self.sources: List[Tuple[str, str]] = []
+        self._fingerprints = {}
+        self._digest = hashlib.sha256()
+        for code in base_files:
+            self.add_base(code, language)
+    
+    def add_base(self, code: str, language: str = 'python') -> None:
+        """Register one template file."""
+        self.sources.append((code, language))
+        self._digest.update(hashlib.sha256(code.encode('utf-8')).digest())
+        self._fingerprints.clear()
+        
+        self.lines.update(line for line in normalized_lines(code, language)
+                          if len(line) >= MIN_LINE_LENGTH)
+        
+        if language == 'python':
+            try:
+                tree = ast.parse(code)
+            except (SyntaxError, ValueError):
+                return
+            for node in ast.walk(tree):
+                if isinstance(node, ast.stmt) and self._large_enough(node):
+                    self.statements.add(statement_key(node))
+    
+    @property
+    def digest(self) -> str:
+        """Hex digest identifying the registered template files."""
+        return self._digest.hexdigest()
+    
+    def __bool__(self) -> bool:
+        return bool(self.sources)
+    
+    @staticmethod
+    def _large_enough(node: ast.stmt) -> bool:
+        """Whether a statement may be removed as boilerplate on its own."""
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return True
+        return sum(1 for _ in ast.walk(node)) >= MIN_STATEMENT_NODES
+    
+    def base_fingerprints(self, fingerprinter) -> Set[int]:
+        """Fingerprints of the template files for a Fingerprinter's k and window."""
+        key = (fingerprinter.k, fingerprinter.window)
+        if key not in self._fingerprints:
+            hashes = set()
+            for code, language in self.sources:
+                hashes.update(fingerprinter.raw_fingerprints(code, language))
+            self._fingerprints[key] = hashes
+        return self._fingerprints[key]
+    
+    def strip(self, code: str, language: str = 'python') -> Dict[str, Any]:
+        """
+        Remove starter code from a file.
+        
+        Args:
+            code: File content
+            language: Programming language of the file
+        
+        Returns:
+            Dictionary with the remaining 'code', 'excluded_lines',
+            'total_lines' (non-blank) and 'excluded_fraction'
+        """
+        lines = code.split('\n')
+        total = sum(1 for line in lines if line.strip())
+        
+        removed = None
+        if language == 'python' and self.statements:
+            try:
+                removed = self._python_removals(ast.parse(code), lines)
+            except (SyntaxError, ValueError):
+                removed = None
+        if removed is None:
+            removed = {index: None for index, line in enumerate(normalized_lines(code, language))
+                       if len(line) >= MIN_LINE_LENGTH and line in self.lines}
+        
+        if not removed:
+            return {'code': code, 'excluded_lines': 0, 'total_lines': total,
+                    'excluded_fraction': 0.0}
+        
+        kept = []
+        excluded = 0
+        for index, line in enumerate(lines):
+            if index not in removed:
+                kept.append(line)
+                continue
+            if line.strip():
+                excluded += 1
+            if removed[index] is not None:
+                kept.append(removed[index])
+        
+        return {
+            'code': '\n'.join(kept),
+            'excluded_lines': excluded,
+            'total_lines': total,
+            'excluded_fraction': excluded / total if total else 0.0
+        }
+    
+    def _python_removals(self, tree: ast.Module, lines: List[str]) -> Dict[int, Optional[str]]:
+        """
+        Lines to drop for boilerplate statements.
+        
+        Returns:
+            Mapping of 0-based line index to None (drop) or a replacement
+            line (the ``pass`` keeping an emptied block valid)
+        """
+        removed = {}
+        
+        def visit_block(body: List[ast.stmt], nested: bool) -> None:
+            first_removed = None
+            kept = 0
+            for stmt in body:
+                if statement_key(stmt) in self.statements and self._owns_lines(stmt, lines):
+                    start = min([stmt.lineno] + [d.lineno for d in getattr(stmt, 'decorator_list', [])])
+                    for index in range(start - 1, stmt.end_lineno):
+                        removed[index] = None
+                    if first_removed is None:
+                        first_removed = (start - 1, stmt.col_offset)
+                else:
+                    kept += 1
+                    for block in _child_blocks(stmt):
+                        visit_block(block, True)
+            if nested and not kept and first_removed is not None:
+                index, indent = first_removed
+                removed[index] = ' ' * indent + 'pass'
+        
+        visit_block(tree.body, False)
+        return removed
+    
+    @staticmethod
+    def _owns_lines(stmt: ast.stmt, lines: List[str]) -> bool:
+        """Whether a statement's lines hold nothing else (no ``a = 1; b = 2``)."""
+        # AST column offsets count UTF-8 bytes
+        first = lines[stmt.lineno - 1].encode('utf-8')
+        last = lines[stmt.end_lineno - 1].encode('utf-8')
+        if first[:stmt.col_offset].strip():
+            return False
+        rest = last[stmt.end_col_offset:].strip()
+        return not rest or rest.startswith(b'#')
@@ -0,0 +1,202 @@
+"""
+Chunked Matcher Module
+======================
+Large-input sequence similarity with content-defined chunking.
+
+difflib.SequenceMatcher is close to quadratic on long strings, and its
+autojunk heuristic discards every character that makes up more than 1% of
+a long input, so a 20k-line generated or vendored file takes seconds to
+minutes per pair and still gets a meaningless ratio. Every string compared
+by the analyzers (preprocessed code, raw code, structure strings) is
+line-oriented, so large inputs are compared in three steps instead:
+
+1. Each text is cut into content-defined chunks of lines. A rolling (gear)
+   hash over the CRC-32 of every line puts a boundary wherever its low bits
+   are zero, so a boundary only depends on the few lines before it and an
+   edit shifts at most the chunks around it.
+2. The chunk sequences are aligned by exact chunk content (one
+   SequenceMatcher over chunk ids, a few hundred items instead of hundreds
+   of thousands of characters).
+3. Only the unmatched neighbourhoods between aligned chunks are compared
+   character by character (or line by line when they are large).
+
+sequence_ratio() picks plain SequenceMatcher.ratio() below a size
+threshold and the chunked comparison above it. Both honour an optional
+TimeBudget (see time_budget): once it is spent, the gaps left are bounded
+by their shared characters and whole comparisons by quick_ratio().
+"""
+
+import zlib
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from time_budget import TimeBudget
+
+
+# Combined length (characters) above which sequence_ratio chunks its inputs
+LARGE_INPUT_THRESHOLD = 60000
+
+# Chunk boundaries: at least MIN_LINES lines, then a boundary where the
+# low MASK_BITS bits of the rolling hash are zero (about 2**MASK_BITS more
+# lines on average), at most MAX_LINES lines
+MIN_LINES = 4
+MASK_BITS = 4
+MAX_LINES = 64
+
+# Gaps whose character-length product exceeds this are matched by lines
+GAP_CHARACTER_BUDGET = 4000000
+
+_HASH_MASK = (1 << 64) - 1
+
+
+@lru_cache(maxsize=16)
+def text_chunks(text: str, min_lines: int = MIN_LINES, mask_bits: int = MASK_BITS,
+                max_lines: int = MAX_LINES) -> Tuple[str, ...]:
+    """
+    Split a text into content-defined chunks of whole lines.
+    
+    Cached per text, so a large file compared against every other file of
+    a batch is only chunked once.
+    
+    Args:
+        text: Line-oriented text
+        min_lines: Fewest lines in a chunk (except the last)
+        mask_bits: Boundary when this many low hash bits are zero
+        max_lines: Most lines in a chunk
+    
+    Returns:
+        Tuple of chunks; every chunk but the last ends with a newline and
+        they concatenate back to ``text``
+    """
+    mask = (1 << mask_bits) - 1
+    lines = text.splitlines(keepends=True)
+    chunks = []
+    start = 0
+    rolling = 0
+    for index, line in enumerate(lines):
+        rolling = ((rolling << 1) + zlib.crc32(line.encode('utf-8'))) & _HASH_MASK
+        size = index + 1 - start
+        if (size >= min_lines and rolling & mask == 0) or size >= max_lines:
+            chunks.append(''.join(lines[start:index + 1]))
+            start = index + 1
+    if start < len(lines):
+        chunks.append(''.join(lines[start:]))
+    return tuple(chunks)
+
+
+def _gap_matches(text1: str, text2: str) -> int:
+    """Matched characters between two unaligned stretches of text."""
+    if not text1 or not text2:
+        return 0
+    if len(text1) * len(text2) <= GAP_CHARACTER_BUDGET:
+        matcher = SequenceMatcher(None, text1, text2, autojunk=False)
+        return sum(block.size for block in matcher.get_matching_blocks())
+    
+    # Too large for characters: align lines, then match characters only
+    # between the aligned lines where that stays within the budget
+    lines1 = text1.splitlines(keepends=True)
+    lines2 = text2.splitlines(keepends=True)
+    matched = 0
+    previous1 = previous2 = 0
+    # Popular lines are only treated as junk when there are too many lines
+    matcher = SequenceMatcher(None, lines1, lines2,
+                              autojunk=len(lines1) * len(lines2) > GAP_CHARACTER_BUDGET)
+    for block in matcher.get_matching_blocks():
+        gap1 = ''.join(lines1[previous1:block.a])
+        gap2 = ''.join(lines2[previous2:block.b])
+        if gap1 and gap2 and len(gap1) * len(gap2) <= GAP_CHARACTER_BUDGET:
+            gap_matcher = SequenceMatcher(None, gap1, gap2, autojunk=False)
+            matched += sum(gap_block.size for gap_block in gap_matcher.get_matching_blocks())
+        matched += sum(len(line) for line in lines1[block.a:block.a + block.size])
+        previous1 = block.a + block.size
+        previous2 = block.b + block.size
+    return matched
+
+
+def _gap_bound(text1: str, text2: str) -> int:
+    """Upper bound on the matched characters of a gap: shared characters."""
+    counts = Counter(text1)
+    return sum(min(count, counts[char]) for char, count in Counter(text2).items())
+
+
+def chunked_ratio(text1: str, text2: str, budget: Optional[TimeBudget] = None,
+                  stage: str = 'sequence_similarity') -> float:
+    """
+    Approximate SequenceMatcher(None, text1, text2).ratio() for large texts.
+    
+    Chunks with identical content are aligned first (in order, as
+    SequenceMatcher would); the stretches between aligned chunks are then
+    matched directly.
+    
+    Args:
+        text1: First text
+        text2: Second text
+        budget: Optional TimeBudget checked before every gap; gaps reached
+            after it is spent only get a shared-character upper bound
+        stage: Stage name recorded in the budget when it degrades
+    
+    Returns:
+        2 * matched characters / total characters (1.0 for two empty texts)
+    """
+    total = len(text1) + len(text2)
+    if not total:
+        return 1.0
+    
+    chunks1 = text_chunks(text1)
+    chunks2 = text_chunks(text2)
+    ids = {}
+    keys1 = [ids.setdefault(chunk, len(ids)) for chunk in chunks1]
+    keys2 = [ids.setdefault(chunk, len(ids)) for chunk in chunks2]
+    
+    matched = 0
+    bounded = False
+    previous1 = previous2 = 0
+    matcher = SequenceMatcher(None, keys1, keys2, autojunk=False)
+    for block in matcher.get_matching_blocks():
+        # Unmatched neighbourhood before this block (the last block is empty)
+        gap1 = ''.join(chunks1[previous1:block.a])
+        gap2 = ''.join(chunks2[previous2:block.b])
+        if budget is not None and gap1 and gap2 and budget.expired:
+            if not bounded:
+                budget.degrade(stage, 'unmatched chunks bounded by shared characters')
+                bounded = True
+            matched += _gap_bound(gap1, gap2)
+        else:
+            matched += _gap_matches(gap1, gap2)
+        matched += sum(len(chunk) for chunk in chunks1[block.a:block.a + block.size])
+        previous1 = block.a + block.size
+        previous2 = block.b + block.size
+    return 2.0 * matched / total
+
+
+def is_large_input(text1: str, text2: str, threshold: int = LARGE_INPUT_THRESHOLD) -> bool:
+    """Whether a pair is compared in chunks by sequence_ratio."""
+    return len(text1) + len(text2) > threshold
+
+
+def sequence_ratio(text1: str, text2: str, threshold: int = LARGE_INPUT_THRESHOLD,
+                   budget: Optional[TimeBudget] = None,
+                   stage: str = 'sequence_similarity') -> float:
+    """
+    Similarity ratio of two texts, chunked when they are large.
+    
+    Args:
+        text1: First text
+        text2: Second text
+        threshold: Combined length above which the chunked comparison is
+            used (None: never)
+        budget: Optional TimeBudget; when it is already spent the
+            quick_ratio() upper bound is returned instead
+        stage: Stage name recorded in the budget when it degrades
+    
+    Returns:
+        Similarity ratio (0.0 to 1.0)
+    """
+    if budget is not None and budget.expired:
+        budget.degrade(stage, 'quick_ratio upper bound')
+        return SequenceMatcher(None, text1, text2).quick_ratio()
+    if threshold is not None and is_large_input(text1, text2, threshold):
+        return chunked_ratio(text1, text2, budget, stage)
+    return SequenceMatcher(None, text1, text2).ratio()
@@ -0,0 +1,311 @@
+"""
+Clone Detector Module
+=====================
+Finds copied functions and blocks across a corpus by hashing AST subtrees.
+
+Every statement and every block of two or more consecutive statements gets
+a Merkle hash computed bottom-up from its node type, its non-identifier
+attributes (operators, attribute names, constant types) and the hashes of
+its children. Variable, function, argument and class names and constant
+values are left out, so renamed copies hash the same.
+
+Fragments of at least ``min_nodes`` AST nodes go into a hash index; equal
+hashes in different files are clones. This is a single pass plus a hash
+join, with no pairwise sequence matching. Only maximal clones are
+reported: a fragment is dropped when all its copies sit inside copies of
+the same enclosing fragment (e.g. the statements of a copied function).
+"""
+
+import ast
+import hashlib
+from array import array
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Smallest fragment (in AST nodes) reported as a clone
+DEFAULT_MIN_NODES = 20
+
+# Fields holding identifiers, which renaming changes
+IDENTIFIER_FIELDS = frozenset({'id', 'name', 'arg', 'asname', 'type_comment'})
+
+
+class SubtreeHasher:
+    """
+    Bottom-up hashing of one Python AST into candidate fragments.
+    
+    After visit(), ``fragments`` holds one list per statement or block:
+    [digest, nodes, first line, last line, parent fragment index or None,
+    is block].
+    """
+    
+    def __init__(self):
+        self.fragments: List[List[Any]] = []
+    
+    def _open(self, first: int, last: int, parent: Optional[int], block: bool = False) -> int:
+        """Reserve a fragment record before its children are visited."""
+        self.fragments.append([None, 0, first, last, parent, block])
+        return len(self.fragments) - 1
+    
+    def visit(self, node: ast.AST, parent: Optional[int] = None) -> Tuple[bytes, int]:
+        """
+        Hash a subtree, recording its statements and blocks as fragments.
+        
+        Args:
+            node: AST node
+            parent: Index of the enclosing fragment
+        
+        Returns:
+            (digest, node count) of the subtree
+        """
+        fragment = None
+        if isinstance(node, ast.stmt):
+            first = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+            fragment = parent = self._open(first, node.end_lineno, parent)
+        
+        digest = hashlib.blake2b(type(node).__name__.encode('utf-8'), digest_size=16)
+        size = 1
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, ast.expr_context):
+                digest.update(type(value).__name__.encode('utf-8'))
+            elif isinstance(value, ast.AST):
+                child, child_size = self.visit(value, parent)
+                digest.update(field.encode('utf-8') + child)
+                size += child_size
+            elif isinstance(value, list):
+                digest.update(f'[{field}:{len(value)}]'.encode('utf-8'))
+                if value and isinstance(value[0], ast.stmt):
+                    child, child_size = self.visit_block(value, parent)
+                    digest.update(child)
+                    size += child_size
+                    continue
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        child, child_size = self.visit(item, parent)
+                        digest.update(child)
+                        size += child_size
+            elif field in IDENTIFIER_FIELDS or value is None:
+                continue
+            elif isinstance(node, ast.Constant) and field == 'value':
+                digest.update(f'{field}={type(value).__name__}'.encode('utf-8'))
+            elif field != 'kind':
+                digest.update(f'{field}={value!r}'.encode('utf-8'))
+        
+        result = digest.digest()
+        if fragment is not None:
+            self.fragments[fragment][0:2] = [result, size]
+        return result, size
+    
+    def visit_block(self, body: List[ast.stmt], parent: Optional[int] = None) -> Tuple[bytes, int]:
+        """Hash a statement list; blocks of two or more statements are fragments too."""
+        fragment = None
+        if len(body) > 1:
+            first = min([body[0].lineno] + [d.lineno for d in getattr(body[0], 'decorator_list', [])])
+            fragment = parent = self._open(first, body[-1].end_lineno, parent, block=True)
+        
+        digest = hashlib.blake2b(b'Block', digest_size=16)
+        size = 0
+        for stmt in body:
+            child, child_size = self.visit(stmt, parent)
+            digest.update(child)
+            size += child_size
+        
+        result = digest.digest()
+        if fragment is not None:
+            self.fragments[fragment][0:2] = [result, size]
+        return result, size
+
+
+def subtree_multiset(tree: ast.AST) -> Tuple[array, array]:
+    """
+    Multiset of the statement subtree hashes of a parsed module.
+    
+    Blocks are left out (their hashes depend on statement order), so the
+    multiset does not change when functions or independent statements are
+    reordered.
+    
+    Returns:
+        (uint64 hashes sorted ascending with repeats, uint32 node counts
+        of the same subtrees)
+    """
+    hasher = SubtreeHasher()
+    hasher.visit_block(tree.body)
+    entries = sorted((int.from_bytes(digest[:8], 'little'), size)
+                     for digest, size, _, _, _, block in hasher.fragments if not block)
+    return array('Q', (h for h, _ in entries)), array('I', (size for _, size in entries))
+
+
+def multiset_similarity(hashes1: array, weights1: array,
+                        hashes2: array, weights2: array) -> Tuple[float, float]:
+    """
+    Node-weighted Jaccard and containment of two subtree multisets.
+    
+    One linear merge of the sorted arrays; a subtree occurring twice in one
+    document matches at most twice in the other.
+    
+    Returns:
+        (weighted Jaccard, weighted containment of the smaller document)
+    """
+    total1 = sum(weights1)
+    total2 = sum(weights2)
+    if not total1 or not total2:
+        return 0.0, 0.0
+    
+    shared = 0
+    i = j = 0
+    n1, n2 = len(hashes1), len(hashes2)
+    while i < n1 and j < n2:
+        a, b = hashes1[i], hashes2[j]
+        if a == b:
+            shared += min(weights1[i], weights2[j])
+            i += 1
+            j += 1
+        elif a < b:
+            i += 1
+        else:
+            j += 1
+    return shared / (total1 + total2 - shared), shared / min(total1, total2)
+
+
+class CloneIndex:
+    """
+    Index of subtree hashes across documents, joined into clone classes.
+    """
+    
+    def __init__(self, min_nodes: int = DEFAULT_MIN_NODES):
+        """
+        Args:
+            min_nodes: Smallest fragment (in AST nodes) to index
+        """
+        self.min_nodes = min_nodes
+        self.names: List[str] = []
+        # Per document: (digest, nodes, first line, last line, parent digest,
+        # parent position in the document's hasher output)
+        self.fragments: List[List[Tuple[bytes, int, int, int, Optional[bytes], Optional[int]]]] = []
+        # digest -> [(document id, fragment position)]
+        self.buckets: Dict[bytes, List[Tuple[int, int]]] = {}
+    
+    def add_document(self, name: str, code: str, language: str = 'python') -> int:
+        """
+        Hash a document and index its fragments.
+        
+        Args:
+            name: Document name
+            code: Source code
+            language: Only 'python' is analysed; other documents are skipped
+        
+        Returns:
+            Number of fragments indexed (0 if the code does not parse)
+        """
+        doc_id = len(self.names)
+        self.names.append(name)
+        records = []
+        self.fragments.append(records)
+        if language != 'python':
+            return 0
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return 0
+        
+        hasher = SubtreeHasher()
+        hasher.visit_block(tree.body)
+        fragments = hasher.fragments
+        for digest, size, first, last, parent, _ in fragments:
+            if size < self.min_nodes:
+                continue
+            parent_digest = fragments[parent][0] if parent is not None else None
+            self.buckets.setdefault(digest, []).append((doc_id, len(records)))
+            records.append((digest, size, first, last, parent_digest, parent))
+        return len(records)
+    
+    def clone_classes(self, cross_document: bool = True) -> List[Dict[str, Any]]:
+        """
+        Groups of identical fragments, largest first.
+        
+        Args:
+            cross_document: Only report fragments copied between different
+                documents (False also reports repeats within one file)
+        
+        Returns:
+            List of {'hash', 'nodes', 'fragments': [{'file', 'start_line',
+            'end_line'}]}
+        """
+        classes = []
+        for digest, occurrences in self.buckets.items():
+            if len(occurrences) < 2:
+                continue
+            if cross_document and len({doc_id for doc_id, _ in occurrences}) < 2:
+                continue
+            records = [self.fragments[doc_id][position] for doc_id, position in occurrences]
+            parents = {record[4] for record in records}
+            enclosing = {(doc_id, record[5]) for (doc_id, _), record in zip(occurrences, records)}
+            if len(parents) == 1 and None not in parents and len(enclosing) == len(records):
+                # Every copy lies inside its own copy of the same larger fragment
+                continue
+            classes.append({
+                'hash': digest.hex(),
+                'nodes': records[0][1],
+                'fragments': [{'file': self.names[doc_id], 'start_line': record[2],
+                               'end_line': record[3]}
+                              for (doc_id, _), record in zip(occurrences, records)]
+            })
+        classes.sort(key=lambda c: (-c['nodes'], c['fragments'][0]['file'],
+                                    c['fragments'][0]['start_line']))
+        return classes
+    
+    def clone_pairs(self, cross_document: bool = True,
+                    classes: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Cloned fragments as file/line-range pairs, largest first.
+        
+        Args:
+            cross_document: Skip pairs within one document
+            classes: clone_classes() output to expand (computed if omitted)
+        
+        Returns:
+            List of {'file1', 'lines1', 'file2', 'lines2', 'nodes'} with
+            lines as [start, end] (1-based, inclusive)
+        """
+        pairs = []
+        if classes is None:
+            classes = self.clone_classes(cross_document)
+        for clone in classes:
+            for a, b in combinations(clone['fragments'], 2):
+                if cross_document and a['file'] == b['file']:
+                    continue
+                pairs.append({
+                    'file1': a['file'],
+                    'lines1': [a['start_line'], a['end_line']],
+                    'file2': b['file'],
+                    'lines2': [b['start_line'], b['end_line']],
+                    'nodes': clone['nodes']
+                })
+        return pairs
+
+
+def detect_clones(files: Iterable[Dict[str, str]], language: str = 'python',
+                  min_nodes: int = DEFAULT_MIN_NODES) -> Dict[str, Any]:
+    """
+    Clone report for a set of files.
+    
+    Args:
+        files: Dicts with 'name' and 'content' keys
+        language: Programming language of the files
+        min_nodes: Smallest fragment (in AST nodes) to report
+    
+    Returns:
+        Dictionary with 'clone_classes', 'clone_pairs' and counts
+    """
+    index = CloneIndex(min_nodes=min_nodes)
+    fragments = 0
+    for f in files:
+        fragments += index.add_document(f['name'], f['content'], language)
+    classes = index.clone_classes()
+    return {
+        'files': len(index.names),
+        'indexed_fragments': fragments,
+        'min_nodes': min_nodes,
+        'clone_classes': classes,
+        'clone_pairs': index.clone_pairs(classes=classes)
+    }
@@ -6,17 +6,21 @@ A tool to compute similarity between two code files.
 Features:
 - Accepts two code inputs (via file path or text)
 - Preprocesses code by stripping comments, whitespace, and normalizing casing
-- Uses difflib.SequenceMatcher to compute similarity score
+- Uses difflib.SequenceMatcher to compute similarity score (chunked for large files)
 - AST-based structural analysis for detecting disguised plagiarism
 - Weighted scoring model (70% structure + 30% sequence)
 - Returns a percentage match
 """
 
 import re
-from difflib import SequenceMatcher
 from typing import Union, Optional
 from pathlib import Path
 
+from chunked_matcher import LARGE_INPUT_THRESHOLD, sequence_ratio
+from fingerprint_store import component_version
+from time_budget import TimeBudget, make_budget
+from lexers import has_structure
+
 # Import AST analyzer if available
 try:
     from ast_analyzer import HybridSimilarityAnalyzer
@@ -29,7 +33,7 @@ class CodePreprocessor:
     """Handles preprocessing of code inputs."""
     
     @staticmethod
-    def remove_comments(code: str, language: str = 'auto') -> str:
+    def remove_comments(code: str, language: str = 'auto', keep_lines: bool = False) -> str:
         """
         Remove comments from code.
         Supports common comment styles (C-style, Python-style).
@@ -37,6 +41,8 @@ class CodePreprocessor:
         Args:
             code: The source code string
             language: Language hint ('auto', 'python', 'c', 'java', etc.)
+            keep_lines: Keep the newlines of removed multi-line comments so
+                line numbers still match the original code
         
         Returns:
             Code with comments removed
@@ -46,9 +52,10 @@ class CodePreprocessor:
         code = re.sub(r'#.*?$', '', code, flags=re.MULTILINE)
         
         # Remove multi-line comments (/* */ and ''' ''')
-        code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
-        code = re.sub(r'""".*?"""', '', code, flags=re.DOTALL)
-        code = re.sub(r"'''.*?'''", '', code, flags=re.DOTALL)
+        replacement = (lambda match: '\n' * match.group().count('\n')) if keep_lines else ''
+        code = re.sub(r'/\*.*?\*/', replacement, code, flags=re.DOTALL)
+        code = re.sub(r'""".*?"""', replacement, code, flags=re.DOTALL)
+        code = re.sub(r"'''.*?'''", replacement, code, flags=re.DOTALL)
         
         return code
     
@@ -108,11 +115,58 @@ class CodePreprocessor:
         return code
 
 
+# Cached result of preprocess_version()
+_PREPROCESS_VERSION = None
+
+
+def preprocess_version() -> str:
+    """Version of the preprocessing rules, used to key cached preprocessed code."""
+    global _PREPROCESS_VERSION
+    if _PREPROCESS_VERSION is None:
+        _PREPROCESS_VERSION = component_version(CodePreprocessor)
+    return _PREPROCESS_VERSION
+
+
 class CodeSimilarityAnalyzer:
     """Main analyzer for computing code similarity."""
     
-    def __init__(self):
+    def __init__(self, store=None, large_input_threshold: Optional[int] = LARGE_INPUT_THRESHOLD):
+        """
+        Initialize analyzer.
+        
+        Args:
+            store: Optional FingerprintStore caching preprocessed code
+            large_input_threshold: Combined length (characters) above which
+                pairs are compared in content-defined chunks (see
+                chunked_matcher); None always uses plain SequenceMatcher
+        """
         self.preprocessor = CodePreprocessor()
+        self.store = store
+        self.large_input_threshold = large_input_threshold
+    
+    def preprocess(self, code: str, language: str = 'auto') -> str:
+        """
+        Preprocess code, consulting the fingerprint store if one is set.
+        
+        Args:
+            code: The source code string
+            language: Language hint for comment removal
+        
+        Returns:
+            Fully preprocessed code
+        """
+        if self.store is None:
+            return self.preprocessor.preprocess(code, language)
+        
+        version = preprocess_version()
+        namespace = f"basic:{language}"
+        cached = self.store.get(namespace, version, code)
+        if cached is not None:
+            return cached
+        
+        processed = self.preprocessor.preprocess(code, language)
+        self.store.put(namespace, version, code, processed)
+        return processed
     
     def read_code_input(self, input_data: Union[str, Path]) -> str:
         """
@@ -134,23 +188,28 @@ class CodeSimilarityAnalyzer:
         # Otherwise, treat as direct text input
         return str(input_data)
     
-    def compute_similarity(self, code1: str, code2: str) -> float:
+    def compute_similarity(self, code1: str, code2: str,
+                           budget: Optional[TimeBudget] = None) -> float:
         """
         Compute similarity between two code strings using SequenceMatcher.
         
+        Large pairs (see large_input_threshold) are chunked first, so only
+        the stretches that differ are matched character by character.
+        
         Args:
             code1: First code string (preprocessed)
             code2: Second code string (preprocessed)
+            budget: Optional TimeBudget; a spent budget gives the
+                quick_ratio() upper bound (see chunked_matcher)
         
         Returns:
             Similarity ratio as float (0.0 to 1.0)
         """
-        matcher = SequenceMatcher(None, code1, code2)
-        return matcher.ratio()
+        return sequence_ratio(code1, code2, self.large_input_threshold, budget)
     
     def analyze(self, input1: Union[str, Path], input2: Union[str, Path], 
                 preprocess: bool = True, language: str = 'auto', 
-                mode: str = 'basic') -> dict:
+                mode: str = 'basic', time_budget: Optional[float] = None) -> dict:
         """
         Analyze similarity between two code inputs.
         
@@ -160,6 +219,9 @@ class CodeSimilarityAnalyzer:
             preprocess: Whether to preprocess code (default: True)
             language: Language hint for preprocessing (default: 'auto')
             mode: Analysis mode - 'basic', 'ast', or 'hybrid' (default: 'basic')
+            time_budget: Optional seconds allowed for the comparison; when
+                it runs out cheaper bounds are used and the result is marked
+                'approximate' with 'approximate_reasons'
         
         Returns:
             Dictionary containing:
@@ -178,19 +240,22 @@ class CodeSimilarityAnalyzer:
         original_length2 = len(code2)
         
         # Use AST-based analysis if requested and available
-        if mode in ['ast', 'hybrid'] and AST_AVAILABLE and language == 'python':
-            return self._analyze_with_ast(code1, code2, mode, original_length1, original_length2)
+        if mode in ['ast', 'hybrid'] and AST_AVAILABLE and has_structure(language):
+            return self._analyze_with_ast(code1, code2, mode, original_length1, original_length2,
+                                          language, time_budget)
         
         # Fall back to basic text-based analysis
+        budget = make_budget(time_budget)
+        
         # Preprocess if requested
         if preprocess:
-            code1 = self.preprocessor.preprocess(code1, language)
-            code2 = self.preprocessor.preprocess(code2, language)
+            code1 = self.preprocess(code1, language)
+            code2 = self.preprocess(code2, language)
         
         # Compute similarity
-        similarity = self.compute_similarity(code1, code2)
+        similarity = self.compute_similarity(code1, code2, budget)
         
-        return {
+        result = {
             'mode': 'basic',
             'similarity_score': similarity,
             'similarity_percentage': f"{similarity * 100:.1f}%",
@@ -199,9 +264,14 @@ class CodeSimilarityAnalyzer:
             'preprocessed_code1_length': len(code1),
             'preprocessed_code2_length': len(code2)
         }
+        if budget is not None:
+            budget.annotate(result)
+            budget.finish()
+        return result
     
     def _analyze_with_ast(self, code1: str, code2: str, mode: str, 
-                         len1: int, len2: int) -> dict:
+                         len1: int, len2: int, language: str = 'python',
+                         time_budget: Optional[float] = None) -> dict:
         """
         Analyze using AST-based approach.
         
@@ -211,12 +281,15 @@ class CodeSimilarityAnalyzer:
             mode: 'ast' or 'hybrid'
             len1: Original length of code1
             len2: Original length of code2
+            language: Programming language of both samples
+            time_budget: Optional seconds allowed for the analysis
             
         Returns:
             Dictionary with analysis results
         """
-        analyzer = HybridSimilarityAnalyzer()
-        ast_result = analyzer.analyze(code1, code2)
+        analyzer = HybridSimilarityAnalyzer(store=self.store,
+                                            large_input_threshold=self.large_input_threshold)
+        ast_result = analyzer.analyze(code1, code2, language, time_budget)
         
         # Add basic info
         ast_result['mode'] = mode
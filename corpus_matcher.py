@@ -0,0 +1,151 @@
+"""
+Corpus Matcher Module
+=====================
+Top-k most similar documents of a reference corpus for one file.
+
+Instead of comparing the file against every document, candidates are taken
+from the corpus' SegmentedIndex (shared k-gram fingerprints) and only those
+are confirmed with the regular pairwise scoring (HybridSimilarityAnalyzer
+in hybrid mode), so a query costs a handful of comparisons however large
+the corpus is. Candidates are ranked by IDF-weighted shared fingerprints,
+ignoring corpus-wide idioms (see DocumentFrequency).
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from batch_comparator import BatchComparator
+from batch_result import format_percentage
+from segmented_index import SegmentedIndex
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a perf_counter() reading."""
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def ingest_directory(index: SegmentedIndex, directory: str,
+                     extensions: Iterable[str] = ('py',), label: Optional[str] = None,
+                     language: str = 'python') -> int:
+    """
+    Add the files of a directory tree to a corpus index as one segment.
+    
+    Files already indexed with the same content are skipped, so the call
+    can be repeated at every start-up.
+    
+    Args:
+        index: Corpus index
+        directory: Reference directory
+        extensions: File extensions to include
+        label: Segment label (default: the directory name)
+        language: Language of the files
+    
+    Returns:
+        Number of documents added or replaced
+    """
+    extensions = {extension.lower() for extension in extensions}
+    documents = []
+    for root, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.rsplit('.', 1)[-1].lower() not in extensions:
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, directory).replace(os.sep, '/')
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except UnicodeDecodeError:
+                continue
+            if index.document_source(name) != content:
+                documents.append((name, content))
+    
+    index.add_documents(documents, label=label or os.path.basename(os.path.normpath(directory)),
+                        language=language)
+    return len(documents)
+
+
+class CorpusMatcher:
+    """
+    One-vs-corpus similarity search with index candidates and confirmation.
+    """
+    
+    def __init__(self, index: SegmentedIndex, mode: str = 'hybrid', store=None,
+                 candidate_factor: int = 5, min_candidates: int = 20):
+        """
+        Args:
+            index: Reference corpus index (documents need stored sources)
+            mode: Scoring mode for confirmation ('basic' or 'hybrid')
+            store: Optional FingerprintStore caching prepared documents
+            candidate_factor: Candidates confirmed per requested match
+            min_candidates: Lower bound on confirmed candidates
+        """
+        self.index = index
+        self.comparator = BatchComparator(mode=mode, store=store)
+        self.candidate_factor = candidate_factor
+        self.min_candidates = min_candidates
+    
+    def top_matches(self, content: str, top_k: int = 10, language: str = 'python',
+                    exclude: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Most similar corpus documents to one file.
+        
+        Args:
+            content: File content
+            top_k: Number of matches to return
+            language: Programming language of the file and corpus
+            exclude: Corpus document to leave out (e.g. the file itself
+                when querying an indexed submission)
+        
+        Returns:
+            Dictionary with the ranked matches (confirmed similarity plus
+            the index evidence), counts and per-stage timings in
+            milliseconds
+        """
+        started = time.perf_counter()
+        fingerprints = self.index.fingerprinter.fingerprints(content, language)
+        timings = {'fingerprint_ms': elapsed_ms(started)}
+        
+        stage = time.perf_counter()
+        limit = max(top_k * self.candidate_factor, self.min_candidates)
+        candidates = self.index.score_candidates(fingerprints, top_k=limit + (exclude is not None),
+                                                 weighted=True)
+        candidates = [c for c in candidates if c['name'] != exclude][:limit]
+        timings['candidates_ms'] = elapsed_ms(stage)
+        
+        stage = time.perf_counter()
+        query_doc = self.comparator.prepare_document(content, language)
+        prepared = []
+        for candidate in candidates:
+            source = self.index.document_source(candidate['name'])
+            if source is not None:
+                prepared.append((candidate, self.comparator.prepare_document(source, language)))
+        timings['prepare_ms'] = elapsed_ms(stage)
+        
+        stage = time.perf_counter()
+        matches = []
+        for candidate, doc in prepared:
+            similarity, structure_similarity, identical = self.comparator.compare_prepared(
+                query_doc, doc, language)
+            matches.append({
+                'name': candidate['name'],
+                'segment': candidate['segment'],
+                'similarity': similarity,
+                'percentage': format_percentage(similarity),
+                'structure_similarity': structure_similarity,
+                'identical_structure': identical,
+                'shared_fingerprints': candidate['shared'],
+                'containment': candidate['containment']
+            })
+        matches.sort(key=lambda m: m['similarity'], reverse=True)
+        timings['confirm_ms'] = elapsed_ms(stage)
+        timings['total_ms'] = elapsed_ms(started)
+        
+        return {
+            'language': language,
+            'mode': self.comparator.mode,
+            'corpus_documents': len(self.index),
+            'candidates': len(prepared),
+            'matches': matches[:top_k],
+            'timings': timings
+        }
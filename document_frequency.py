@@ -0,0 +1,151 @@
+"""
+Document Frequency Module
+=========================
+Corpus-level document-frequency (DF) statistics for k-gram fingerprints.
+
+Idioms such as ``for i in range(len(x))`` or the ``__main__`` guard turn up
+in most submissions; their k-grams have huge posting lists and make almost
+every pair look like a candidate. DocumentFrequency counts in how many
+documents each fingerprint occurs (structure and text k-grams alike),
+provides a stop-list of fingerprints above a DF cutoff and smoothed IDF
+weights for candidate scoring, and is updated per added or removed
+document. CandidatePruner uses it to select the pairs of a batch that are
+worth a full comparison.
+"""
+
+import math
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from kgram_index import Fingerprinter
+
+
+class DocumentFrequency:
+    """
+    Incrementally maintained document frequencies with a stop-list cutoff.
+    """
+    
+    def __init__(self, max_df_ratio: float = 0.5, min_documents: int = 20):
+        """
+        Args:
+            max_df_ratio: Fingerprints found in more than this fraction of
+                the documents are stop-listed
+            min_documents: No stop-list below this many documents (in a
+                small class, shared k-grams are more likely copying than
+                idiom)
+        """
+        self.max_df_ratio = max_df_ratio
+        self.min_documents = min_documents
+        self.counts: Dict[int, int] = {}
+        self.documents = 0
+    
+    def add_document(self, fingerprints: Iterable[int]) -> None:
+        """Count one document's fingerprints."""
+        counts = self.counts
+        for key in set(fingerprints):
+            counts[key] = counts.get(key, 0) + 1
+        self.documents += 1
+    
+    def remove_document(self, fingerprints: Iterable[int]) -> None:
+        """Uncount a document previously added with the same fingerprints."""
+        counts = self.counts
+        for key in set(fingerprints):
+            remaining = counts.get(key, 0) - 1
+            if remaining > 0:
+                counts[key] = remaining
+            else:
+                counts.pop(key, None)
+        self.documents = max(self.documents - 1, 0)
+    
+    def document_frequency(self, key: int) -> int:
+        """Number of documents containing a fingerprint."""
+        return self.counts.get(key, 0)
+    
+    @property
+    def cutoff(self) -> Optional[int]:
+        """Highest document frequency that is not stop-listed (None: no stop-list)."""
+        if self.documents < self.min_documents:
+            return None
+        return max(int(self.max_df_ratio * self.documents), 1)
+    
+    def is_stop(self, key: int) -> bool:
+        """Whether a fingerprint is too common to be evidence of copying."""
+        cutoff = self.cutoff
+        return cutoff is not None and self.counts.get(key, 0) > cutoff
+    
+    def stop_list(self) -> List[int]:
+        """All stop-listed fingerprints, sorted."""
+        cutoff = self.cutoff
+        if cutoff is None:
+            return []
+        return sorted(key for key, count in self.counts.items() if count > cutoff)
+    
+    def idf(self, key: int) -> float:
+        """Smoothed inverse document frequency, ln((1 + N) / (1 + df)) + 1."""
+        return math.log((1 + self.documents) / (1 + self.counts.get(key, 0))) + 1.0
+    
+    def filter(self, fingerprints: Iterable[int]) -> List[int]:
+        """Fingerprints that are not stop-listed."""
+        return [key for key in fingerprints if not self.is_stop(key)]
+    
+    def weight(self, fingerprints: Iterable[int]) -> float:
+        """Total IDF weight of the non-stop-listed fingerprints."""
+        return sum(self.idf(key) for key in set(fingerprints) if not self.is_stop(key))
+
+
+class CandidatePruner:
+    """
+    Selects the pairs of a batch that share enough uncommon fingerprints.
+    
+    Pairs that share fewer than ``min_shared`` fingerprints outside the
+    stop-list are skipped by BatchComparator and counted as pruned.
+    """
+    
+    def __init__(self, fingerprinter: Optional[Fingerprinter] = None, max_df_ratio: float = 0.5,
+                 min_documents: int = 20, min_shared: int = 2):
+        """
+        Args:
+            fingerprinter: Fingerprinter for the batch files (default k=5, window=4)
+            max_df_ratio: Stop-list cutoff as a fraction of the batch
+            min_documents: No stop-list below this many files
+            min_shared: Shared non-stop-listed fingerprints a pair needs
+        """
+        self.fingerprinter = fingerprinter or Fingerprinter()
+        self.max_df_ratio = max_df_ratio
+        self.min_documents = min_documents
+        self.min_shared = min_shared
+        self.stats = None
+    
+    def candidate_pairs(self, fingerprint_sets: Sequence[Iterable[int]]) -> Set[Tuple[int, int]]:
+        """
+        Pairs (i < j) of documents sharing at least min_shared fingerprints.
+        
+        Only posting lists of non-stop-listed fingerprints are expanded, so
+        (from min_documents files on) none is longer than the stop-list
+        cutoff and the work grows with the number of real candidates rather
+        than with n squared; every copying ring below the cutoff is kept.
+        The batch statistics are kept in ``stats``.
+        
+        Args:
+            fingerprint_sets: Fingerprints of each document, by index
+        
+        Returns:
+            Set of candidate index pairs
+        """
+        stats = DocumentFrequency(self.max_df_ratio, self.min_documents)
+        for fingerprints in fingerprint_sets:
+            stats.add_document(fingerprints)
+        self.stats = stats
+        
+        postings: Dict[int, List[int]] = {}
+        for doc_id, fingerprints in enumerate(fingerprint_sets):
+            for key in set(fingerprints):
+                if not stats.is_stop(key):
+                    postings.setdefault(key, []).append(doc_id)
+        
+        shared: Dict[Tuple[int, int], int] = {}
+        for doc_ids in postings.values():
+            if len(doc_ids) > 1:
+                for pair in combinations(doc_ids, 2):
+                    shared[pair] = shared.get(pair, 0) + 1
+        return {pair for pair, count in shared.items() if count >= self.min_shared}
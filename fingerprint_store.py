@@ -0,0 +1,164 @@
+"""
+Fingerprint Store
+=================
+Optional on-disk cache of prepared-document data, backed by stdlib sqlite3
+in WAL mode.
+
+Entries are keyed by the SHA-256 of the file content plus a version string
+derived from the source code of the components that produced them
+(ASTNormalizer, CodePreprocessor, ...). Changing any of those components
+changes the version, so stale entries are simply never looked up again.
+"""
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def component_version(*components: Any) -> str:
+    """
+    Version string for a set of analysis components.
+    
+    The source code of each class/function is hashed, so any edit to the
+    normalization or preprocessing rules invalidates cached entries
+    automatically. Components without retrievable source fall back to
+    their qualified name and an optional ``VERSION`` attribute.
+    
+    Args:
+        components: Classes or functions that shape the cached data
+    
+    Returns:
+        Short hex digest
+    """
+    digest = hashlib.sha256()
+    for component in components:
+        try:
+            source = inspect.getsource(component)
+        except (OSError, TypeError):
+            source = f"{getattr(component, '__module__', '')}." \
+                     f"{getattr(component, '__qualname__', repr(component))}:" \
+                     f"{getattr(component, 'VERSION', '')}"
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a file's content."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """
+    SQLite-backed cache mapping (namespace, version, content hash) to
+    JSON-serializable prepared-document data.
+    
+    Safe to share between threads (one connection per thread) and between
+    processes on the same machine (WAL journal).
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) a fingerprint store.
+        
+        Args:
+            path: SQLite database file path
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints ('
+            ' key TEXT PRIMARY KEY,'
+            ' namespace TEXT NOT NULL,'
+            ' data TEXT NOT NULL,'
+            ' created REAL NOT NULL)'
+        )
+        self._connection().commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+    
+    @staticmethod
+    def make_key(namespace: str, version: str, content: str) -> str:
+        """Cache key for one document."""
+        return f"{namespace}:{version}:{content_hash(content)}"
+    
+    def get(self, namespace: str, version: str, content: str) -> Optional[Any]:
+        """
+        Look up cached data for a document.
+        
+        Args:
+            namespace: Kind of data (e.g. 'hybrid', 'basic:python')
+            version: Version string from component_version
+            content: File content
+        
+        Returns:
+            Decoded data, or None on a miss
+        """
+        row = self._connection().execute(
+            'SELECT data FROM fingerprints WHERE key = ?',
+            (self.make_key(namespace, version, content),)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, namespace: str, version: str, content: str, data: Any) -> None:
+        """
+        Store data for a document.
+        
+        Args:
+            namespace: Kind of data
+            version: Version string from component_version
+            content: File content
+            data: JSON-serializable data
+        """
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO fingerprints (key, namespace, data, created) '
+            'VALUES (?, ?, ?, ?)',
+            (self.make_key(namespace, version, content), namespace,
+             json.dumps(data, separators=(',', ':')), time.time())
+        )
+        connection.commit()
+    
+    def purge_stale(self, namespace: str, version: str) -> int:
+        """
+        Delete entries of a namespace written by other component versions.
+        
+        Returns:
+            Number of deleted entries
+        """
+        connection = self._connection()
+        cursor = connection.execute(
+            'DELETE FROM fingerprints WHERE namespace = ? AND key NOT LIKE ?',
+            (namespace, f"{namespace}:{version}:%")
+        )
+        connection.commit()
+        return cursor.rowcount
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process and the number of stored entries."""
+        entries = self._connection().execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+    
+    def close(self) -> None:
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
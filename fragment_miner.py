@@ -0,0 +1,357 @@
+"""
+Fragment Miner Module
+=====================
+Shared-fragment mining over a whole batch with a generalized suffix array.
+
+The normalized token streams of all documents (placeholder-free structure
+tokens for Python and lexer-supported languages, preprocessed text tokens
+otherwise, as in kgram_index) are mapped to integer ids and concatenated, each document
+followed by a separator id of its own so no match crosses a document
+boundary. One suffix array (prefix doubling with counting sorts,
+O(N log N) in the total token count N) and its LCP array (Kasai, O(N))
+then give every repeated token run at once, without comparing pairs.
+
+A fragment is a maximal repeat of at least ``min_length`` tokens (it cannot
+be extended left or right in all its occurrences) found in two or more
+documents. Per-pair shared coverage, the fraction of both documents' tokens
+lying in fragments they share, can rank candidate pairs (FragmentPruner)
+or serve as the final score (BatchComparator.compare_fragments).
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from kgram_index import located_structure_tokens, located_text_tokens
+
+
+def suffix_array(values: Sequence[int]) -> array:
+    """
+    Suffix array by prefix doubling with counting sorts.
+    
+    Args:
+        values: Integer string; every value must be >= 0
+    
+    Returns:
+        uint32 array of suffix start positions in lexicographic order
+    """
+    n = len(values)
+    if not n:
+        return array('I')
+    
+    # Dense initial ranks
+    alphabet = {value: rank for rank, value in enumerate(sorted(set(values)))}
+    rank = [alphabet[value] for value in values]
+    order = sorted(range(n), key=rank.__getitem__)
+    classes = len(alphabet)
+    
+    step = 1
+    while classes < n:
+        # Order by the second half: suffixes without one come first
+        second = list(range(n - step, n))
+        second.extend(position - step for position in order if position >= step)
+        
+        # Stable counting sort by the first half
+        starts = [0] * (classes + 1)
+        for r in rank:
+            starts[r + 1] += 1
+        for r in range(classes):
+            starts[r + 1] += starts[r]
+        for position in second:
+            r = rank[position]
+            order[starts[r]] = position
+            starts[r] += 1
+        
+        new_rank = [0] * n
+        classes = 1
+        previous = order[0]
+        for position in order[1:]:
+            if (rank[position] != rank[previous] or
+                    (rank[position + step] if position + step < n else -1) !=
+                    (rank[previous + step] if previous + step < n else -1)):
+                classes += 1
+            new_rank[position] = classes - 1
+            previous = position
+        rank = new_rank
+        step *= 2
+    return array('I', order)
+
+
+def lcp_array(values: Sequence[int], order: Sequence[int]) -> array:
+    """
+    Longest common prefix of every suffix with its predecessor (Kasai).
+    
+    Returns:
+        uint32 array; entry i is the LCP of order[i - 1] and order[i]
+        (entry 0 is 0)
+    """
+    n = len(values)
+    rank = [0] * n
+    for i, position in enumerate(order):
+        rank[position] = i
+    lcp = array('I', [0]) * n
+    h = 0
+    for position in range(n):
+        r = rank[position]
+        if r:
+            other = order[r - 1]
+            while (position + h < n and other + h < n and
+                   values[position + h] == values[other + h]):
+                h += 1
+            lcp[r] = h
+            if h:
+                h -= 1
+        else:
+            h = 0
+    return lcp
+
+
+def _merged_length(intervals: List[Tuple[int, int]]) -> int:
+    """Total length covered by half-open intervals."""
+    total = 0
+    end = -1
+    for start, stop in sorted(intervals):
+        if stop <= end:
+            continue
+        total += stop - max(start, end)
+        end = stop
+    return total
+
+
+class FragmentMiner:
+    """
+    Maximal shared fragments of a batch of documents.
+    """
+    
+    def __init__(self, min_length: int = 20, max_df_ratio: float = 0.5,
+                 min_documents: int = 20):
+        """
+        Args:
+            min_length: Shortest reported fragment, in tokens
+            max_df_ratio: Fragments found in more than this fraction of the
+                documents are idioms; they are reported (flagged 'common')
+                but do not count towards pair coverage
+            min_documents: No idiom cutoff below this many documents
+        """
+        self.min_length = min_length
+        self.max_df_ratio = max_df_ratio
+        self.min_documents = min_documents
+        self.names: List[str] = []
+        # Concatenated token ids and the source line of every token
+        self.values = array('I')
+        self.lines = array('I')
+        # Start offset and token count of every document
+        self.starts: List[int] = []
+        self.lengths: List[int] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._next_id = 0
+        self._built = None
+    
+    def _token_id(self, token: str) -> int:
+        """Integer id of a token, assigned on first sight."""
+        token_id = self._vocabulary.get(token)
+        if token_id is None:
+            token_id = self._vocabulary[token] = self._next_id
+            self._next_id += 1
+        return token_id
+    
+    def add_document(self, name: str, code: str, language: str = 'python') -> int:
+        """
+        Append a document's normalized token stream.
+        
+        Args:
+            name: Document name
+            code: Source code
+            language: Python and languages with a registered lexer use
+                structure tokens (text tokens if the code does not parse);
+                other languages use text tokens
+        
+        Returns:
+            Number of tokens added
+        """
+        located = located_structure_tokens(code, language)
+        if located is None:
+            located = located_text_tokens(code, language)
+        tokens, token_lines = located
+        
+        self.names.append(name)
+        self.starts.append(len(self.values))
+        self.lengths.append(len(tokens))
+        self.values.extend(self._token_id(token) for token in tokens)
+        self.lines.extend(token_lines)
+        # A separator of its own: equal to nothing else
+        self.values.append(self._next_id)
+        self.lines.append(0)
+        self._next_id += 1
+        self._built = None
+        return len(tokens)
+    
+    def build(self) -> Tuple[array, array]:
+        """Suffix and LCP arrays of the concatenated streams (built once)."""
+        if self._built is None:
+            order = suffix_array(self.values)
+            self._built = order, lcp_array(self.values, order)
+        return self._built
+    
+    def document_of(self, position: int) -> int:
+        """Document containing a global token position."""
+        return bisect_right(self.starts, position) - 1
+    
+    @property
+    def common_cutoff(self) -> Optional[int]:
+        """Most documents a fragment may span before it counts as an idiom."""
+        if len(self.names) < self.min_documents:
+            return None
+        return max(int(self.max_df_ratio * len(self.names)), 2)
+    
+    def iter_repeats(self) -> Iterable[Tuple[int, List[int]]]:
+        """
+        Maximal repeats of at least min_length tokens in 2+ documents.
+        
+        Walks the LCP intervals bottom-up with a stack; an interval is a
+        right-maximal repeat, and is kept if its occurrences are not all
+        preceded by the same token.
+        
+        Yields:
+            (length, sorted start positions)
+        """
+        order, lcp = self.build()
+        values = self.values
+        n = len(order)
+        stack = [(0, 0)]
+        for i in range(1, n + 1):
+            current = lcp[i] if i < n else 0
+            left = i - 1
+            while current < stack[-1][0]:
+                depth, left = stack.pop()
+                if depth < self.min_length:
+                    continue
+                positions = order[left:i]
+                preceding = {values[p - 1] if p else -1 for p in positions}
+                if len(preceding) == 1 and -1 not in preceding:
+                    continue
+                if len({self.document_of(p) for p in positions}) > 1:
+                    yield depth, sorted(positions)
+            if current > stack[-1][0]:
+                stack.append((current, left))
+    
+    def fragments(self) -> List[Dict[str, Any]]:
+        """
+        Maximal shared fragments, longest first.
+        
+        Returns:
+            List of {'length' (tokens), 'documents', 'common', 'occurrences':
+            [{'file', 'start_line', 'end_line'}]}
+        """
+        cutoff = self.common_cutoff
+        found = []
+        for length, positions in self.iter_repeats():
+            documents = sorted({self.document_of(p) for p in positions})
+            found.append({
+                'length': length,
+                'documents': [self.names[d] for d in documents],
+                'common': cutoff is not None and len(documents) > cutoff,
+                'occurrences': [{'file': self.names[self.document_of(p)],
+                                 'start_line': self.lines[p],
+                                 'end_line': self.lines[p + length - 1]}
+                                for p in positions]
+            })
+        found.sort(key=lambda f: (-f['length'], f['occurrences'][0]['file'],
+                                  f['occurrences'][0]['start_line']))
+        return found
+    
+    def pair_coverage(self) -> Dict[Tuple[int, int], float]:
+        """
+        Shared coverage of every pair of documents with a common fragment.
+        
+        Returns:
+            Mapping of (i, j), i < j, to (tokens of i covered by fragments
+            shared with j + tokens of j covered by fragments shared with i)
+            / (tokens of i + tokens of j)
+        """
+        cutoff = self.common_cutoff
+        # (i, j) -> (intervals in i, intervals in j)
+        covered: Dict[Tuple[int, int], Tuple[List, List]] = {}
+        for length, positions in self.iter_repeats():
+            by_document: Dict[int, List[Tuple[int, int]]] = {}
+            for p in positions:
+                by_document.setdefault(self.document_of(p), []).append((p, p + length))
+            if cutoff is not None and len(by_document) > cutoff:
+                continue
+            documents = sorted(by_document)
+            for a, i in enumerate(documents):
+                for j in documents[a + 1:]:
+                    intervals = covered.setdefault((i, j), ([], []))
+                    intervals[0].extend(by_document[i])
+                    intervals[1].extend(by_document[j])
+        
+        return {(i, j): (_merged_length(first) + _merged_length(second)) /
+                        (self.lengths[i] + self.lengths[j])
+                for (i, j), (first, second) in covered.items()}
+    
+    def candidate_pairs(self, min_coverage: float = 0.0) -> Set[Tuple[int, int]]:
+        """Pairs whose shared coverage exceeds min_coverage."""
+        return {pair for pair, score in self.pair_coverage().items() if score > min_coverage}
+
+
+class FragmentPruner:
+    """
+    Candidate selection for BatchComparator from shared-fragment coverage.
+    
+    Used like CandidatePruner: pairs sharing no fragment, or covering less
+    than ``min_coverage`` of their tokens with shared fragments, are skipped.
+    """
+    
+    def __init__(self, min_length: int = 20, min_coverage: float = 0.0):
+        """
+        Args:
+            min_length: Shortest counted fragment, in tokens
+            min_coverage: Shared coverage a pair must exceed
+        """
+        self.min_length = min_length
+        self.min_coverage = min_coverage
+    
+    def candidate_pairs(self, documents: Sequence[str], language: str = 'python') -> Set[Tuple[int, int]]:
+        """
+        Pairs worth a full comparison.
+        
+        Args:
+            documents: Source code of every file
+            language: Programming language of the files
+        
+        Returns:
+            Set of (i, j) index pairs, i < j
+        """
+        miner = FragmentMiner(min_length=self.min_length)
+        for index, code in enumerate(documents):
+            miner.add_document(str(index), code, language)
+        return miner.candidate_pairs(self.min_coverage)
+
+
+def mine_fragments(files: Iterable[Dict[str, str]], language: str = 'python',
+                   min_length: int = 20) -> Dict[str, Any]:
+    """
+    Shared-fragment report for a set of files.
+    
+    Args:
+        files: Dicts with 'name' and 'content' keys
+        language: Programming language of the files
+        min_length: Shortest reported fragment, in tokens
+    
+    Returns:
+        Dictionary with 'fragments', per-pair 'pair_coverage' (best first)
+        and counts
+    """
+    miner = FragmentMiner(min_length=min_length)
+    for f in files:
+        miner.add_document(f['name'], f['content'], language)
+    coverage = sorted(miner.pair_coverage().items(), key=lambda item: (-item[1], item[0]))
+    return {
+        'files': len(miner.names),
+        'tokens': sum(miner.lengths),
+        'min_length': min_length,
+        'fragments': miner.fragments(),
+        'pair_coverage': [{'file1': miner.names[i], 'file2': miner.names[j],
+                           'coverage': score, 'percentage': f"{score * 100:.1f}%"}
+                          for (i, j), score in coverage]
+    }
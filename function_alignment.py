@@ -0,0 +1,434 @@
+"""
+Function Alignment Module
+=========================
+Function-level alignment between two Python files.
+
+Each file is split into units: top-level functions, methods (named
+``Class.method``) and the class-level code of every class outside its
+methods. Units of one file are scored against units of the other with the
+hybrid weighting (normalized structure plus text), and the best one-to-one
+matching is found with the Hungarian algorithm. This shows which functions
+were copied even when the rest of the file differs. FunctionIndex does the
+same across a whole corpus without comparing every unit pair.
+
+Most unit pairs are never fully scored:
+
+- units with identical normalized structure hashes are matched first and
+  leave the pool;
+- for the remaining pairs, SequenceMatcher's real_quick_ratio() and
+  quick_ratio() upper bounds are combined into an upper bound of the pair
+  score, and pairs that cannot reach ``min_score`` are pruned before any
+  ratio() call.
+"""
+
+import ast
+import textwrap
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ast_analyzer import ASTNormalizer, ASTStructureAnalyzer
+from document_frequency import DocumentFrequency
+from kgram_index import PLACEHOLDER_PATTERN, kgram_hashes, winnow
+
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _unit(analyzer: ASTStructureAnalyzer, name: str, kind: str, nodes: List[ast.AST],
+          lines: List[str]) -> Dict[str, Any]:
+    """Normalized structure, hash and dedented text of one unit."""
+    normalizer = ASTNormalizer()
+    for node in nodes:
+        normalizer.visit(node)
+    features = analyzer.analyze_code_features(ast.Module(body=list(nodes), type_ignores=[]))
+    start = min([nodes[0].lineno] + [d.lineno for d in getattr(nodes[0], 'decorator_list', [])])
+    end = max(node.end_lineno for node in nodes)
+    return {
+        'name': name,
+        'kind': kind,
+        'start_line': start,
+        'end_line': end,
+        'size': len(normalizer.structure),
+        'structure_string': analyzer.structure_to_string(normalizer.structure),
+        'structure_hash': analyzer.get_structure_hash(normalizer.structure),
+        'features': features,
+        'text': textwrap.dedent('\n'.join(lines[start - 1:end]))
+    }
+
+
+def extract_units(code: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Split a Python file into alignment units.
+    
+    Args:
+        code: Python source code
+    
+    Returns:
+        Units in source order (see module docstring), or None if the code
+        does not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    
+    analyzer = ASTStructureAnalyzer()
+    lines = code.split('\n')
+    units = []
+    for node in tree.body:
+        if isinstance(node, FUNCTION_NODES):
+            units.append(_unit(analyzer, node.name, 'function', [node], lines))
+        elif isinstance(node, ast.ClassDef):
+            methods = [item for item in node.body if isinstance(item, FUNCTION_NODES)]
+            rest = [item for item in node.body if not isinstance(item, FUNCTION_NODES)]
+            if rest:
+                units.append(_unit(analyzer, node.name, 'class', rest, lines))
+            for method in methods:
+                units.append(_unit(analyzer, f'{node.name}.{method.name}', 'method', [method], lines))
+    return units
+
+
+def best_assignment(scores: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """
+    Maximum-weight one-to-one assignment (Hungarian algorithm, O(n^2 m)).
+    
+    Args:
+        scores: Matrix of pair scores (rows x columns, any shape)
+    
+    Returns:
+        (row, column) pairs; every row or every column is assigned
+    """
+    if not scores or not scores[0]:
+        return []
+    transposed = len(scores) > len(scores[0])
+    if transposed:
+        scores = [list(column) for column in zip(*scores)]
+    n, m = len(scores), len(scores[0])
+    infinity = float('inf')
+    
+    # Potentials-based shortest augmenting paths on costs = -score
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_slack = [infinity] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[column] = True
+            current = owner[column]
+            delta = infinity
+            next_column = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                slack = -scores[current - 1][j - 1] - u[current] - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = column
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_column = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+    
+    pairs = [(owner[j] - 1, j - 1) for j in range(1, m + 1) if owner[j]]
+    if transposed:
+        pairs = [(j, i) for i, j in pairs]
+    return sorted(pairs)
+
+
+def _public(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Unit fields included in results."""
+    return {key: unit[key] for key in ('name', 'kind', 'start_line', 'end_line')}
+
+
+def _bounded_score(structure: SequenceMatcher, text: SequenceMatcher, structure_weight: float,
+                   sequence_weight: float, min_score: float) -> Optional[Tuple[float, float]]:
+    """
+    Weighted score of one unit pair, unless its upper bounds rule it out.
+    
+    Returns:
+        (score, structure similarity), or None if the pair cannot reach
+        min_score
+    """
+    bound = structure_weight * structure.real_quick_ratio() + sequence_weight * text.real_quick_ratio()
+    if bound >= min_score:
+        bound = structure_weight * structure.quick_ratio() + sequence_weight * text.quick_ratio()
+    if bound < min_score:
+        return None
+    structure_similarity = structure.ratio()
+    return structure_weight * structure_similarity + sequence_weight * text.ratio(), structure_similarity
+
+
+def align_units(units1: List[Dict[str, Any]], units2: List[Dict[str, Any]],
+                structure_weight: float = 0.7, sequence_weight: float = 0.3,
+                min_score: float = 0.5) -> Dict[str, Any]:
+    """
+    Align the units of two files.
+    
+    Args:
+        units1: extract_units() of the first file
+        units2: extract_units() of the second file
+        structure_weight: Weight of normalized structure similarity
+        sequence_weight: Weight of text similarity
+        min_score: Pairs scoring below this are not matched
+    
+    Returns:
+        Dictionary with matched 'pairs' (best first), 'unmatched1',
+        'unmatched2', size-weighted 'coverage1'/'coverage2' (share of each
+        file's structure in matched units) and 'comparisons' counters
+    """
+    counts = {'hash_matches': 0, 'pruned': 0, 'scored': 0}
+    matched = []
+    
+    # Identical normalized structure: match immediately, in source order
+    remaining2 = list(range(len(units2)))
+    remaining1 = []
+    for i, unit in enumerate(units1):
+        twin = next((j for j in remaining2 if units2[j]['structure_hash'] == unit['structure_hash']), None)
+        if twin is None:
+            remaining1.append(i)
+            continue
+        remaining2.remove(twin)
+        text = SequenceMatcher(None, unit['text'], units2[twin]['text']).ratio()
+        matched.append((i, twin, structure_weight + sequence_weight * text, 1.0, True))
+        counts['hash_matches'] += 1
+    
+    scores = [[0.0] * len(remaining2) for _ in remaining1]
+    structure_scores = {}
+    for column, j in enumerate(remaining2):
+        unit2 = units2[j]
+        # SequenceMatcher caches its index of the second sequence
+        structure = SequenceMatcher(None, '', unit2['structure_string'])
+        text = SequenceMatcher(None, '', unit2['text'])
+        for row, i in enumerate(remaining1):
+            unit1 = units1[i]
+            structure.set_seq1(unit1['structure_string'])
+            text.set_seq1(unit1['text'])
+            scored = _bounded_score(structure, text, structure_weight, sequence_weight, min_score)
+            if scored is None:
+                counts['pruned'] += 1
+                continue
+            scores[row][column], structure_scores[row, column] = scored
+            counts['scored'] += 1
+    
+    for row, column in best_assignment(scores):
+        score = scores[row][column]
+        if score >= min_score:
+            matched.append((remaining1[row], remaining2[column], score,
+                            structure_scores[row, column], False))
+    
+    matched.sort(key=lambda m: m[2], reverse=True)
+    paired1 = {m[0] for m in matched}
+    paired2 = {m[1] for m in matched}
+    
+    def coverage(units, paired):
+        total = sum(unit['size'] for unit in units)
+        return sum(units[i]['size'] for i in paired) / total if total else 0.0
+    
+    return {
+        'pairs': [{
+            'unit1': _public(units1[i]),
+            'unit2': _public(units2[j]),
+            'similarity': score,
+            'percentage': f"{score * 100:.1f}%",
+            'structure_similarity': structure_similarity,
+            'identical_structure': identical
+        } for i, j, score, structure_similarity, identical in matched],
+        'unmatched1': [_public(unit) for i, unit in enumerate(units1) if i not in paired1],
+        'unmatched2': [_public(unit) for j, unit in enumerate(units2) if j not in paired2],
+        'coverage1': coverage(units1, paired1),
+        'coverage2': coverage(units2, paired2),
+        'comparisons': counts
+    }
+
+
+class FunctionIndex:
+    """
+    Corpus-wide index of function-level units for partial-copy detection.
+    
+    Every unit of every document is indexed by its normalized structure
+    hash and by winnowed k-grams of its placeholder-free structure tokens.
+    Cross-document matches are found by hash lookup only: units sharing a
+    structure hash are renamed copies; units sharing enough k-grams that are
+    not stop-listed (see DocumentFrequency) are candidates, which must also
+    pass a feature-vector check and the score upper bounds before they are
+    scored like align_units() pairs.
+    """
+    
+    def __init__(self, min_size: int = 10, min_score: float = 0.75,
+                 structure_weight: float = 0.7, sequence_weight: float = 0.3,
+                 k: int = 5, window: int = 4, min_overlap: float = 0.3,
+                 min_feature_similarity: float = 0.5, max_df_ratio: float = 0.5,
+                 min_documents: int = 20):
+        """
+        Args:
+            min_size: Smallest unit (in structure entries) to index
+            min_score: Matches scoring below this are not reported
+            structure_weight: Weight of normalized structure similarity
+            sequence_weight: Weight of text similarity
+            k: Structure tokens per k-gram
+            window: Winnowing window
+            min_overlap: Fraction of the smaller unit's k-grams a candidate
+                pair must share
+            min_feature_similarity: Candidates whose code feature vectors
+                are less similar than this are dropped unscored
+            max_df_ratio: K-grams found in more than this fraction of the
+                documents are ignored
+            min_documents: No k-gram stop-list below this many documents
+        """
+        self.min_size = min_size
+        self.min_score = min_score
+        self.structure_weight = structure_weight
+        self.sequence_weight = sequence_weight
+        self.k = k
+        self.window = window
+        self.min_overlap = min_overlap
+        self.min_feature_similarity = min_feature_similarity
+        self.names: List[str] = []
+        # Per indexed unit: (document id, unit dict, k-gram set)
+        self.units: List[Tuple[int, Dict[str, Any], frozenset]] = []
+        self.by_hash: Dict[str, List[int]] = {}
+        self.by_kgram: Dict[int, List[int]] = {}
+        self.stats = DocumentFrequency(max_df_ratio, min_documents)
+        self._features = ASTStructureAnalyzer()
+    
+    def __len__(self) -> int:
+        return len(self.units)
+    
+    def _kgrams(self, unit: Dict[str, Any]) -> frozenset:
+        """Winnowed k-grams of a unit's placeholder-free structure tokens."""
+        tokens = PLACEHOLDER_PATTERN.sub(r'\1', unit['structure_string']).split('\n')
+        return frozenset(h for _, h in winnow(kgram_hashes(tokens, self.k), self.window))
+    
+    def add_document(self, name: str, code: str, language: str = 'python') -> int:
+        """
+        Index the units of one document.
+        
+        Args:
+            name: Document name
+            code: Source code
+            language: Only 'python' is split into units; other documents
+                are registered without units
+        
+        Returns:
+            Number of units indexed (0 if the code does not parse)
+        """
+        doc_id = len(self.names)
+        self.names.append(name)
+        units = extract_units(code) if language == 'python' else None
+        
+        document_kgrams = set()
+        indexed = 0
+        for unit in units or []:
+            if unit['size'] < self.min_size:
+                continue
+            kgrams = self._kgrams(unit)
+            unit_id = len(self.units)
+            self.units.append((doc_id, unit, kgrams))
+            self.by_hash.setdefault(unit['structure_hash'], []).append(unit_id)
+            for key in kgrams:
+                self.by_kgram.setdefault(key, []).append(unit_id)
+            document_kgrams.update(kgrams)
+            indexed += 1
+        self.stats.add_document(document_kgrams)
+        return indexed
+    
+    def candidate_pairs(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Cross-document unit pairs found by hash lookup.
+        
+        Returns:
+            (pairs with identical structure hashes, other pairs sharing
+            enough non-stop-listed k-grams), each as sorted (unit id,
+            unit id) tuples
+        """
+        units = self.units
+        identical = set()
+        for bucket in self.by_hash.values():
+            for position, a in enumerate(bucket):
+                for b in bucket[position + 1:]:
+                    if units[a][0] != units[b][0]:
+                        identical.add((a, b))
+        
+        shared: Dict[Tuple[int, int], int] = {}
+        for key, postings in self.by_kgram.items():
+            if len(postings) < 2 or self.stats.is_stop(key):
+                continue
+            for position, a in enumerate(postings):
+                for b in postings[position + 1:]:
+                    if units[a][0] != units[b][0]:
+                        shared[a, b] = shared.get((a, b), 0) + 1
+        
+        similar = []
+        for (a, b), count in shared.items():
+            if (a, b) in identical:
+                continue
+            smaller = min(len(units[a][2]), len(units[b][2]))
+            if count >= max(self.min_overlap * smaller, 1):
+                similar.append((a, b))
+        return sorted(identical), sorted(similar)
+    
+    def matches(self) -> Dict[str, Any]:
+        """
+        Confirmed cross-document function matches, best first.
+        
+        Returns:
+            Dictionary with 'matches' (each with 'file1', 'unit1', 'file2',
+            'unit2', 'similarity', 'percentage', 'structure_similarity' and
+            'identical_structure'; identical structures are always
+            reported) and 'comparisons' counters
+        """
+        identical, similar = self.candidate_pairs()
+        counts = {'units': len(self.units), 'hash_matches': len(identical),
+                  'candidates': len(similar), 'feature_rejected': 0, 'pruned': 0, 'scored': 0}
+        found = []
+        
+        for a, b in identical:
+            text = SequenceMatcher(None, self.units[a][1]['text'], self.units[b][1]['text']).ratio()
+            found.append((a, b, self.structure_weight + self.sequence_weight * text, 1.0, True))
+        
+        for a, b in similar:
+            unit1, unit2 = self.units[a][1], self.units[b][1]
+            features = self._features.compute_feature_similarity(unit1['features'], unit2['features'])
+            if features < self.min_feature_similarity:
+                counts['feature_rejected'] += 1
+                continue
+            scored = _bounded_score(SequenceMatcher(None, unit1['structure_string'], unit2['structure_string']),
+                                    SequenceMatcher(None, unit1['text'], unit2['text']),
+                                    self.structure_weight, self.sequence_weight, self.min_score)
+            if scored is None:
+                counts['pruned'] += 1
+                continue
+            counts['scored'] += 1
+            found.append((a, b) + scored + (False,))
+        
+        found.sort(key=lambda m: (-m[2], m[0], m[1]))
+        return {
+            'matches': [{
+                'file1': self.names[self.units[a][0]],
+                'unit1': _public(self.units[a][1]),
+                'file2': self.names[self.units[b][0]],
+                'unit2': _public(self.units[b][1]),
+                'similarity': score,
+                'percentage': f"{score * 100:.1f}%",
+                'structure_similarity': structure_similarity,
+                'identical_structure': same
+            } for a, b, score, structure_similarity, same in found
+                if same or score >= self.min_score],
+            'comparisons': counts
+        }
@@ -0,0 +1,725 @@
+"""
+K-gram Index Module
+===================
+Fingerprinting of normalized token streams and a compressed, memory-mapped
+inverted index from k-gram hashes to the documents containing them.
+
+Fingerprints are 64-bit hashes of k consecutive tokens, taken from the
+normalized structure (ASTNormalizer, or a registered lexer for non-Python
+languages, via HybridSimilarityAnalyzer.prepare) and from the preprocessed
+text (CodePreprocessor), thinned out by winnowing.
+Placeholder numbers (VAR_3 -> VAR) are dropped from structure tokens, so a
+fragment hashes the same wherever it appears in a file.
+
+Index file layout (little-endian, sections 8-byte aligned):
+    header      magic, format, k, window, document count, key count and
+                the byte offsets of every section below
+    names       uint64 offsets[document count + 1] + UTF-8 name blob
+    counts      uint32 fingerprints per document
+    keys        uint64 sorted k-gram hashes
+    dfs         uint32 document frequency per key
+    offsets     uint64 postings offsets[key count + 1]
+    postings    per key: delta-encoded document ids as LEB128 varints
+"""
+
+import ast
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ast_analyzer import ASTNormalizer, HybridSimilarityAnalyzer
+from code_similarity import CodePreprocessor
+from lexers import get_lexer, has_structure
+
+
+INDEX_MAGIC = b'CIDEKGI1'
+INDEX_FORMAT = 2
+INDEX_HEADER = struct.Struct('<8sIIIIQ' + 'Q' * 7)
+
+HASH_MASK = (1 << 64) - 1
+HASH_BASE = 0x100000001B3
+# Structure and text k-grams share one key space; salting keeps them apart
+STRUCTURE_SALT = 0x9E3779B97F4A7C15
+
+TEXT_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+PLACEHOLDER_PATTERN = re.compile(r'\b(VAR|FUNC|CONST|CLASS)_\d+\b')
+
+
+def token_hash(token: str) -> int:
+    """Stable 64-bit hash of one token (independent of PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def kgram_hashes(tokens: Sequence[str], k: int) -> List[int]:
+    """
+    Rolling 64-bit hashes of every run of k consecutive tokens.
+    
+    Args:
+        tokens: Token sequence
+        k: K-gram length
+    
+    Returns:
+        One hash per k-gram (empty if there are fewer than k tokens)
+    """
+    if len(tokens) < k:
+        return []
+    
+    cache = {}
+    values = []
+    for token in tokens:
+        value = cache.get(token)
+        if value is None:
+            value = cache[token] = token_hash(token)
+        values.append(value)
+    return rolling_hashes(values, k)
+
+
+def rolling_hashes(values: Sequence[int], k: int) -> List[int]:
+    """
+    Rolling 64-bit hashes over per-token hash values (see token_hash).
+    
+    Args:
+        values: Token hashes in document order
+        k: K-gram length
+    
+    Returns:
+        One hash per k-gram (empty if there are fewer than k values)
+    """
+    if len(values) < k:
+        return []
+    
+    top = pow(HASH_BASE, k - 1, 1 << 64)
+    current = 0
+    for value in values[:k]:
+        current = (current * HASH_BASE + value) & HASH_MASK
+    hashes = [current]
+    for position in range(k, len(values)):
+        current = (current - values[position - k] * top) & HASH_MASK
+        current = (current * HASH_BASE + values[position]) & HASH_MASK
+        hashes.append(current)
+    return hashes
+
+
+def winnow(hashes: Sequence[int], window: int) -> List[Tuple[int, int]]:
+    """
+    Select fingerprints by winnowing (rightmost minimum of each window).
+    
+    Any match of at least window + k - 1 tokens is guaranteed to share a
+    selected fingerprint, while only about 2 / (window + 1) of the hashes
+    are kept.
+    
+    Args:
+        hashes: K-gram hashes in document order
+        window: Winnowing window size (1 keeps every hash)
+    
+    Returns:
+        (position, hash) pairs in document order
+    """
+    if window <= 1:
+        return list(enumerate(hashes))
+    
+    selected = []
+    last = -1
+    for start in range(max(len(hashes) - window + 1, 1) if hashes else 0):
+        position = start
+        for candidate in range(start + 1, min(start + window, len(hashes))):
+            if hashes[candidate] <= hashes[position]:
+                position = candidate
+        if position != last:
+            selected.append((position, hashes[position]))
+            last = position
+    return selected
+
+
+def text_tokens(code: str, language: str = 'auto') -> List[str]:
+    """Tokens of the preprocessed (comment-free, lowercased) code."""
+    return TEXT_TOKEN_PATTERN.findall(CodePreprocessor.preprocess(code, language))
+
+
+def located_text_tokens(code: str, language: str = 'auto') -> Tuple[List[str], List[int]]:
+    """
+    Same tokens as text_tokens, with the 1-based source line of each.
+    
+    Returns:
+        (tokens, lines)
+    """
+    tokens = []
+    lines = []
+    stripped = CodePreprocessor.remove_comments(code, language, keep_lines=True)
+    for line_number, line in enumerate(stripped.split('\n'), 1):
+        line_tokens = TEXT_TOKEN_PATTERN.findall(line.lower())
+        tokens.extend(line_tokens)
+        lines.extend([line_number] * len(line_tokens))
+    return tokens, lines
+
+
+def structure_token(item: Tuple) -> str:
+    """Token for one normalized structure entry, without placeholder numbers."""
+    return PLACEHOLDER_PATTERN.sub(r'\1', str(item))
+
+
+def located_structure_tokens(code: str, language: str = 'python'
+                             ) -> Optional[Tuple[List[str], List[int]]]:
+    """
+    Structure tokens of a document with the source line of each.
+    
+    Args:
+        code: Source code
+        language: 'python' or a language with a registered lexer
+    
+    Returns:
+        (tokens, lines), or None if the code does not parse or the
+        language has no structure
+    """
+    if language != 'python':
+        lexer = get_lexer(language)
+        if lexer is None:
+            return None
+        structure, lines = lexer.normalize(code)
+        return [structure_token(item) for item in structure], lines
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    normalizer = ASTNormalizer()
+    normalizer.visit(tree)
+    return [structure_token(item) for item in normalizer.structure], normalizer.lines
+
+
+class Fingerprinter:
+    """
+    Turns source code into a sorted set of winnowed k-gram fingerprints.
+    """
+    
+    def __init__(self, k: int = 5, window: int = 4, analyzer: Optional[HybridSimilarityAnalyzer] = None,
+                 boilerplate=None):
+        """
+        Args:
+            k: Tokens per k-gram
+            window: Winnowing window (1 disables winnowing)
+            analyzer: Hybrid analyzer used to normalize Python structure
+                (pass one with a FingerprintStore to reuse cached documents)
+            boilerplate: Optional BoilerplateFilter; starter code is
+                stripped and its k-grams dropped from every document
+        """
+        self.k = k
+        self.window = window
+        self.analyzer = analyzer or HybridSimilarityAnalyzer()
+        self.boilerplate = boilerplate
+    
+    def structure_fingerprints(self, code: str, language: str = 'python') -> List[int]:
+        """Winnowed k-grams of the normalized structure (empty if unparsable)."""
+        doc = self.analyzer.prepare(code, language)
+        if doc.error:
+            return []
+        tokens = [structure_token(item) for item in doc.structure]
+        return [h ^ STRUCTURE_SALT for _, h in winnow(kgram_hashes(tokens, self.k), self.window)]
+    
+    def text_fingerprints(self, code: str, language: str = 'auto') -> List[int]:
+        """Winnowed k-grams of the preprocessed text tokens."""
+        tokens = text_tokens(code, language)
+        return [h for _, h in winnow(kgram_hashes(tokens, self.k), self.window)]
+    
+    def raw_fingerprints(self, code: str, language: str = 'python') -> Set[int]:
+        """Fingerprints of a document, boilerplate included."""
+        hashes = set(self.text_fingerprints(code, language))
+        if has_structure(language):
+            hashes.update(self.structure_fingerprints(code, language))
+        return hashes
+    
+    def fingerprints(self, code: str, language: str = 'python') -> array:
+        """
+        All fingerprints of a document.
+        
+        Args:
+            code: Source code
+            language: Python and languages with a registered lexer add
+                structure k-grams to the text k-grams
+        
+        Returns:
+            Sorted, de-duplicated uint64 array
+        """
+        if not self.boilerplate:
+            return array('Q', sorted(self.raw_fingerprints(code, language)))
+        
+        hashes = self.raw_fingerprints(self.boilerplate.strip(code, language)['code'], language)
+        hashes -= self.boilerplate.base_fingerprints(self)
+        return array('Q', sorted(hashes))
+    
+    def value_fingerprints(self, text_values: Sequence[int],
+                           structure_values: Sequence[int] = ()) -> array:
+        """
+        Fingerprints from per-token hashes instead of source code.
+        
+        Gives the same result as fingerprints() without a boilerplate
+        filter when the values are the token_hash of the text tokens and of
+        the placeholder-free structure tokens (as stored by PackedCorpus).
+        
+        Args:
+            text_values: Hashes of the preprocessed text tokens
+            structure_values: Hashes of the structure tokens (empty if the
+                document has no structure)
+        
+        Returns:
+            Sorted, de-duplicated uint64 array
+        """
+        hashes = {h for _, h in winnow(rolling_hashes(text_values, self.k), self.window)}
+        hashes.update(h ^ STRUCTURE_SALT
+                      for _, h in winnow(rolling_hashes(structure_values, self.k), self.window))
+        return array('Q', sorted(hashes))
+    
+    def located_fingerprints(self, code: str, language: str = 'python', window: Optional[int] = None,
+                             line_offset: int = 0, structure_code: Optional[str] = None
+                             ) -> List[Tuple[int, int, int]]:
+        """
+        Fingerprints with the source lines each k-gram spans.
+        
+        Args:
+            code: Source code
+            language: Python and languages with a registered lexer add
+                structure k-grams
+            window: Winnowing window (default: the fingerprinter's; 1 keeps
+                every k-gram)
+            line_offset: Added to the line numbers of structure k-grams
+            structure_code: Code to parse for structure k-grams instead of
+                ``code`` (e.g. the parsable part of a fragment)
+        
+        Returns:
+            (hash, first line, last line) in document order; structure
+            k-grams are omitted when the code does not parse
+        """
+        window = self.window if window is None else window
+        streams = [(located_text_tokens(code, language), 0, 0)]
+        if has_structure(language):
+            located = located_structure_tokens(code if structure_code is None else structure_code,
+                                               language)
+            if located is not None:
+                streams.append((located, STRUCTURE_SALT, line_offset))
+        
+        excluded = self.boilerplate.base_fingerprints(self) if self.boilerplate else ()
+        result = []
+        for (tokens, lines), salt, offset in streams:
+            for position, value in winnow(kgram_hashes(tokens, self.k), window):
+                if value ^ salt in excluded:
+                    continue
+                span = lines[position:position + self.k]
+                result.append((value ^ salt, min(span) + offset, max(span) + offset))
+        return result
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Append an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(doc_ids: Iterable[int]) -> bytes:
+    """Delta + varint encode a strictly increasing list of document ids."""
+    out = bytearray()
+    previous = 0
+    for doc_id in doc_ids:
+        encode_varint(doc_id - previous, out)
+        previous = doc_id
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> List[int]:
+    """Inverse of encode_postings."""
+    doc_ids = []
+    current = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        current += value
+        doc_ids.append(current)
+        value = 0
+        shift = 0
+    return doc_ids
+
+
+def _pad(f) -> int:
+    """Pad a file to the next 8-byte boundary and return the offset."""
+    position = f.tell()
+    padding = (-position) % 8
+    if padding:
+        f.write(b'\0' * padding)
+    return position + padding
+
+
+def _write_array(f, values: array) -> int:
+    """Write an array little-endian at an aligned offset; return the offset."""
+    offset = _pad(f)
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(f)
+    return offset
+
+
+class KGramIndexWriter:
+    """
+    Bulk builder for a KGramIndex file.
+    
+    (hash, document) pairs are buffered and spilled to sorted run files
+    once the buffer exceeds ``buffer_pairs``; finish() k-way merges the runs
+    while streaming the postings to disk, so memory stays bounded for very
+    large corpora.
+    """
+    
+    RUN_RECORD = struct.Struct('<QI')
+    
+    def __init__(self, path: str, k: int = 5, window: int = 4, buffer_pairs: int = 2_000_000):
+        self.path = path
+        self.k = k
+        self.window = window
+        self.buffer_pairs = buffer_pairs
+        self.names = []
+        self.counts = array('I')
+        self._hashes = array('Q')
+        self._docs = array('I')
+        self._runs = []
+        self._run_dir = None
+    
+    def add_document(self, name: str, fingerprints: Iterable[int]) -> int:
+        """
+        Add one document's fingerprints.
+        
+        Args:
+            name: Document name stored in the index
+            fingerprints: Its k-gram hashes (duplicates are ignored)
+        
+        Returns:
+            The document id
+        """
+        doc_id = len(self.names)
+        unique = set(fingerprints)
+        self.names.append(name)
+        self.counts.append(len(unique))
+        for value in unique:
+            self._hashes.append(value)
+            self._docs.append(doc_id)
+        if len(self._hashes) >= self.buffer_pairs:
+            self._spill()
+        return doc_id
+    
+    def _spill(self) -> None:
+        """Write the buffered pairs as one sorted run file."""
+        if not self._hashes:
+            return
+        if self._run_dir is None:
+            self._run_dir = tempfile.mkdtemp(prefix='cide-kgram-',
+                                             dir=os.path.dirname(os.path.abspath(self.path)))
+        run_path = os.path.join(self._run_dir, f"run-{len(self._runs):05d}")
+        with open(run_path, 'wb') as f:
+            for pair in sorted(zip(self._hashes, self._docs)):
+                f.write(self.RUN_RECORD.pack(*pair))
+        self._runs.append(run_path)
+        self._hashes = array('Q')
+        self._docs = array('I')
+    
+    def _read_run(self, run_path: str) -> Iterator[Tuple[int, int]]:
+        """Stream the records of one run file."""
+        size = self.RUN_RECORD.size
+        with open(run_path, 'rb') as f:
+            while True:
+                chunk = f.read(size * 4096)
+                if not chunk:
+                    return
+                yield from self.RUN_RECORD.iter_unpack(chunk)
+    
+    def _sorted_pairs(self) -> Iterator[Tuple[int, int]]:
+        """All (hash, document) pairs in sorted order."""
+        if not self._runs:
+            return iter(sorted(zip(self._hashes, self._docs)))
+        self._spill()
+        return heapq.merge(*(self._read_run(run_path) for run_path in self._runs))
+    
+    def _grouped_postings(self) -> Iterator[Tuple[int, List[int]]]:
+        """(hash, sorted document ids) groups in hash order."""
+        current_key = None
+        current_docs = []
+        for key, doc_id in self._sorted_pairs():
+            if key != current_key:
+                if current_docs:
+                    yield current_key, current_docs
+                current_key = key
+                current_docs = []
+            current_docs.append(doc_id)
+        if current_docs:
+            yield current_key, current_docs
+    
+    def finish(self) -> str:
+        """
+        Write the index file and clean up run files.
+        
+        Returns:
+            Path of the written index
+        """
+        write_index(self.path, self.k, self.window, self.names, self.counts,
+                    self._grouped_postings())
+        
+        for run_path in self._runs:
+            os.remove(run_path)
+        if self._run_dir is not None:
+            os.rmdir(self._run_dir)
+        self._runs = []
+        self._run_dir = None
+        return self.path
+
+
+def write_index(path: str, k: int, window: int, names: Sequence[str], counts: array,
+                grouped_postings: Iterable[Tuple[int, List[int]]]) -> None:
+    """
+    Write an index file from postings grouped by key.
+    
+    The postings are streamed to a side file first (their total size is
+    unknown up front) and then appended after the fixed-size sections;
+    the file appears atomically under ``path``.
+    
+    Args:
+        path: Output index path
+        k: Tokens per k-gram
+        window: Winnowing window
+        names: Document names by document id
+        counts: Fingerprints per document (uint32 array)
+        grouped_postings: (key, sorted document ids) in increasing key order
+    """
+    keys = array('Q')
+    dfs = array('I')
+    offsets = array('Q', [0])
+    
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    postings_path = f"{path}.postings{os.getpid()}"
+    with open(postings_path, 'wb') as postings:
+        written = 0
+        for key, doc_ids in grouped_postings:
+            written += postings.write(encode_postings(doc_ids))
+            keys.append(key)
+            dfs.append(len(doc_ids))
+            offsets.append(written)
+    
+    name_blob = bytearray()
+    name_offsets = array('Q', [0])
+    for name in names:
+        name_blob += name.encode('utf-8')
+        name_offsets.append(len(name_blob))
+    
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * INDEX_HEADER.size)
+        names_offset = _write_array(f, name_offsets)
+        f.write(name_blob)
+        counts_offset = _write_array(f, counts)
+        keys_offset = _write_array(f, keys)
+        dfs_offset = _write_array(f, dfs)
+        offsets_offset = _write_array(f, offsets)
+        postings_offset = _pad(f)
+        with open(postings_path, 'rb') as postings:
+            while True:
+                chunk = postings.read(1 << 20)
+                if not chunk:
+                    break
+                f.write(chunk)
+        f.seek(0)
+        f.write(INDEX_HEADER.pack(
+            INDEX_MAGIC, INDEX_FORMAT, k, window, len(names), len(keys),
+            names_offset, names_offset + 8 * len(name_offsets), counts_offset,
+            keys_offset, dfs_offset, offsets_offset, postings_offset
+        ))
+    os.replace(tmp_path, path)
+    os.remove(postings_path)
+
+
+def build_index(path: str, documents: Iterable[Tuple[str, str]], k: int = 5, window: int = 4,
+                language: str = 'python', fingerprinter: Optional[Fingerprinter] = None) -> str:
+    """
+    Fingerprint documents and bulk-build an index file.
+    
+    Args:
+        path: Output index path
+        documents: (name, content) pairs
+        k: Tokens per k-gram
+        window: Winnowing window
+        language: Language of the documents
+        fingerprinter: Optional preconfigured Fingerprinter
+    
+    Returns:
+        Path of the written index
+    """
+    fingerprinter = fingerprinter or Fingerprinter(k=k, window=window)
+    writer = KGramIndexWriter(path, k=fingerprinter.k, window=fingerprinter.window)
+    for name, content in documents:
+        writer.add_document(name, fingerprinter.fingerprints(content, language))
+    return writer.finish()
+
+
+class KGramIndex:
+    """
+    Read-only, memory-mapped view of an index file.
+    
+    Opening is O(1): the sections are mapped, not loaded, and only the pages
+    touched by lookups are read from disk.
+    """
+    
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise ValueError('KGramIndex requires a little-endian host')
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        (magic, version, self.k, self.window, self.document_count, self.key_count,
+         names_offset, blob_offset, counts_offset, keys_offset, dfs_offset,
+         offsets_offset, self._postings_offset) = INDEX_HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or version != INDEX_FORMAT:
+            raise ValueError(f'Not a CIDE k-gram index: {path}')
+        
+        view = memoryview(self._mmap)
+        n, keys = self.document_count, self.key_count
+        self._name_offsets = view[names_offset:names_offset + 8 * (n + 1)].cast('Q')
+        self._name_blob = blob_offset
+        self._counts = view[counts_offset:counts_offset + 4 * n].cast('I')
+        self._keys = view[keys_offset:keys_offset + 8 * keys].cast('Q')
+        self._dfs = view[dfs_offset:dfs_offset + 4 * keys].cast('I')
+        self._offsets = view[offsets_offset:offsets_offset + 8 * (keys + 1)].cast('Q')
+    
+    def close(self) -> None:
+        """Release the memory map."""
+        for view in (self._name_offsets, self._counts, self._keys, self._dfs, self._offsets):
+            view.release()
+        self._mmap.close()
+    
+    def __enter__(self) -> 'KGramIndex':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def document_name(self, doc_id: int) -> str:
+        """Name of a document id."""
+        start = self._name_blob + self._name_offsets[doc_id]
+        end = self._name_blob + self._name_offsets[doc_id + 1]
+        return self._mmap[start:end].decode('utf-8')
+    
+    def fingerprint_count(self, doc_id: int) -> int:
+        """Number of distinct fingerprints indexed for a document."""
+        return self._counts[doc_id]
+    
+    def _find(self, key: int) -> int:
+        """Slot of a key, or -1."""
+        slot = bisect_left(self._keys, key)
+        if slot < self.key_count and self._keys[slot] == key:
+            return slot
+        return -1
+    
+    def document_frequency(self, key: int) -> int:
+        """Number of documents containing a fingerprint."""
+        slot = self._find(key)
+        return self._dfs[slot] if slot >= 0 else 0
+    
+    def postings(self, key: int) -> List[int]:
+        """Sorted document ids containing a fingerprint."""
+        slot = self._find(key)
+        if slot < 0:
+            return []
+        start = self._postings_offset + self._offsets[slot]
+        end = self._postings_offset + self._offsets[slot + 1]
+        return decode_postings(self._mmap[start:end])
+    
+    def iter_postings(self) -> Iterator[Tuple[int, List[int]]]:
+        """Yield (key, document ids) for every key in increasing key order."""
+        base = self._postings_offset
+        for slot in range(self.key_count):
+            start = base + self._offsets[slot]
+            end = base + self._offsets[slot + 1]
+            yield self._keys[slot], decode_postings(self._mmap[start:end])
+    
+    def intersect(self, keys: Iterable[int]) -> List[int]:
+        """
+        Documents containing every one of the given fingerprints.
+        
+        Lists are intersected rarest first, so the working set only shrinks
+        and the large lists are often never decoded.
+        """
+        slots = []
+        for key in set(keys):
+            slot = self._find(key)
+            if slot < 0:
+                return []
+            slots.append(slot)
+        if not slots:
+            return []
+        
+        slots.sort(key=self._dfs.__getitem__)
+        result = None
+        for slot in slots:
+            start = self._postings_offset + self._offsets[slot]
+            end = self._postings_offset + self._offsets[slot + 1]
+            docs = decode_postings(self._mmap[start:end])
+            result = set(docs) if result is None else result.intersection(docs)
+            if not result:
+                return []
+        return sorted(result)
+    
+    def score_candidates(self, fingerprints: Iterable[int], top_k: int = 10,
+                         min_shared: int = 1, max_df: Optional[int] = None,
+                         exclude: Optional[set] = None, stats=None) -> List[Dict[str, object]]:
+        """
+        Rank documents by the fingerprints they share with a query.
+        
+        Args:
+            fingerprints: Query fingerprints
+            top_k: Number of candidates to return
+            min_shared: Minimum number of shared fingerprints
+            max_df: Skip fingerprints found in more documents than this
+            exclude: Document ids to leave out
+            stats: Optional DocumentFrequency; stop-listed fingerprints are
+                skipped and shared fingerprints weighted by IDF
+        
+        Returns:
+            Candidates, best first: doc_id, name, shared, containment
+            (shared / query fingerprints) and score (the IDF-weighted
+            shared count with stats, else shared)
+        """
+        query = set(fingerprints)
+        counts: Dict[int, int] = {}
+        scores: Dict[int, float] = {}
+        for key in query:
+            if stats is not None and stats.is_stop(key):
+                continue
+            slot = self._find(key)
+            if slot < 0 or (max_df is not None and self._dfs[slot] > max_df):
+                continue
+            weight = stats.idf(key) if stats is not None else 1.0
+            start = self._postings_offset + self._offsets[slot]
+            end = self._postings_offset + self._offsets[slot + 1]
+            for doc_id in decode_postings(self._mmap[start:end]):
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        
+        if exclude:
+            for doc_id in exclude:
+                counts.pop(doc_id, None)
+        best = heapq.nlargest(top_k, ((scores[doc_id], shared, -doc_id)
+                                      for doc_id, shared in counts.items()
+                                      if shared >= min_shared))
+        return [{
+            'doc_id': -negative_id,
+            'name': self.document_name(-negative_id),
+            'shared': shared,
+            'containment': shared / len(query) if query else 0.0,
+            'score': score
+        } for score, shared, negative_id in best]
@@ -0,0 +1,380 @@
+"""
+Lexers Module
+=============
+Hand-written lexers for Java, JavaScript, C and C++ that emit normalized
+token streams, so non-Python files get the structural analysis Python gets
+from ASTNormalizer.
+
+Each lexer scans the source once with a single compiled pattern and turns
+every token into a structure entry shaped like ASTNormalizer's:
+identifiers become VAR_n, FUNC_n and CLASS_n placeholders numbered by first
+use, method calls keep their name (METHOD_name), literals are reduced to
+their type and operators to ('BinOp', op), ('Compare', op), ('Assign',) and
+so on. Comments, whitespace, parentheses and separators are dropped; the
+source line of every entry is kept. The resulting ``structure`` list plugs
+into PreparedDocument, the k-gram fingerprints and every other consumer of
+normalized structure.
+
+Lexers are looked up by language name in a registry (see register_lexer).
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+OPERATORS = sorted([
+    '>>>=', '<<=', '>>=', '>>>', '...', '===', '!==', '**=', '&&=', '||=', '??=',
+    '->', '::', '++', '--', '<<', '>>', '<=', '>=', '==', '!=', '&&', '||',
+    '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '**', '??', '?.', '=>',
+    '+', '-', '*', '/', '%', '&', '|', '^', '~', '!', '=', '<', '>', '?', ':',
+    '.', ',', ';', '(', ')', '[', ']', '{', '}', '@'
+], key=len, reverse=True)
+
+AUGMENTED = frozenset({'+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<=', '>>=',
+                       '>>>=', '**=', '&&=', '||=', '??=', '++', '--'})
+COMPARISONS = frozenset({'==', '!=', '===', '!==', '<', '>', '<=', '>='})
+UNARY = frozenset({'!', '~'})
+# Punctuation that carries no structure of its own
+DROPPED = frozenset({'(', ')', ',', ';', ':', ']', '.', '?.', '->', '::'})
+MEMBER_ACCESS = frozenset({'.', '?.', '->', '::'})
+
+# Keywords mapped to the entries ASTNormalizer emits for the same statement
+STATEMENTS = {'if': ('If',), 'for': ('For',), 'while': ('While',), 'return': ('Return',)}
+
+LITERAL_KEYWORDS = {
+    'true': 'bool', 'false': 'bool', 'null': 'NoneType', 'nullptr': 'NoneType',
+    'NULL': 'NoneType', 'undefined': 'NoneType'
+}
+
+# Tokens after which a '/' starts a JavaScript regular expression literal
+REGEX_PREFIXES = frozenset({'(', ',', '=', ':', '[', '!', '&', '|', '?', '{', '}', ';',
+                            '&&', '||', '??', '=>', 'return', 'typeof', 'case', ''})
+
+# Keywords after which a '{' still ends a function signature
+SIGNATURE_SUFFIXES = frozenset({'throws', 'const', 'noexcept', 'override', 'final'})
+
+C_KEYWORDS = frozenset('''
+    auto break case char const continue default do double else enum extern float for
+    goto if inline int long register restrict return short signed sizeof static struct
+    switch typedef union unsigned void volatile while _Bool bool true false NULL
+'''.split())
+
+CPP_KEYWORDS = C_KEYWORDS | frozenset('''
+    class namespace template typename public private protected virtual override new
+    delete this throw try catch using operator friend nullptr constexpr noexcept
+    explicit mutable static_cast dynamic_cast reinterpret_cast const_cast decltype final
+'''.split())
+
+JAVA_KEYWORDS = frozenset('''
+    abstract assert boolean break byte case catch char class const continue default do
+    double else enum extends final finally float for goto if implements import
+    instanceof int interface long native new package private protected public return
+    short static strictfp super switch synchronized this throw throws transient try
+    void volatile while var record true false null
+'''.split())
+
+JAVASCRIPT_KEYWORDS = frozenset('''
+    break case catch class const continue debugger default delete do else export
+    extends finally for function if import in instanceof let new return super switch
+    this throw try typeof var void while with yield async await of static true false
+    null undefined
+'''.split())
+
+
+class Lexer:
+    """
+    Single-pass scanner and normalizer for one C-family language.
+    """
+    
+    def __init__(self, language: str, keywords: FrozenSet[str],
+                 class_keywords: Iterable[str] = ('class',),
+                 import_keywords: Iterable[str] = (), preprocessor: bool = False,
+                 char_literals: bool = True, template_strings: bool = False,
+                 regex_literals: bool = False):
+        """
+        Args:
+            language: Language name the lexer is registered under
+            keywords: Reserved words (kept as ('Keyword', word) entries)
+            class_keywords: Keywords that introduce a type name
+            import_keywords: Keywords whose statement becomes one ('Import',)
+            preprocessor: Whether '#' lines are directives (C, C++)
+            char_literals: Single quotes delimit characters, not strings
+            template_strings: Backquoted strings are literals (JavaScript)
+            regex_literals: '/' may start a regular expression (JavaScript)
+        """
+        self.language = language
+        self.keywords = keywords
+        self.class_keywords = frozenset(class_keywords)
+        self.import_keywords = frozenset(import_keywords)
+        self.preprocessor = preprocessor
+        self.char_literals = char_literals
+        self.regex_literals = regex_literals
+        
+        parts = [
+            r'(?P<space>\s+)',
+            r'(?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))',
+            r'(?P<string>"(?:\\.|[^"\\\n])*"?' +
+            (r"|'(?:\\.|[^'\\\n])*'?" if not char_literals else '') +
+            (r'|`(?:\\.|[^`\\])*`?' if template_strings else '') + ')',
+        ]
+        if char_literals:
+            parts.append(r"(?P<char>'(?:\\.|[^'\\\n])*'?)")
+        if preprocessor:
+            parts.append(r'(?P<directive>#[ \t]*\w*(?:\\\n|[^\n])*)')
+        parts += [
+            r'(?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)',
+            r'(?P<name>[A-Za-z_$][\w$]*)',
+            '(?P<op>' + '|'.join(re.escape(op) for op in OPERATORS) + ')',
+            r'(?P<other>.)',
+        ]
+        self.pattern = re.compile('|'.join(parts), re.DOTALL)
+        self.regex_pattern = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*')
+    
+    def tokenize(self, code: str) -> List[Tuple[str, str, int]]:
+        """
+        Split source code into raw tokens.
+        
+        Args:
+            code: Source code
+        
+        Returns:
+            (kind, text, line) for every token except whitespace and
+            comments; kinds are 'string', 'char', 'directive', 'number',
+            'name', 'op', 'regex' and 'other'
+        """
+        tokens = []
+        match = self.pattern.match
+        position, end, line = 0, len(code), 1
+        previous = ''
+        while position < end:
+            found = match(code, position)
+            kind, text = found.lastgroup, found.group()
+            if kind == 'op' and text in ('/', '/=') and self.regex_literals and (
+                    previous in REGEX_PREFIXES or previous in self.keywords):
+                literal = self.regex_pattern.match(code, position)
+                if literal:
+                    kind, text = 'regex', literal.group()
+            if kind != 'space' and kind != 'comment':
+                tokens.append((kind, text, line))
+                previous = text if kind in ('op', 'name') else '\0'
+            line += text.count('\n')
+            position += len(text)
+        return tokens
+    
+    def normalize(self, code: str) -> Tuple[List[Tuple], List[int]]:
+        """
+        Normalized structure entries of source code.
+        
+        Args:
+            code: Source code
+        
+        Returns:
+            (structure entries, source line of each entry)
+        """
+        structure: List[Tuple] = []
+        lines: List[int] = []
+        maps: Dict[str, Dict[str, str]] = {'VAR': {}, 'FUNC': {}, 'CLASS': {}}
+        
+        def placeholder(kind: str, name: str) -> str:
+            names = maps[kind]
+            if name not in names:
+                names[name] = f"{kind}_{len(names)}"
+            return names[name]
+        
+        tokens = self.tokenize(code)
+        count = len(tokens)
+        # Open parentheses: index of the call entry before each (or None)
+        parens: List[Optional[int]] = []
+        # Call entry whose argument list just closed (a definition if a '{' follows)
+        signature = None
+        skip_line = None
+        i = 0
+        while i < count:
+            kind, text, line = tokens[i]
+            i += 1
+            if skip_line is not None:
+                if text != ';' and line == skip_line:
+                    continue
+                skip_line = None
+                if text == ';':
+                    continue
+            
+            entry = None
+            if kind == 'name':
+                following = tokens[i][1] if i < count else ''
+                before = tokens[i - 2][1] if i >= 2 else ''
+                if text in self.import_keywords:
+                    entry = ('Import',)
+                    skip_line = line
+                elif text in LITERAL_KEYWORDS and text in self.keywords:
+                    entry = ('Constant', LITERAL_KEYWORDS[text])
+                elif text in self.class_keywords and i < count and tokens[i][0] == 'name':
+                    entry = ('ClassDef', placeholder('CLASS', tokens[i][1]))
+                    i += 1
+                elif text == 'function' and text in self.keywords:
+                    if i < count and tokens[i][0] == 'name':
+                        entry = ('FunctionDef', placeholder('FUNC', tokens[i][1]))
+                        i += 1
+                    else:
+                        entry = ('Lambda',)
+                elif text in STATEMENTS and text in self.keywords:
+                    entry = STATEMENTS[text]
+                elif text in self.keywords:
+                    if signature is not None and text in SIGNATURE_SUFFIXES:
+                        if text == 'throws':
+                            while i < count and (tokens[i][0] == 'name' or tokens[i][1] in ('.', ',')):
+                                i += 1
+                        continue
+                    entry = ('Keyword', text)
+                elif before in MEMBER_ACCESS and i >= 2 and tokens[i - 2][0] == 'op':
+                    entry = ('Call', f"METHOD_{text}") if following == '(' else ('Attribute',)
+                elif following == '(':
+                    entry = ('Call', placeholder('FUNC', text))
+                elif text in maps['CLASS']:
+                    entry = ('Name', maps['CLASS'][text])
+                else:
+                    entry = ('Name', placeholder('VAR', text))
+            elif kind == 'number':
+                is_float = '.' in text or (('e' in text or 'E' in text) and
+                                           not text.lower().startswith('0x'))
+                entry = ('Constant', 'float' if is_float else 'int')
+            elif kind == 'string':
+                entry = ('Constant', 'str')
+            elif kind == 'char':
+                entry = ('Constant', 'char')
+            elif kind == 'regex':
+                entry = ('Constant', 'regex')
+            elif kind == 'directive':
+                directive = text.lstrip('#').split(None, 1)
+                name = directive[0] if directive else ''
+                entry = ('Import',) if name in ('include', 'import') else ('Directive', name)
+            elif kind == 'op':
+                if text == '(':
+                    previous = structure[-1] if structure else None
+                    parens.append(len(structure) - 1 if previous and previous[0] == 'Call' and
+                                  tokens[i - 2][0] == 'name' else None)
+                    signature = None
+                    continue
+                if text == ')':
+                    signature = parens.pop() if parens else None
+                    continue
+                if text == '{':
+                    if signature is not None and not structure[signature][1].startswith('METHOD_'):
+                        structure[signature] = ('FunctionDef', structure[signature][1])
+                    entry = ('Block',)
+                elif text == '}':
+                    entry = ('EndBlock',)
+                elif text in DROPPED:
+                    signature = None
+                    continue
+                elif text == '=':
+                    entry = ('Assign',)
+                elif text in AUGMENTED:
+                    entry = ('AugAssign', text)
+                elif text in COMPARISONS:
+                    entry = ('Compare', text)
+                elif text in UNARY:
+                    entry = ('UnaryOp', text)
+                elif text == '[':
+                    entry = ('Subscript',)
+                elif text == '?':
+                    entry = ('IfExp',)
+                elif text == '=>':
+                    entry = ('Lambda',)
+                elif text == '...':
+                    entry = ('Starred',)
+                elif text == '@':
+                    entry = ('Decorator',)
+                else:
+                    entry = ('BinOp', text)
+            else:
+                continue
+            
+            signature = None
+            structure.append(entry)
+            lines.append(line)
+        return structure, lines
+    
+    @staticmethod
+    def features(structure: List[Tuple]) -> Dict[str, int]:
+        """
+        Code feature counts of a normalized token stream.
+        
+        Same keys as ASTStructureAnalyzer.analyze_code_features.
+        """
+        features = {
+            'functions': 0,
+            'classes': 0,
+            'loops': 0,
+            'conditionals': 0,
+            'assignments': 0,
+            'calls': 0,
+            'returns': 0,
+            'imports': 0
+        }
+        keys = {'FunctionDef': 'functions', 'ClassDef': 'classes', 'For': 'loops',
+                'While': 'loops', 'If': 'conditionals', 'Assign': 'assignments',
+                'AugAssign': 'assignments', 'Call': 'calls', 'Return': 'returns',
+                'Import': 'imports'}
+        for entry in structure:
+            key = keys.get(entry[0])
+            if key is not None:
+                features[key] += 1
+            elif entry == ('Keyword', 'do'):
+                features['loops'] += 1
+        return features
+
+
+# Language name -> lexer
+LEXERS: Dict[str, Lexer] = {}
+
+
+def register_lexer(lexer: Lexer, *aliases: str) -> None:
+    """
+    Make a lexer available under its language name (and aliases).
+    
+    Args:
+        lexer: Lexer to register
+        aliases: Further language names served by the same lexer
+    """
+    for language in (lexer.language,) + aliases:
+        LEXERS[language] = lexer
+
+
+def get_lexer(language: str) -> Optional[Lexer]:
+    """Registered lexer for a language (None if there is none)."""
+    return LEXERS.get(language)
+
+
+def has_structure(language: str) -> bool:
+    """Whether a language gets structural analysis (Python AST or a lexer)."""
+    return language == 'python' or language in LEXERS
+
+
+# File extension -> language name
+FILE_EXTENSIONS = {
+    'py': 'python',
+    'java': 'java',
+    'js': 'javascript',
+    'cpp': 'cpp',
+    'c': 'c',
+    'h': 'c',
+    'txt': 'text'
+}
+
+
+def language_for_filename(filename: str) -> str:
+    """Language of a file from its extension ('text' if unknown)."""
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'txt'
+    return FILE_EXTENSIONS.get(ext, 'text')
+
+
+register_lexer(Lexer('c', C_KEYWORDS, class_keywords=('struct', 'union', 'enum'),
+                     preprocessor=True))
+register_lexer(Lexer('cpp', CPP_KEYWORDS, class_keywords=('class', 'struct', 'union', 'enum'),
+                     preprocessor=True), 'c++')
+register_lexer(Lexer('java', JAVA_KEYWORDS,
+                     class_keywords=('class', 'interface', 'enum', 'record'),
+                     import_keywords=('import', 'package')))
+register_lexer(Lexer('javascript', JAVASCRIPT_KEYWORDS, import_keywords=('import',),
+                     char_literals=False, template_strings=True, regex_literals=True), 'js')
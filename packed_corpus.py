@@ -0,0 +1,421 @@
+"""
+Packed Corpus Module
+====================
+Pre-tokenized corpus file for scanning very large historical corpora
+without reading and parsing every source file again.
+
+Each document is stored as integer token ids: its normalized structure
+entries (ASTNormalizer via HybridSimilarityAnalyzer.prepare) and its
+preprocessed text tokens (CodePreprocessor), concatenated into one array
+per kind, plus a row of the code-feature table and the structure digest.
+PackedCorpus maps the file and hands out zero-copy memoryviews, so opening
+a corpus of a million documents costs a header read and resident memory
+grows with the pages actually touched.
+
+The vocabularies keep the token hash used for k-grams next to every token,
+so index fingerprints (Fingerprinter.value_fingerprints) and token-level
+comparisons (PackedCorpus.compare) run straight off the mapped arrays.
+
+File layout (little-endian, sections 8-byte aligned):
+    header          magic, format, document count, vocabulary sizes,
+                    feature count and the byte offsets of every section
+    names           uint64 offsets[document count + 1] + UTF-8 name blob
+    feature names   uint64 offsets[feature count + 1] + UTF-8 name blob
+    structure vocab uint64 offsets + UTF-8 entry blob + uint64 k-gram hashes
+                    (of the placeholder-free entry, see structure_token)
+    text vocab      uint64 offsets + UTF-8 token blob + uint64 k-gram hashes
+    documents       uint64 structure offsets[n + 1], uint64 text offsets[n + 1],
+                    uint8 parsed flags, 16-byte structure digests (MD5, as
+                    in structure_hash) and uint32 features[n * feature count]
+    tokens          uint32 structure token ids, then uint32 text token ids
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ast_analyzer import ASTStructureAnalyzer, HybridSimilarityAnalyzer
+from kgram_index import (Fingerprinter, KGramIndexWriter, _pad, _write_array, structure_token,
+                         text_tokens, token_hash)
+from lexers import has_structure
+
+
+PACKED_MAGIC = b'CIDEPKC1'
+PACKED_FORMAT = 1
+PACKED_HEADER = struct.Struct('<8sIIIII4x' + 'Q' * 17)
+
+FEATURE_NAMES = ('functions', 'classes', 'loops', 'conditionals', 'assignments',
+                 'calls', 'returns', 'imports')
+
+
+def _write_strings(f, strings: Iterable[str]) -> Tuple[int, int]:
+    """Write uint64 offsets plus a UTF-8 blob; return both section offsets."""
+    blob = bytearray()
+    offsets = array('Q', [0])
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    offsets_offset = _write_array(f, offsets)
+    blob_offset = f.tell()
+    f.write(blob)
+    return offsets_offset, blob_offset
+
+
+def _copy_file(source_path: str, f) -> int:
+    """Append a side file at an aligned offset; return the offset."""
+    offset = _pad(f)
+    with open(source_path, 'rb') as source:
+        while True:
+            chunk = source.read(1 << 20)
+            if not chunk:
+                break
+            f.write(chunk)
+    return offset
+
+
+class PackedCorpusWriter:
+    """
+    Streaming builder for a PackedCorpus file.
+    
+    Token ids go to side files as documents are added; only the names,
+    offsets, per-document rows and the vocabularies are kept in memory.
+    """
+    
+    def __init__(self, path: str, analyzer: Optional[HybridSimilarityAnalyzer] = None):
+        """
+        Args:
+            path: Output corpus path
+            analyzer: Hybrid analyzer used to normalize Python structure
+                (pass one with a FingerprintStore to reuse cached documents)
+        """
+        self.path = path
+        self.analyzer = analyzer or HybridSimilarityAnalyzer()
+        self.names: List[str] = []
+        self._structure_vocab: Dict[str, int] = {}
+        self._text_vocab: Dict[str, int] = {}
+        self._structure_offsets = array('Q', [0])
+        self._text_offsets = array('Q', [0])
+        self._parsed = array('B')
+        self._digests = bytearray()
+        self._features = array('I')
+        self._structure_path = f"{path}.structure{os.getpid()}"
+        self._text_path = f"{path}.text{os.getpid()}"
+        self._structure_file = open(self._structure_path, 'wb')
+        self._text_file = open(self._text_path, 'wb')
+    
+    @staticmethod
+    def _intern(vocab: Dict[str, int], tokens: Iterable[str]) -> array:
+        """Token ids of a token sequence, growing the vocabulary as needed."""
+        ids = array('I')
+        for token in tokens:
+            token_id = vocab.get(token)
+            if token_id is None:
+                token_id = vocab[token] = len(vocab)
+            ids.append(token_id)
+        return ids
+    
+    def _append(self, f, ids: array, offsets: array) -> None:
+        """Write token ids to a side file and record the new end offset."""
+        if sys.byteorder == 'big':
+            ids.byteswap()
+        ids.tofile(f)
+        offsets.append(offsets[-1] + len(ids))
+    
+    def add_document(self, name: str, code: str, language: str = 'python') -> int:
+        """
+        Tokenize and add one document.
+        
+        Args:
+            name: Document name stored in the corpus
+            code: Source code
+            language: Python and languages with a registered lexer also
+                store structure tokens and features
+        
+        Returns:
+            The document id
+        """
+        doc_id = len(self.names)
+        self.names.append(name)
+        
+        doc = self.analyzer.prepare(code, language) if has_structure(language) else None
+        parsed = doc is not None and not doc.error
+        structure = [str(item) for item in doc.structure] if parsed else []
+        self._append(self._structure_file, self._intern(self._structure_vocab, structure),
+                     self._structure_offsets)
+        self._append(self._text_file, self._intern(self._text_vocab, text_tokens(code, language)),
+                     self._text_offsets)
+        
+        self._parsed.append(1 if parsed else 0)
+        self._digests += bytes.fromhex(doc.structure_hash) if parsed else bytes(16)
+        features = doc.features if parsed else {}
+        self._features.extend(features.get(feature, 0) for feature in FEATURE_NAMES)
+        return doc_id
+    
+    def finish(self) -> str:
+        """
+        Write the corpus file (atomically) and remove the side files.
+        
+        Returns:
+            Path of the written corpus
+        """
+        self._structure_file.close()
+        self._text_file.close()
+        structure_vocab = list(self._structure_vocab)
+        text_vocab = list(self._text_vocab)
+        
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * PACKED_HEADER.size)
+            names = _write_strings(f, self.names)
+            feature_names = _write_strings(f, FEATURE_NAMES)
+            structure_strings = _write_strings(f, structure_vocab)
+            structure_hashes = _write_array(f, array(
+                'Q', (token_hash(structure_token(entry)) for entry in structure_vocab)))
+            text_strings = _write_strings(f, text_vocab)
+            text_hashes = _write_array(f, array('Q', (token_hash(token) for token in text_vocab)))
+            structure_offsets = _write_array(f, self._structure_offsets)
+            text_offsets = _write_array(f, self._text_offsets)
+            parsed = _write_array(f, self._parsed)
+            digests = _pad(f)
+            f.write(self._digests)
+            features = _write_array(f, self._features)
+            structure_tokens = _copy_file(self._structure_path, f)
+            text_tokens_offset = _copy_file(self._text_path, f)
+            
+            f.seek(0)
+            f.write(PACKED_HEADER.pack(
+                PACKED_MAGIC, PACKED_FORMAT, len(self.names), len(structure_vocab),
+                len(text_vocab), len(FEATURE_NAMES), *names, *feature_names,
+                *structure_strings, structure_hashes, *text_strings, text_hashes,
+                structure_offsets, text_offsets, parsed, digests, features,
+                structure_tokens, text_tokens_offset
+            ))
+        os.replace(tmp_path, self.path)
+        os.remove(self._structure_path)
+        os.remove(self._text_path)
+        return self.path
+
+
+def build_packed_corpus(path: str, documents: Iterable[Tuple[str, str]], language: str = 'python',
+                        analyzer: Optional[HybridSimilarityAnalyzer] = None) -> str:
+    """
+    Tokenize documents into a packed corpus file.
+    
+    Args:
+        path: Output corpus path
+        documents: (name, content) pairs
+        language: Language of the documents
+        analyzer: Optional hybrid analyzer (e.g. with a FingerprintStore)
+    
+    Returns:
+        Path of the written corpus
+    """
+    writer = PackedCorpusWriter(path, analyzer=analyzer)
+    for name, content in documents:
+        writer.add_document(name, content, language)
+    return writer.finish()
+
+
+class PackedCorpus:
+    """
+    Read-only, memory-mapped view of a packed corpus file.
+    
+    Opening is O(1); token arrays, vocabularies and the feature table are
+    memoryviews into the mapping.
+    """
+    
+    def __init__(self, path: str, structure_weight: float = 0.7, sequence_weight: float = 0.3):
+        """
+        Args:
+            path: Corpus file
+            structure_weight: Weight of structure similarity in compare()
+            sequence_weight: Weight of token sequence similarity in compare()
+        """
+        if sys.byteorder != 'little':
+            raise ValueError('PackedCorpus requires a little-endian host')
+        self.path = path
+        self.structure_weight = structure_weight
+        self.sequence_weight = sequence_weight
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        (magic, version, self.document_count, structure_vocab, text_vocab, feature_count,
+         names, names_blob, feature_names, feature_names_blob, structure_strings,
+         structure_blob, structure_hashes, text_strings, text_blob, text_hashes,
+         structure_offsets, text_offsets, parsed, self._digests, features,
+         structure_tokens, text_tokens_offset) = PACKED_HEADER.unpack_from(self._mmap, 0)
+        if magic != PACKED_MAGIC or version != PACKED_FORMAT:
+            raise ValueError(f'Not a CIDE packed corpus: {path}')
+        
+        view = memoryview(self._mmap)
+        n = self.document_count
+        
+        def section(offset: int, count: int, typecode: str) -> memoryview:
+            size = struct.calcsize(typecode)
+            return view[offset:offset + size * count].cast(typecode)
+        
+        self._names = (section(names, n + 1, 'Q'), names_blob)
+        self._structure_vocab = (section(structure_strings, structure_vocab + 1, 'Q'), structure_blob)
+        self._text_vocab = (section(text_strings, text_vocab + 1, 'Q'), text_blob)
+        self.structure_hashes = section(structure_hashes, structure_vocab, 'Q')
+        self.text_hashes = section(text_hashes, text_vocab, 'Q')
+        self._structure_offsets = section(structure_offsets, n + 1, 'Q')
+        self._text_offsets = section(text_offsets, n + 1, 'Q')
+        self._parsed = section(parsed, n, 'B')
+        self._features = section(features, n * feature_count, 'I')
+        self._structure_tokens = section(structure_tokens, self._structure_offsets[n], 'I')
+        self._text_tokens = section(text_tokens_offset, self._text_offsets[n], 'I')
+        self._views = [self._names[0], self._structure_vocab[0], self._text_vocab[0],
+                       self.structure_hashes, self.text_hashes, self._structure_offsets,
+                       self._text_offsets, self._parsed, self._features,
+                       self._structure_tokens, self._text_tokens]
+        
+        feature_offsets = section(feature_names, feature_count + 1, 'Q')
+        self.feature_names = tuple(self._string((feature_offsets, feature_names_blob), i)
+                                   for i in range(feature_count))
+        feature_offsets.release()
+        self._name_ids = None
+        self._feature_analyzer = ASTStructureAnalyzer()
+    
+    def close(self) -> None:
+        """Release the memory map."""
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+    
+    def __enter__(self) -> 'PackedCorpus':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def __len__(self) -> int:
+        return self.document_count
+    
+    def _string(self, table: Tuple[memoryview, int], position: int) -> str:
+        """Entry of a string table (offsets view, blob offset)."""
+        offsets, blob = table
+        return self._mmap[blob + offsets[position]:blob + offsets[position + 1]].decode('utf-8')
+    
+    def document_name(self, doc_id: int) -> str:
+        """Name of a document id."""
+        return self._string(self._names, doc_id)
+    
+    def document_id(self, name: str) -> Optional[int]:
+        """Id of a document name (the lookup table is built on first use)."""
+        if self._name_ids is None:
+            self._name_ids = {self.document_name(doc_id): doc_id for doc_id in range(len(self))}
+        return self._name_ids.get(name)
+    
+    def structure_tokens(self, doc_id: int) -> memoryview:
+        """Structure token ids of a document (zero-copy, empty if unparsed)."""
+        return self._structure_tokens[self._structure_offsets[doc_id]:self._structure_offsets[doc_id + 1]]
+    
+    def text_tokens(self, doc_id: int) -> memoryview:
+        """Preprocessed text token ids of a document (zero-copy)."""
+        return self._text_tokens[self._text_offsets[doc_id]:self._text_offsets[doc_id + 1]]
+    
+    def structure_entry(self, token_id: int) -> str:
+        """Normalized structure entry of a structure token id."""
+        return self._string(self._structure_vocab, token_id)
+    
+    def text_token(self, token_id: int) -> str:
+        """Text token of a text token id."""
+        return self._string(self._text_vocab, token_id)
+    
+    def parsed(self, doc_id: int) -> bool:
+        """Whether the document had a Python structure."""
+        return bool(self._parsed[doc_id])
+    
+    def structure_hash(self, doc_id: int) -> str:
+        """Structure digest (as HybridSimilarityAnalyzer), '' if unparsed."""
+        if not self._parsed[doc_id]:
+            return ''
+        start = self._digests + 16 * doc_id
+        return self._mmap[start:start + 16].hex()
+    
+    def structure_string(self, doc_id: int) -> str:
+        """The document's structure string, as PreparedDocument.structure_string."""
+        return '\n'.join(self.structure_entry(token_id) for token_id in self.structure_tokens(doc_id))
+    
+    def feature_vector(self, doc_id: int) -> memoryview:
+        """Row of the feature table (zero-copy, ordered as feature_names)."""
+        width = len(self.feature_names)
+        return self._features[doc_id * width:(doc_id + 1) * width]
+    
+    def features(self, doc_id: int) -> Dict[str, int]:
+        """Code features of a document ({} if unparsed)."""
+        if not self._parsed[doc_id]:
+            return {}
+        return dict(zip(self.feature_names, self.feature_vector(doc_id)))
+    
+    def fingerprints(self, doc_id: int, fingerprinter: Optional[Fingerprinter] = None) -> array:
+        """
+        Index fingerprints of a document without re-reading its source.
+        
+        Same as fingerprinter.fingerprints(code) for a fingerprinter
+        without a boilerplate filter.
+        """
+        fingerprinter = fingerprinter or Fingerprinter()
+        text_hashes, structure_hashes = self.text_hashes, self.structure_hashes
+        return fingerprinter.value_fingerprints(
+            [text_hashes[token_id] for token_id in self.text_tokens(doc_id)],
+            [structure_hashes[token_id] for token_id in self.structure_tokens(doc_id)]
+        )
+    
+    def build_index(self, path: str, fingerprinter: Optional[Fingerprinter] = None) -> str:
+        """
+        Bulk-build a KGramIndex of the whole corpus without parsing.
+        
+        Args:
+            path: Output index path
+            fingerprinter: Fingerprinter giving k and window (default k=5, window=4)
+        
+        Returns:
+            Path of the written index (document ids match this corpus)
+        """
+        fingerprinter = fingerprinter or Fingerprinter()
+        writer = KGramIndexWriter(path, k=fingerprinter.k, window=fingerprinter.window)
+        for doc_id in range(len(self)):
+            writer.add_document(self.document_name(doc_id), self.fingerprints(doc_id, fingerprinter))
+        return writer.finish()
+    
+    def compare(self, doc1: int, doc2: int) -> Dict[str, Any]:
+        """
+        Token-level hybrid comparison of two documents.
+        
+        Structure and sequence similarity are SequenceMatcher ratios over
+        the structure and text token ids (not characters), so scores are
+        close to, but not identical with, HybridSimilarityAnalyzer's. When
+        either document has no structure the score is the sequence
+        similarity alone.
+        
+        Returns:
+            Dictionary with structure, sequence and feature similarity,
+            weighted_score and identical_structure
+        """
+        sequence_similarity = SequenceMatcher(
+            None, self.text_tokens(doc1), self.text_tokens(doc2), autojunk=False).ratio()
+        result = {
+            'structure_similarity': 0.0,
+            'sequence_similarity': sequence_similarity,
+            'feature_similarity': 0.0,
+            'weighted_score': sequence_similarity,
+            'identical_structure': False
+        }
+        if not (self._parsed[doc1] and self._parsed[doc2]):
+            return result
+        
+        structure_similarity = SequenceMatcher(
+            None, self.structure_tokens(doc1), self.structure_tokens(doc2), autojunk=False).ratio()
+        result['structure_similarity'] = structure_similarity
+        result['feature_similarity'] = self._feature_analyzer.compute_feature_similarity(
+            self.features(doc1), self.features(doc2))
+        result['weighted_score'] = (structure_similarity * self.structure_weight +
+                                    sequence_similarity * self.sequence_weight)
+        result['identical_structure'] = self.structure_hash(doc1) == self.structure_hash(doc2)
+        return result
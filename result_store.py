@@ -0,0 +1,222 @@
+"""
+Result Store
+============
+Server-side storage of analysis results, keyed by result id.
+
+The web app used to keep whole results (diff HTML, batch matrices) in
+Flask's cookie session, which is serialized and signed on every response.
+Results now live here and only their id goes into the session.
+
+Two stores share one interface (put/get/delete/stats):
+
+- MemoryResultStore: in-process LRU bounded by the total size of the
+  serialized results; the least recently used results are evicted first.
+- SQLiteResultStore: on-disk stdlib sqlite3 in WAL mode, shared by every
+  worker process on the machine, with the same size bound and LRU order
+  (by last access time).
+
+Results are stored as compact JSON, so what comes back is a fresh copy.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+# Default bound on the serialized size of all stored results
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _encode(result: Dict[str, Any]) -> str:
+    """Compact JSON form of a result."""
+    return json.dumps(result, separators=(',', ':'))
+
+
+class MemoryResultStore:
+    """
+    In-memory LRU result store with size-based eviction.
+    
+    Safe to share between threads.
+    """
+    
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes: Largest total size of the stored JSON (UTF-8 bytes);
+                a single larger result is not stored at all
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def put(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Store a result.
+        
+        Args:
+            result: JSON-serializable result dictionary
+        
+        Returns:
+            New result id, or None if the result alone exceeds max_bytes
+        """
+        data = _encode(result).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return None
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[result_id] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+        return result_id
+    
+    def get(self, result_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stored result (marked most recently used), or None if unknown or evicted."""
+        if not result_id:
+            return None
+        with self._lock:
+            data = self._entries.get(result_id)
+            if data is None:
+                return None
+            self._entries.move_to_end(result_id)
+        return json.loads(data)
+    
+    def delete(self, result_id: str) -> bool:
+        """Remove a result; returns whether it was stored."""
+        with self._lock:
+            data = self._entries.pop(result_id, None)
+            if data is None:
+                return False
+            self.total_bytes -= len(data)
+            return True
+    
+    def stats(self) -> Dict[str, int]:
+        """Entry count, stored bytes, size bound and evictions so far."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.total_bytes,
+                    'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class SQLiteResultStore:
+    """
+    On-disk result store with size-based LRU eviction.
+    
+    Safe to share between threads (one connection per thread) and between
+    processes on the same machine (WAL journal).
+    """
+    
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (and create if needed) a result store.
+        
+        Args:
+            path: SQLite database file path
+            max_bytes: Largest total size of the stored JSON (UTF-8 bytes)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' id TEXT PRIMARY KEY,'
+            ' data TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        connection.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+    
+    def put(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Store a result, evicting the least recently used ones over max_bytes.
+        
+        Args:
+            result: JSON-serializable result dictionary
+        
+        Returns:
+            New result id, or None if the result alone exceeds max_bytes
+        """
+        data = _encode(result)
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            return None
+        result_id = uuid.uuid4().hex
+        connection = self._connection()
+        with connection:
+            connection.execute('INSERT INTO results (id, data, size, accessed) VALUES (?, ?, ?, ?)',
+                               (result_id, data, size, time.time()))
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                # Oldest first, until the newest entries fit
+                cursor = connection.execute(
+                    'SELECT id, size FROM results WHERE id != ? ORDER BY accessed', (result_id,))
+                evicted = []
+                for old_id, old_size in cursor:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((old_id,))
+                    total -= old_size
+                connection.executemany('DELETE FROM results WHERE id = ?', evicted)
+                self.evictions += len(evicted)
+        return result_id
+    
+    def get(self, result_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stored result (marked most recently used), or None if unknown or evicted."""
+        if not result_id:
+            return None
+        connection = self._connection()
+        row = connection.execute('SELECT data FROM results WHERE id = ?', (result_id,)).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute('UPDATE results SET accessed = ? WHERE id = ?',
+                               (time.time(), result_id))
+        return json.loads(row[0])
+    
+    def delete(self, result_id: str) -> bool:
+        """Remove a result; returns whether it was stored."""
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute('DELETE FROM results WHERE id = ?', (result_id,))
+        return cursor.rowcount > 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Entry count, stored bytes, size bound and evictions by this process."""
+        entries, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'entries': entries, 'bytes': total,
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+    
+    def close(self) -> None:
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def open_result_store(path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+    """SQLiteResultStore at ``path`` if one is given, else a MemoryResultStore."""
+    if path:
+        return SQLiteResultStore(path, max_bytes)
+    return MemoryResultStore(max_bytes)
@@ -0,0 +1,658 @@
+"""
+Segmented Index Module
+======================
+A corpus index made of immutable k-gram index segments (LSM-tree style).
+
+Each ingest (e.g. one assignment upload) becomes a new segment file;
+queries fan out over all segments; withdrawn submissions are tombstoned in
+the manifest. A merge policy compacts groups of similarly sized segments
+and rewrites segments with many deletions, optionally on a background
+thread. Writers publish a new immutable segment list with a single
+reference swap, so ingest and merging never block queries. Queries pin
+the list they use; segments merged away are closed once no pinned list
+still holds them.
+
+Directory layout:
+    manifest.json   settings, the ordered segment list and tombstones
+    seg-NNNNNNNN.cki  one KGramIndex file per segment
+    seg-NNNNNNNN.src  the segment's sources, zlib-compressed per document
+                      (used to report matching line ranges)
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from document_frequency import DocumentFrequency
+from kgram_index import Fingerprinter, KGramIndex, KGramIndexWriter, write_index
+
+
+MANIFEST_FORMAT = 1
+
+SOURCE_MAGIC = b'CIDESRC1'
+SOURCE_HEADER = struct.Struct('<8sI4x')
+
+
+def write_sources(path: str, blobs: Sequence[bytes]) -> None:
+    """
+    Write a segment source file.
+    
+    Layout: header (magic, document count), uint64 offsets[count + 1]
+    relative to the end of the offset table, then the compressed blobs.
+    
+    Args:
+        path: Output path (replaced atomically)
+        blobs: zlib-compressed UTF-8 source per document id
+    """
+    offsets = array('Q', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(SOURCE_HEADER.pack(SOURCE_MAGIC, len(blobs)))
+        f.write(offsets.tobytes())
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class SourceFile:
+    """Read-only, memory-mapped segment source file."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.document_count = SOURCE_HEADER.unpack_from(self._mmap, 0)
+        if magic != SOURCE_MAGIC:
+            raise ValueError(f'Not a CIDE segment source file: {path}')
+        table_end = SOURCE_HEADER.size + 8 * (self.document_count + 1)
+        self._offsets = struct.unpack_from(f'<{self.document_count + 1}Q', self._mmap,
+                                           SOURCE_HEADER.size)
+        self._base = table_end
+    
+    def compressed(self, doc_id: int) -> bytes:
+        """Compressed source of a document (copied as-is when merging)."""
+        return self._mmap[self._base + self._offsets[doc_id]:self._base + self._offsets[doc_id + 1]]
+    
+    def text(self, doc_id: int) -> str:
+        """Source of a document."""
+        return zlib.decompress(self.compressed(doc_id)).decode('utf-8')
+    
+    def close(self) -> None:
+        """Release the memory map."""
+        self._mmap.close()
+
+
+class Segment:
+    """One immutable index segment plus its (mutable) tombstones."""
+    
+    def __init__(self, name: str, index: KGramIndex, deleted: Set[int], label: Optional[str] = None,
+                 sources: Optional[SourceFile] = None):
+        self.name = name
+        self.index = index
+        self.deleted = frozenset(deleted)
+        self.label = label
+        self.sources = sources
+        self.names = [index.document_name(doc_id) for doc_id in range(index.document_count)]
+    
+    @property
+    def document_count(self) -> int:
+        """Documents stored in the segment, including deleted ones."""
+        return self.index.document_count
+    
+    @property
+    def live_count(self) -> int:
+        """Documents not deleted."""
+        return self.index.document_count - len(self.deleted)
+    
+    def with_deleted(self, deleted: Iterable[int]) -> 'Segment':
+        """Copy of this segment sharing the index, with a new tombstone set."""
+        segment = Segment.__new__(Segment)
+        segment.name = self.name
+        segment.index = self.index
+        segment.deleted = frozenset(deleted)
+        segment.label = self.label
+        segment.sources = self.sources
+        segment.names = self.names
+        return segment
+    
+    def close(self) -> None:
+        """Release the segment's files (shared with its with_deleted copies)."""
+        self.index.close()
+        if self.sources is not None:
+            self.sources.close()
+
+
+def merge_segment_files(path: str, segments: Sequence[Segment],
+                        source_path: Optional[str] = None) -> None:
+    """
+    Write one index file holding the live documents of several segments.
+    
+    Postings are merged key by key straight from the segment files (no
+    re-fingerprinting); deleted documents are dropped and document ids
+    renumbered in segment order.
+    
+    Args:
+        path: Output index path
+        segments: Segments to merge, oldest first
+        source_path: Where to write the merged sources (skipped unless
+            every segment has sources)
+    """
+    names = []
+    counts = array('I')
+    remaps = []
+    for segment in segments:
+        remap = {}
+        for local_id in range(segment.document_count):
+            if local_id in segment.deleted:
+                continue
+            remap[local_id] = len(names)
+            names.append(segment.names[local_id])
+            counts.append(segment.index.fingerprint_count(local_id))
+        remaps.append(remap)
+    
+    def tagged(position: int, segment: Segment) -> Iterable[Tuple[int, int, List[int]]]:
+        for key, doc_ids in segment.index.iter_postings():
+            yield key, position, doc_ids
+    
+    streams = [tagged(position, segment) for position, segment in enumerate(segments)]
+    
+    def grouped() -> Iterable[Tuple[int, List[int]]]:
+        current_key = None
+        current_docs = []
+        for key, position, doc_ids in heapq.merge(*streams):
+            if key != current_key:
+                if current_docs:
+                    yield current_key, current_docs
+                current_key = key
+                current_docs = []
+            remap = remaps[position]
+            current_docs.extend(remap[doc_id] for doc_id in doc_ids if doc_id in remap)
+        if current_docs:
+            yield current_key, current_docs
+    
+    first = segments[0].index
+    write_index(path, first.k, first.window, names, counts, grouped())
+    
+    if source_path is not None and all(segment.sources for segment in segments):
+        write_sources(source_path, [segment.sources.compressed(local_id)
+                                    for segment, remap in zip(segments, remaps)
+                                    for local_id in remap])
+
+
+class SegmentedIndex:
+    """
+    Corpus index over immutable segments with tombstones and merging.
+    """
+    
+    def __init__(self, directory: str, k: int = 5, window: int = 4, merge_factor: int = 4,
+                 max_deleted_ratio: float = 0.3, fingerprinter: Optional[Fingerprinter] = None):
+        """
+        Open or create a segmented index.
+        
+        Args:
+            directory: Index directory
+            k: Tokens per k-gram (only used when creating)
+            window: Winnowing window (only used when creating)
+            merge_factor: Segments of similar size merged together
+            max_deleted_ratio: Deleted fraction that triggers a rewrite
+            fingerprinter: Optional Fingerprinter (must match k and window)
+        """
+        self.directory = directory
+        self.merge_factor = merge_factor
+        self.max_deleted_ratio = max_deleted_ratio
+        self.last_merge_error = None
+        
+        self._write_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._stop_merging = None
+        self._merge_thread = None
+        self._pending = set()
+        self._stats = None
+        
+        # Segment lists pinned by queries, per merge generation, and the
+        # segments merged away in each generation (closed once unpinned)
+        self._reader_lock = threading.Lock()
+        self._generation = 0
+        self._readers = {}
+        self._retired = []
+        
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') != MANIFEST_FORMAT:
+                raise ValueError(f"Unsupported index manifest format: {manifest.get('format')}")
+            self.k = manifest['k']
+            self.window = manifest['window']
+            self._next_segment = manifest['next_segment']
+            self._segments = tuple(self._open_segment(entry['name'], set(entry['deleted']),
+                                                      entry.get('label'))
+                                   for entry in manifest['segments'])
+        else:
+            self.k = k
+            self.window = window
+            self._next_segment = 1
+            self._segments = ()
+            self._write_manifest(self._segments)
+        
+        self.fingerprinter = fingerprinter or Fingerprinter(k=self.k, window=self.window)
+        if (self.fingerprinter.k, self.fingerprinter.window) != (self.k, self.window):
+            raise ValueError('Fingerprinter settings do not match the index')
+        
+        self._locations = {}
+        for segment in self._segments:
+            for local_id, name in enumerate(segment.names):
+                if local_id not in segment.deleted:
+                    self._locations[name] = (segment.name, local_id)
+        self._remove_orphans()
+    
+    def _segment_path(self, name: str) -> str:
+        """File path of a segment."""
+        return os.path.join(self.directory, f"{name}.cki")
+    
+    def _source_path(self, name: str) -> str:
+        """File path of a segment's sources."""
+        return os.path.join(self.directory, f"{name}.src")
+    
+    def _open_segment(self, name: str, deleted: Set[int], label: Optional[str]) -> Segment:
+        """Map a segment's files."""
+        source_path = self._source_path(name)
+        sources = SourceFile(source_path) if os.path.exists(source_path) else None
+        return Segment(name, KGramIndex(self._segment_path(name)), deleted, label, sources)
+    
+    def _write_manifest(self, segments: Sequence[Segment]) -> None:
+        """Atomically replace manifest.json."""
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'k': self.k,
+            'window': self.window,
+            'next_segment': self._next_segment,
+            'segments': [{
+                'name': segment.name,
+                'label': segment.label,
+                'documents': segment.document_count,
+                'deleted': sorted(segment.deleted)
+            } for segment in segments]
+        }
+        path = os.path.join(self.directory, 'manifest.json')
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    
+    def _remove_orphans(self) -> None:
+        """Delete segment files no longer referenced by the manifest."""
+        with self._write_lock:
+            # Segments still being written are not orphans
+            keep = {segment.name for segment in self._segments} | self._pending
+        for entry in os.listdir(self.directory):
+            if not entry.startswith('seg-') or entry.split('.', 1)[0] in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, entry))
+            except OSError:
+                # Still mapped by a reader on some platforms; retried later
+                pass
+    
+    def _reserve_segment_name(self) -> str:
+        """Allocate a fresh segment name (caller holds the write lock)."""
+        name = f"seg-{self._next_segment:08d}"
+        self._next_segment += 1
+        self._pending.add(name)
+        return name
+    
+    @property
+    def segments(self) -> Tuple[Segment, ...]:
+        """
+        Current immutable segment list (for inspection; segments of an
+        older list may be closed by later merges).
+        """
+        return self._segments
+    
+    def _pin_segments(self) -> Tuple[int, Tuple[Segment, ...]]:
+        """Current segment list, kept open until _unpin_segments(generation)."""
+        with self._reader_lock:
+            generation = self._generation
+            self._readers[generation] = self._readers.get(generation, 0) + 1
+            return generation, self._segments
+    
+    def _unpin_segments(self, generation: int) -> None:
+        """Release a list returned by _pin_segments."""
+        with self._reader_lock:
+            self._readers[generation] -= 1
+            if not self._readers[generation]:
+                del self._readers[generation]
+            self._close_retired()
+    
+    def _retire(self, segments: Tuple[Segment, ...], replaced: Sequence[Segment]) -> None:
+        """Publish a merged segment list and retire the segments it replaced."""
+        with self._reader_lock:
+            self._segments = segments
+            self._generation += 1
+            self._retired.extend((self._generation, segment) for segment in replaced)
+            self._close_retired()
+    
+    def _close_retired(self) -> None:
+        """
+        Close retired segments no pinned list can hold: lists pinned in
+        an earlier generation (caller holds the reader lock).
+        """
+        oldest = min(self._readers, default=self._generation)
+        while self._retired and self._retired[0][0] <= oldest:
+            _, segment = self._retired.pop(0)
+            segment.close()
+    
+    def documents(self) -> List[str]:
+        """Names of all live documents."""
+        return list(self._locations)
+    
+    def __len__(self) -> int:
+        return len(self._locations)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._locations
+    
+    def document_source(self, name: str) -> Optional[str]:
+        """Stored source of a live document (None if unknown or not stored)."""
+        location = self._locations.get(name)
+        if location is None:
+            return None
+        generation, segments = self._pin_segments()
+        try:
+            for segment in segments:
+                if segment.name == location[0]:
+                    return segment.sources.text(location[1]) if segment.sources else None
+            return None
+        finally:
+            self._unpin_segments(generation)
+    
+    def add_documents(self, documents: Iterable[Tuple[str, str]], label: Optional[str] = None,
+                      language: str = 'python') -> Optional[str]:
+        """
+        Ingest documents as one new segment.
+        
+        Fingerprinting and writing the segment happen without holding any
+        lock that queries need. Documents whose name is already live
+        replace the older copy, which is tombstoned.
+        
+        Args:
+            documents: (name, content) pairs
+            label: Optional segment label (e.g. the assignment name)
+            language: Language of the documents
+        
+        Returns:
+            Name of the new segment, or None if there were no documents
+        """
+        latest = {}
+        for name, content in documents:
+            latest[name] = content
+        if not latest:
+            return None
+        
+        with self._write_lock:
+            segment_name = self._reserve_segment_name()
+        
+        added = []
+        try:
+            writer = KGramIndexWriter(self._segment_path(segment_name), k=self.k, window=self.window)
+            for name, content in latest.items():
+                fingerprints = self.fingerprinter.fingerprints(content, language)
+                writer.add_document(name, fingerprints)
+                # Kept even without DF statistics: they may be built from the
+                # older segments before this one is published
+                added.append(fingerprints)
+            writer.finish()
+            write_sources(self._source_path(segment_name),
+                          [zlib.compress(content.encode('utf-8')) for content in latest.values()])
+            new_segment = self._open_segment(segment_name, set(), label)
+        except Exception:
+            with self._write_lock:
+                self._pending.discard(segment_name)
+            raise
+        
+        with self._write_lock:
+            segments = list(self._segments)
+            replaced = {}
+            for name in latest:
+                location = self._locations.get(name)
+                if location is not None:
+                    replaced.setdefault(location[0], set()).add(location[1])
+            if self._stats is not None:
+                for segment in segments:
+                    for local_id in replaced.get(segment.name, ()):
+                        self._forget(segment, local_id, language)
+                for fingerprints in added:
+                    self._stats.add_document(fingerprints)
+            segments = [segment.with_deleted(segment.deleted | replaced[segment.name])
+                        if segment.name in replaced else segment for segment in segments]
+            segments.append(new_segment)
+            
+            self._write_manifest(segments)
+            for local_id, name in enumerate(new_segment.names):
+                self._locations[name] = (segment_name, local_id)
+            self._segments = tuple(segments)
+            self._pending.discard(segment_name)
+        
+        return segment_name
+    
+    def delete_document(self, name: str, language: str = 'python') -> bool:
+        """
+        Withdraw a document (tombstone; space is reclaimed by merging).
+        
+        Args:
+            name: Document name
+            language: Language the document was added with (used to keep
+                document frequencies up to date)
+        
+        Returns:
+            Whether the document was live
+        """
+        with self._write_lock:
+            location = self._locations.pop(name, None)
+            if location is None:
+                return False
+            if self._stats is not None:
+                for segment in self._segments:
+                    if segment.name == location[0]:
+                        self._forget(segment, location[1], language)
+            segments = tuple(segment.with_deleted(segment.deleted | {location[1]})
+                             if segment.name == location[0] else segment
+                             for segment in self._segments)
+            self._write_manifest(segments)
+            self._segments = segments
+        return True
+    
+    def _forget(self, segment: Segment, local_id: int, language: str) -> None:
+        """Remove a document from the DF statistics (caller holds the write lock)."""
+        if segment.sources is None or local_id in segment.deleted:
+            return
+        self._stats.remove_document(
+            self.fingerprinter.fingerprints(segment.sources.text(local_id), language))
+    
+    def document_frequencies(self) -> DocumentFrequency:
+        """
+        Corpus-wide DF statistics of the live documents.
+        
+        Built from the segment postings on first use, then updated by every
+        add and delete (documents replaced or deleted are re-fingerprinted
+        from their stored source). Tune the stop-list through the returned
+        object's max_df_ratio and min_documents.
+        """
+        with self._write_lock:
+            if self._stats is None:
+                stats = DocumentFrequency()
+                counts = stats.counts
+                for segment in self._segments:
+                    deleted = segment.deleted
+                    for key, doc_ids in segment.index.iter_postings():
+                        live = len(doc_ids) - sum(1 for doc_id in doc_ids if doc_id in deleted) \
+                            if deleted else len(doc_ids)
+                        if live:
+                            counts[key] = counts.get(key, 0) + live
+                stats.documents = len(self._locations)
+                self._stats = stats
+            return self._stats
+    
+    def score_candidates(self, fingerprints: Iterable[int], top_k: int = 10, min_shared: int = 1,
+                         max_df: Optional[int] = None, weighted: bool = False) -> List[Dict[str, Any]]:
+        """
+        Rank live documents of every segment by shared fingerprints.
+        
+        Args:
+            fingerprints: Query fingerprints
+            top_k: Number of candidates to return
+            min_shared: Minimum number of shared fingerprints
+            max_df: Skip fingerprints found in more documents than this
+                (per segment)
+            weighted: Skip corpus stop-listed fingerprints and rank by
+                IDF-weighted shared fingerprints (see document_frequencies)
+        
+        Returns:
+            Candidates, best first: name, segment, shared, containment and score
+        """
+        stats = self.document_frequencies() if weighted else None
+        query = array('Q', sorted(set(fingerprints)))
+        candidates = []
+        generation, segments = self._pin_segments()
+        try:
+            for segment in segments:
+                for candidate in segment.index.score_candidates(
+                        query, top_k=top_k, min_shared=min_shared, max_df=max_df,
+                        exclude=segment.deleted, stats=stats):
+                    candidate['segment'] = segment.name
+                    del candidate['doc_id']
+                    candidates.append(candidate)
+        finally:
+            self._unpin_segments(generation)
+        candidates.sort(key=lambda c: (c['score'], c['shared']), reverse=True)
+        return candidates[:top_k]
+    
+    def query(self, code: str, top_k: int = 10, language: str = 'python') -> List[Dict[str, Any]]:
+        """Fingerprint code and return its best candidate documents."""
+        return self.score_candidates(self.fingerprinter.fingerprints(code, language), top_k=top_k)
+    
+    def _pick_merge(self, segments: Sequence[Segment]) -> List[Segment]:
+        """
+        Choose segments to merge next (tiered policy).
+        
+        A segment whose deleted fraction reaches max_deleted_ratio is
+        rewritten on its own; otherwise merge_factor segments of the same
+        size tier (log base merge_factor of the live count) are merged.
+        """
+        for segment in segments:
+            if segment.deleted and len(segment.deleted) >= self.max_deleted_ratio * segment.document_count:
+                return [segment]
+        
+        tiers = {}
+        for segment in segments:
+            tier = int(math.log(max(segment.live_count, 1), self.merge_factor))
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier][:self.merge_factor]
+        return []
+    
+    def merge_once(self) -> bool:
+        """
+        Perform one merge step if the policy asks for one.
+        
+        Returns:
+            Whether a merge was performed
+        """
+        with self._merge_lock:
+            snapshot = self._segments
+            chosen = self._pick_merge(snapshot)
+            if not chosen:
+                return False
+            
+            with self._write_lock:
+                merged_name = self._reserve_segment_name()
+            merged_path = self._segment_path(merged_name)
+            
+            merged = None
+            if any(segment.live_count for segment in chosen):
+                try:
+                    merge_segment_files(merged_path, chosen, self._source_path(merged_name))
+                    merged = self._open_segment(merged_name, set(),
+                                                chosen[0].label if len(chosen) == 1 else None)
+                except Exception:
+                    with self._write_lock:
+                        self._pending.discard(merged_name)
+                    raise
+            
+            with self._write_lock:
+                current = {segment.name: segment for segment in self._segments}
+                chosen_names = {segment.name for segment in chosen}
+                
+                # Carry over deletions that happened while merging
+                if merged is not None:
+                    new_ids = {name: local_id for local_id, name in enumerate(merged.names)}
+                    late_deleted = set()
+                    for segment in chosen:
+                        for local_id in current[segment.name].deleted - segment.deleted:
+                            late_deleted.add(new_ids[segment.names[local_id]])
+                    if late_deleted:
+                        merged = merged.with_deleted(late_deleted)
+                
+                segments = []
+                for segment in self._segments:
+                    if segment.name not in chosen_names:
+                        segments.append(segment)
+                    elif segment.name == chosen[0].name and merged is not None:
+                        segments.append(merged)
+                
+                self._write_manifest(segments)
+                if merged is not None:
+                    for local_id, name in enumerate(merged.names):
+                        if local_id not in merged.deleted:
+                            self._locations[name] = (merged_name, local_id)
+                self._retire(tuple(segments), chosen)
+                self._pending.discard(merged_name)
+            
+            self._remove_orphans()
+            return True
+    
+    def merge_all(self) -> int:
+        """Run merge steps until the policy is satisfied; return how many ran."""
+        steps = 0
+        while self.merge_once():
+            steps += 1
+        return steps
+    
+    def start_background_merging(self, interval: float = 5.0) -> None:
+        """Run merge steps on a daemon thread every ``interval`` seconds."""
+        if self._merge_thread is not None:
+            return
+        self._stop_merging = threading.Event()
+        
+        def loop():
+            while not self._stop_merging.wait(interval):
+                try:
+                    self.merge_all()
+                except Exception as e:
+                    self.last_merge_error = str(e)
+        
+        self._merge_thread = threading.Thread(target=loop, name='cide-index-merger', daemon=True)
+        self._merge_thread.start()
+    
+    def stop_background_merging(self) -> None:
+        """Stop the background merge thread (waits for a running merge)."""
+        if self._merge_thread is None:
+            return
+        self._stop_merging.set()
+        self._merge_thread.join()
+        self._merge_thread = None
@@ -0,0 +1,180 @@
+"""
+Snippet Search Module
+=====================
+Find where a code fragment appears in an indexed corpus.
+
+A snippet is fingerprinted with the same pipeline as indexed documents
+(CodePreprocessor text k-grams plus ASTNormalizer structure k-grams). Since
+fragments are often cut mid-block, Python structure k-grams come from the
+largest dedented, parsable part of the snippet; lexed languages and text
+k-grams need no parse at all.
+Candidates are looked up in a SegmentedIndex, and the best ones are
+confirmed against their stored sources to report matching line ranges.
+"""
+
+import ast
+import textwrap
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from corpus_matcher import elapsed_ms
+from lexers import has_structure
+from segmented_index import SegmentedIndex
+
+
+# Lines dropped from the ends of a snippet when looking for a parsable part
+MAX_TRIMMED_LINES = 6
+
+
+def parsable_region(snippet: str) -> Optional[Tuple[str, int]]:
+    """
+    Largest dedented part of a snippet that parses as Python.
+    
+    Lines are trimmed from both ends (fewest first), so a fragment with a
+    cut-off first or last statement still yields structure k-grams.
+    
+    Args:
+        snippet: Code fragment
+    
+    Returns:
+        (code, index of its first line in the snippet), or None
+    """
+    lines = snippet.split('\n')
+    for trimmed in range(min(MAX_TRIMMED_LINES, len(lines) - 1) + 1):
+        for head in range(trimmed + 1):
+            part = lines[head:len(lines) - (trimmed - head)]
+            code = textwrap.dedent('\n'.join(part))
+            if not code.strip():
+                continue
+            try:
+                ast.parse(code)
+            except (SyntaxError, ValueError):
+                continue
+            return code, head
+    return None
+
+
+def merge_line_ranges(spans: Iterable[Tuple[int, int]], gap: int = 1) -> List[List[int]]:
+    """
+    Merge (first, last) line spans that overlap or are within ``gap`` lines.
+    
+    Returns:
+        Sorted [first, last] ranges
+    """
+    ranges = []
+    for first, last in sorted(spans):
+        if ranges and first <= ranges[-1][1] + gap:
+            ranges[-1][1] = max(ranges[-1][1], last)
+        else:
+            ranges.append([first, last])
+    return ranges
+
+
+class SnippetSearcher:
+    """
+    Ranked snippet lookup over a SegmentedIndex.
+    """
+    
+    def __init__(self, index: SegmentedIndex, candidate_factor: int = 3, min_shared: int = 2):
+        """
+        Args:
+            index: Corpus index (documents need stored sources for line ranges)
+            candidate_factor: Index candidates confirmed per requested match
+            min_shared: Minimum shared fingerprints for a candidate
+        """
+        self.index = index
+        self.fingerprinter = index.fingerprinter
+        self.candidate_factor = candidate_factor
+        self.min_shared = min_shared
+    
+    def fingerprint_snippet(self, snippet: str, language: str = 'python'
+                            ) -> Tuple[List[Tuple[int, int, int]], Optional[List[int]]]:
+        """
+        Located fingerprints of a snippet, tolerating partial code.
+        
+        Returns:
+            (located fingerprints, [first, last] snippet lines used for
+            structure k-grams or None)
+        """
+        if language != 'python':
+            # Lexers tolerate partial code, so the whole snippet is used
+            located = self.fingerprinter.located_fingerprints(snippet, language)
+            return located, [1, len(snippet.split('\n'))] if has_structure(language) else None
+        
+        region = parsable_region(snippet)
+        if region is None:
+            return self.fingerprinter.located_fingerprints(snippet, language, structure_code=''), None
+        
+        code, head = region
+        located = self.fingerprinter.located_fingerprints(snippet, language, line_offset=head,
+                                                          structure_code=code)
+        return located, [head + 1, head + len(code.split('\n'))]
+    
+    def search(self, snippet: str, top_k: int = 10, language: str = 'python') -> Dict[str, Any]:
+        """
+        Find the documents containing a snippet.
+        
+        Args:
+            snippet: Code fragment
+            top_k: Number of matches to return
+            language: Language of the snippet and corpus
+        
+        Returns:
+            Dictionary with query info, ranked matches (document name,
+            coverage of the snippet, matching line ranges in the document
+            and in the snippet) and per-stage timings in milliseconds
+        """
+        started = time.perf_counter()
+        located, parsed_lines = self.fingerprint_snippet(snippet, language)
+        snippet_spans = {}
+        for value, first, last in located:
+            snippet_spans.setdefault(value, []).append((first, last))
+        timings = {'fingerprint_ms': elapsed_ms(started)}
+        
+        stage = time.perf_counter()
+        candidates = self.index.score_candidates(
+            snippet_spans, top_k=top_k * self.candidate_factor,
+            min_shared=min(self.min_shared, len(snippet_spans)) or 1
+        ) if snippet_spans else []
+        timings['lookup_ms'] = elapsed_ms(stage)
+        
+        stage = time.perf_counter()
+        matches = []
+        for candidate in candidates:
+            match = {
+                'name': candidate['name'],
+                'segment': candidate['segment'],
+                'shared': candidate['shared'],
+                'coverage': candidate['containment'],
+                'document_lines': [],
+                'snippet_lines': []
+            }
+            source = self.index.document_source(candidate['name'])
+            if source is not None:
+                # Every k-gram of the document, so no shared k-gram is missed
+                document_spans = {}
+                for value, first, last in self.fingerprinter.located_fingerprints(
+                        source, language, window=1):
+                    if value in snippet_spans:
+                        document_spans.setdefault(value, []).append((first, last))
+                match['shared'] = len(document_spans)
+                match['coverage'] = len(document_spans) / len(snippet_spans)
+                match['document_lines'] = merge_line_ranges(
+                    span for spans in document_spans.values() for span in spans)
+                match['snippet_lines'] = merge_line_ranges(
+                    span for value in document_spans for span in snippet_spans[value])
+            matches.append(match)
+        
+        matches.sort(key=lambda m: (m['coverage'], m['shared']), reverse=True)
+        timings['locate_ms'] = elapsed_ms(stage)
+        timings['total_ms'] = elapsed_ms(started)
+        
+        return {
+            'query': {
+                'lines': len(snippet.split('\n')),
+                'fingerprints': len(snippet_spans),
+                'parsed_lines': parsed_lines
+            },
+            'matches': [match for match in matches[:top_k] if match['shared']],
+            'timings': timings
+        }
@@ -0,0 +1,522 @@
+"""
+Submission Corpus Module
+========================
+Persistent, incrementally updated batch comparison.
+
+A SubmissionCorpus keeps the prepared documents, the lower-triangle score
+rows, per-file score totals and the similarity clusters of a class. Adding a
+late submission scores it against the existing documents only (O(n) work),
+appends one score row and updates rankings and clusters in place, instead
+of re-running compare_all_pairs over the whole class. Replacing or removing
+a submission likewise only re-scores (or drops) that document's row and
+column; several changes made inside ``with corpus.changes():`` share one
+rebuild of totals and clusters and one rewrite of the files.
+
+On-disk layout (a directory):
+    corpus.json     manifest: settings and the document table
+    contents.jsonl  one {"name", "content"} line per document, append-only
+    scores.f32      little-endian float32 rows; row i holds the scores of
+                    document i against documents 0..i-1, append-only
+"""
+
+import hashlib
+import json
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from batch_comparator import BatchComparator
+from batch_result import BatchResult, format_percentage
+
+
+CORPUS_FORMAT = 1
+
+
+class SubmissionCorpus:
+    """
+    Incrementally maintained all-pairs comparison of a set of submissions.
+    """
+    
+    def __init__(self, path: Optional[str] = None, mode: str = 'hybrid',
+                 language: str = 'python', threshold: float = 0.75, store=None,
+                 boilerplate=None):
+        """
+        Create an empty corpus.
+        
+        Args:
+            path: Directory to persist to (None keeps the corpus in memory)
+            mode: Analysis mode ('basic' or 'hybrid')
+            language: Programming language of the submissions
+            threshold: Similarity threshold for clusters (0.0 to 1.0)
+            store: Optional FingerprintStore for prepared documents
+            boilerplate: Optional BoilerplateFilter applied to every
+                document (not persisted; pass it again when reopening)
+        """
+        self.path = path
+        self.mode = mode
+        self.language = language
+        self.threshold = threshold
+        self.comparator = BatchComparator(mode=mode, store=store, boilerplate=boilerplate)
+        
+        self.names = []
+        self.contents = []
+        self.content_hashes = []
+        self.index = {}
+        self.rows = []
+        self.totals = array('d')
+        self._prepared = {}
+        self._by_content = {}
+        self._parent = []
+        # Committed length of contents.jsonl (bytes past it are an unfinished add)
+        self._contents_bytes = 0
+        # Inside changes(): whether rebuilds are deferred, and whether one is due
+        self._deferring = False
+        self._stale = False
+    
+    @classmethod
+    def open(cls, path: str, store=None, boilerplate=None) -> 'SubmissionCorpus':
+        """
+        Load a corpus saved in ``path``.
+        
+        Args:
+            path: Corpus directory
+            store: Optional FingerprintStore for prepared documents
+            boilerplate: Optional BoilerplateFilter the corpus was built with
+        
+        Returns:
+            The loaded corpus (documents are re-prepared lazily)
+        """
+        with open(os.path.join(path, 'corpus.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != CORPUS_FORMAT:
+            raise ValueError(f"Unsupported corpus format: {manifest.get('format')}")
+        
+        expected = boilerplate.digest if boilerplate else None
+        if manifest.get('boilerplate') != expected:
+            raise ValueError('Corpus was built with different boilerplate files')
+        
+        corpus = cls(path, mode=manifest['mode'], language=manifest['language'],
+                     threshold=manifest['threshold'], store=store, boilerplate=boilerplate)
+        count = len(manifest['documents'])
+        
+        # Files are append-only; anything past the manifest is an unfinished
+        # add, which the next append overwrites
+        with open(os.path.join(path, 'contents.jsonl'), 'rb') as f:
+            for _, line in zip(range(count), f):
+                entry = json.loads(line)
+                corpus._register(entry['name'], entry['content'])
+                corpus._contents_bytes += len(line)
+        
+        scores = array('f')
+        with open(os.path.join(path, 'scores.f32'), 'rb') as f:
+            scores.frombytes(f.read(4 * (count * (count - 1) // 2)))
+        if sys.byteorder == 'big':
+            scores.byteswap()
+        
+        offset = 0
+        for i in range(count):
+            row = scores[offset:offset + i]
+            offset += i
+            corpus._add_row(row)
+        
+        return corpus
+    
+    def save(self) -> None:
+        """Rewrite the whole corpus directory."""
+        if self.path is None:
+            raise ValueError('Corpus has no path to save to')
+        os.makedirs(self.path, exist_ok=True)
+        
+        self._contents_bytes = 0
+        with open(os.path.join(self.path, 'contents.jsonl'), 'wb') as f:
+            for name, content in zip(self.names, self.contents):
+                line = self._content_line(name, content)
+                f.write(line)
+                self._contents_bytes += len(line)
+        
+        with open(os.path.join(self.path, 'scores.f32'), 'wb') as f:
+            for row in self.rows:
+                f.write(self._row_bytes(row))
+        
+        self._write_manifest()
+    
+    def _append_to_disk(self, name: str, content: str, row: array) -> None:
+        """
+        Persist one added document in O(n): append data, then swap manifest.
+        
+        Both files are first truncated to their committed length, dropping
+        the tail of an add that was interrupted before its manifest swap.
+        """
+        if not os.path.exists(os.path.join(self.path, 'corpus.json')):
+            self.save()
+            return
+        
+        line = self._content_line(name, content)
+        with open(os.path.join(self.path, 'contents.jsonl'), 'r+b') as f:
+            f.seek(self._contents_bytes)
+            f.truncate()
+            f.write(line)
+        previous = len(self.rows) - 1
+        with open(os.path.join(self.path, 'scores.f32'), 'r+b') as f:
+            f.seek(4 * (previous * (previous - 1) // 2))
+            f.truncate()
+            f.write(self._row_bytes(row))
+        self._contents_bytes += len(line)
+        self._write_manifest()
+    
+    @staticmethod
+    def _content_line(name: str, content: str) -> bytes:
+        """contents.jsonl line of a document."""
+        return (json.dumps({'name': name, 'content': content}) + '\n').encode('utf-8')
+    
+    @staticmethod
+    def _row_bytes(row: array) -> bytes:
+        """Little-endian bytes of a score row."""
+        if sys.byteorder == 'big':
+            row = array('f', row)
+            row.byteswap()
+        return row.tobytes()
+    
+    def _write_manifest(self) -> None:
+        """Atomically replace corpus.json."""
+        manifest = {
+            'format': CORPUS_FORMAT,
+            'mode': self.mode,
+            'language': self.language,
+            'threshold': self.threshold,
+            'boilerplate': self.comparator.boilerplate.digest if self.comparator.boilerplate else None,
+            'documents': [{'name': name, 'sha256': digest}
+                          for name, digest in zip(self.names, self.content_hashes)]
+        }
+        path = os.path.join(self.path, 'corpus.json')
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+    
+    def _register(self, name: str, content: str) -> int:
+        """Add a document to the name/content tables."""
+        idx = len(self.names)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        self.names.append(name)
+        self.contents.append(content)
+        self.content_hashes.append(digest)
+        self.index[name] = idx
+        self._by_content.setdefault(digest, idx)
+        return idx
+    
+    def _add_row(self, row: array) -> None:
+        """Attach the score row of the newest document and update totals/clusters."""
+        idx = len(self.rows)
+        self.rows.append(row)
+        self.totals.append(sum(row))
+        self._parent.append(idx)
+        for j, score in enumerate(row):
+            self.totals[j] += score
+            if score >= self.threshold:
+                self._union(idx, j)
+    
+    def _rebuild_from_rows(self) -> None:
+        """
+        Recompute totals and the union-find from the stored scores (after
+        edits or removals; summing in add order keeps totals identical to
+        a corpus built from scratch).
+        """
+        self.totals = array('d', [0.0]) * len(self.rows)
+        self._parent = list(range(len(self.rows)))
+        for i, row in enumerate(self.rows):
+            self.totals[i] = sum(row)
+            for j, score in enumerate(row):
+                self.totals[j] += score
+                if score >= self.threshold:
+                    self._union(i, j)
+    
+    def _refresh(self) -> None:
+        """Rebuild totals and clusters and rewrite a persisted corpus (deferred inside changes())."""
+        if self._deferring:
+            self._stale = True
+            return
+        self._rebuild_from_rows()
+        if self.path is not None:
+            self.save()
+    
+    @contextmanager
+    def changes(self):
+        """
+        Apply several adds, updates and removals with a single rebuild.
+        
+        Inside the block, updates and removals leave totals, clusters and
+        the on-disk files stale (lookups and scores stay current); they are
+        rebuilt and a persisted corpus rewritten once when the block ends.
+        """
+        self._deferring = True
+        try:
+            yield self
+        finally:
+            self._deferring = False
+            if self._stale:
+                self._stale = False
+                self._refresh()
+    
+    def set_threshold(self, threshold: float) -> None:
+        """Change the cluster threshold (clusters are rebuilt, the manifest rewritten)."""
+        self.threshold = threshold
+        self._rebuild_from_rows()
+        if self.path is not None and os.path.exists(os.path.join(self.path, 'corpus.json')):
+            self._write_manifest()
+    
+    def _rebuild_lookups(self) -> None:
+        """Recompute the name and content-hash lookups from the tables."""
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+        self._by_content = {}
+        for idx, digest in enumerate(self.content_hashes):
+            self._by_content.setdefault(digest, idx)
+    
+    def _prepared_document(self, idx: int) -> Any:
+        """Prepared form of document idx, built on first use."""
+        doc = self._prepared.get(idx)
+        if doc is None:
+            doc = self.comparator.prepare_document(self.contents[idx], self.language)
+            self._prepared[idx] = doc
+        return doc
+    
+    def add_document(self, name: str, content: str) -> Dict[str, Any]:
+        """
+        Score a new submission against the existing ones and add it.
+        
+        Only the new document is prepared and only its n scores are
+        computed; totals, clusters and the on-disk files are updated in
+        place.
+        
+        Args:
+            name: Unique document name
+            content: File content
+        
+        Returns:
+            Dictionary with the new document's index, the number of
+            comparisons made and its best matches
+        
+        Raises:
+            ValueError: If a document with this name already exists
+        """
+        if name in self.index:
+            raise ValueError(f'Document already in corpus: {name}')
+        
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        duplicate_of = self._by_content.get(digest)
+        
+        stripped, excluded_fraction = self.comparator.strip_boilerplate(content, self.language)
+        doc = self.comparator.prepare_stripped(stripped, self.language)
+        row = array('f', self._score(doc, digest, range(len(self.names)), len(self.names)))
+        
+        idx = self._register(name, content)
+        self._prepared[idx] = doc
+        if self._stale:
+            # Totals, clusters and files are rebuilt when changes() ends
+            self.rows.append(row)
+        else:
+            self._add_row(row)
+            if self.path is not None:
+                self._append_to_disk(name, content, row)
+        
+        return self._change_info(name, len(row), duplicate_of, excluded_fraction)
+    
+    def _score(self, doc: Any, digest: str, others: Iterable[int], idx: int) -> List[float]:
+        """Similarities of a prepared document (at position idx) against existing documents."""
+        scores = []
+        for j in others:
+            if self.content_hashes[j] == digest:
+                # Byte-identical submission: no need to run the matchers
+                scores.append(1.0)
+                continue
+            # Lower index first, matching compare_all_pairs' (i < j) order
+            pair = (self._prepared_document(j), doc) if j < idx else (doc, self._prepared_document(j))
+            similarity, _, _ = self.comparator.compare_prepared(*pair, self.language)
+            scores.append(similarity)
+        return scores
+    
+    def _change_info(self, name: str, comparisons: int, duplicate_of: Optional[int],
+                     excluded_fraction: float) -> Dict[str, Any]:
+        """Summary returned by add_document and update_document."""
+        return {
+            'name': name,
+            'index': self.index[name],
+            'comparisons': comparisons,
+            'duplicate_of': self.names[duplicate_of] if duplicate_of is not None else None,
+            'excluded_fraction': excluded_fraction,
+            'top_matches': self.top_matches(name, 5)
+        }
+    
+    def update_document(self, name: str, content: str) -> Dict[str, Any]:
+        """
+        Replace the content of an existing submission.
+        
+        Only the changed document is prepared again and only its n - 1
+        scores are recomputed; totals and clusters are then rebuilt from
+        the stored scores. A persisted corpus is rewritten
+        (its files are append-only).
+        
+        Args:
+            name: Existing document name
+            content: New file content
+        
+        Returns:
+            Same dictionary as add_document (0 comparisons if the content
+            is unchanged)
+        
+        Raises:
+            KeyError: If there is no document with this name
+        """
+        idx = self.index[name]
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if digest == self.content_hashes[idx]:
+            return self._change_info(name, 0, None, 0.0)
+        
+        stripped, excluded_fraction = self.comparator.strip_boilerplate(content, self.language)
+        doc = self.comparator.prepare_stripped(stripped, self.language)
+        others = [j for j in range(len(self.names)) if j != idx]
+        scores = self._score(doc, digest, others, idx)
+        
+        row = array('f')
+        for j, score in zip(others, scores):
+            if j < idx:
+                row.append(score)
+            else:
+                self.rows[j][idx] = score
+        self.rows[idx] = row
+        
+        self.contents[idx] = content
+        self.content_hashes[idx] = digest
+        self._prepared[idx] = doc
+        self._rebuild_lookups()
+        self._refresh()
+        
+        duplicate_of = next((j for j in others if self.content_hashes[j] == digest), None)
+        return self._change_info(name, len(scores), duplicate_of, excluded_fraction)
+    
+    def remove_document(self, name: str) -> None:
+        """
+        Withdraw a submission: drop its row and column, then rebuild totals
+        and clusters. A persisted corpus is rewritten.
+        
+        Raises:
+            KeyError: If there is no document with this name
+        """
+        idx = self.index[name]
+        del self.rows[idx]
+        for row in self.rows[idx:]:
+            del row[idx]
+        del self.names[idx]
+        del self.contents[idx]
+        del self.content_hashes[idx]
+        self._prepared = {(j if j < idx else j - 1): doc
+                          for j, doc in self._prepared.items() if j != idx}
+        self._rebuild_lookups()
+        self._refresh()
+    
+    def similarity(self, i: int, j: int) -> float:
+        """Stored similarity of documents i and j."""
+        if i == j:
+            return 1.0
+        if i < j:
+            i, j = j, i
+        return self.rows[i][j]
+    
+    def top_matches(self, name: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Most similar documents to one document.
+        
+        Args:
+            name: Document name
+            k: Number of matches to return
+        
+        Returns:
+            List of {'file', 'similarity', 'percentage'}, best first
+        """
+        idx = self.index[name]
+        others = [j for j in range(len(self.names)) if j != idx]
+        others.sort(key=lambda j: self.similarity(idx, j), reverse=True)
+        return [{
+            'file': self.names[j],
+            'similarity': self.similarity(idx, j),
+            'percentage': format_percentage(self.similarity(idx, j))
+        } for j in others[:k]]
+    
+    def file_rankings(self) -> List[Dict[str, Any]]:
+        """Documents sorted by average similarity, highest first."""
+        n = len(self.names)
+        averages = [total / (n - 1) if n > 1 else 0 for total in self.totals]
+        order = sorted(range(n), key=averages.__getitem__, reverse=True)
+        return [{
+            'file': self.names[i],
+            'average_similarity': averages[i],
+            'percentage': format_percentage(averages[i])
+        } for i in order]
+    
+    def _find(self, idx: int) -> int:
+        """Union-find root with path halving."""
+        parent = self._parent
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+    
+    def _union(self, a: int, b: int) -> None:
+        """Merge the clusters of a and b."""
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self._parent[max(root_a, root_b)] = min(root_a, root_b)
+    
+    def clusters(self) -> List[Dict[str, Any]]:
+        """
+        Groups of documents connected by similarities at or above the threshold.
+        
+        Unlike BatchComparator.find_clusters (greedy, seeded by the first
+        file), clusters here are connected components, which is what can be
+        maintained incrementally.
+        
+        Returns:
+            List of cluster dictionaries with files and average similarity
+        """
+        groups = {}
+        for idx in range(len(self.names)):
+            groups.setdefault(self._find(idx), []).append(idx)
+        
+        clusters = []
+        for members in sorted(groups.values(), key=lambda m: m[0]):
+            if len(members) < 2:
+                continue
+            pair_scores = [self.similarity(a, b)
+                           for x, a in enumerate(members) for b in members[x + 1:]]
+            clusters.append({
+                'cluster_id': len(clusters) + 1,
+                'file_count': len(members),
+                'files': [self.names[idx] for idx in members],
+                'average_similarity': sum(pair_scores) / len(pair_scores)
+            })
+        return clusters
+    
+    def to_batch_result(self) -> BatchResult:
+        """
+        Export the stored scores as a BatchResult (e.g. for batch_export).
+        
+        Only the combined similarity is stored per pair, so the result
+        carries no structure columns.
+        """
+        result = BatchResult(
+            self.names, [len(content.splitlines()) for content in self.contents],
+            self.mode, self.language, hybrid=False
+        )
+        n = len(self.names)
+        for i in range(n):
+            for j in range(i + 1, n):
+                result.append(i, j, self.rows[j][i])
+        return result
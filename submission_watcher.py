@@ -0,0 +1,213 @@
+"""
+Submission Watcher Module
+=========================
+Watch mode: keeps a SubmissionCorpus in sync with a submissions directory.
+
+The directory tree is polled (plain os.scandir, no OS-specific notification
+APIs). A file counts as changed when its mtime or size differs from the
+last scan and its SHA-256 differs from the stored content, so touched but
+identical files are never re-analysed. Only added, changed and removed
+documents are prepared and re-scored (see SubmissionCorpus); rankings and
+clusters are rebuilt once per poll and, if an output path is set, the
+results are rewritten after every poll that changed something.
+
+Usage:
+    python submission_watcher.py SUBMISSIONS_DIR --corpus CORPUS_DIR --output results.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from submission_corpus import SubmissionCorpus
+
+
+class SubmissionWatcher:
+    """
+    Polls a directory tree and applies its changes to a SubmissionCorpus.
+    """
+    
+    def __init__(self, directory: str, corpus: SubmissionCorpus,
+                 extensions: Iterable[str] = ('py',), output: Optional[str] = None,
+                 interval: float = 2.0):
+        """
+        Args:
+            directory: Submissions directory (document names are paths
+                relative to it, with '/' separators)
+            corpus: Corpus to keep in sync (in memory or persisted)
+            extensions: File extensions to watch
+            output: Optional JSON file rewritten with the results after
+                every change
+            interval: Seconds between polls in run()
+        """
+        self.directory = directory
+        self.corpus = corpus
+        self.extensions = {extension.lower() for extension in extensions}
+        self.output = output
+        self.interval = interval
+        # name -> (mtime_ns, size) of the last scan
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+        self.polls = 0
+        self.last_error = None
+    
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Current (mtime_ns, size) of every watched file.
+        
+        Returns:
+            Mapping of document name to file stat signature
+        """
+        found = {}
+        pending = [self.directory]
+        while pending:
+            path = pending.pop()
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.rsplit('.', 1)[-1].lower() in self.extensions:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    name = os.path.relpath(entry.path, self.directory).replace(os.sep, '/')
+                    found[name] = (stat.st_mtime_ns, stat.st_size)
+        return found
+    
+    def _read(self, name: str) -> Optional[str]:
+        """Content of a watched file (None if it vanished or is not UTF-8)."""
+        try:
+            with open(os.path.join(self.directory, *name.split('/')), 'r', encoding='utf-8') as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+    
+    def poll(self) -> Dict[str, Any]:
+        """
+        Scan once and apply the differences to the corpus.
+        
+        The first poll compares every file with the corpus by content hash,
+        so a reopened corpus only re-analyses what changed in between.
+        
+        Returns:
+            Dictionary with the 'added', 'changed' and 'removed' names
+        """
+        current = self.scan()
+        changes = {'added': [], 'changed': [], 'removed': []}
+        
+        # One rebuild and save for all changes of the poll
+        with self.corpus.changes():
+            for name in sorted(set(self.corpus.index) - set(current)):
+                self.corpus.remove_document(name)
+                changes['removed'].append(name)
+            
+            for name in sorted(current):
+                if self.snapshot.get(name) == current[name] and name in self.corpus:
+                    continue
+                content = self._read(name)
+                if content is None:
+                    current.pop(name)
+                    continue
+                if name not in self.corpus:
+                    self.corpus.add_document(name, content)
+                    changes['added'].append(name)
+                    continue
+                digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+                if digest != self.corpus.content_hashes[self.corpus.index[name]]:
+                    self.corpus.update_document(name, content)
+                    changes['changed'].append(name)
+        
+        self.snapshot = current
+        self.polls += 1
+        if self.output and (any(changes.values()) or self.polls == 1):
+            self.write_results(changes)
+        return changes
+    
+    def results(self) -> Dict[str, Any]:
+        """Current rankings and clusters of the corpus."""
+        return {
+            'directory': self.directory,
+            'documents': len(self.corpus),
+            'threshold': self.corpus.threshold,
+            'file_rankings': self.corpus.file_rankings(),
+            'clusters': self.corpus.clusters()
+        }
+    
+    def write_results(self, changes: Optional[Dict[str, Any]] = None) -> None:
+        """Atomically rewrite the output file with the current results."""
+        results = self.results()
+        results['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        results['last_changes'] = changes or {}
+        tmp_path = f"{self.output}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        os.replace(tmp_path, self.output)
+    
+    def run(self, stop_event: Optional[threading.Event] = None,
+            max_polls: Optional[int] = None) -> None:
+        """
+        Poll until stopped.
+        
+        Args:
+            stop_event: Event that ends the loop when set
+            max_polls: Optional number of polls after which to return
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                changes = self.poll()
+                self.last_error = None
+                if any(changes.values()):
+                    print(f"[{time.strftime('%H:%M:%S')}] +{len(changes['added'])} "
+                          f"~{len(changes['changed'])} -{len(changes['removed'])} "
+                          f"({len(self.corpus)} documents)")
+            except Exception as e:
+                # Keep watching; a half-written file is picked up next time
+                self.last_error = str(e)
+            if max_polls is not None and self.polls >= max_polls:
+                return
+            stop_event.wait(self.interval)
+
+
+def main():
+    """Watch a submissions directory from the command line."""
+    parser = argparse.ArgumentParser(description='Live similarity results for a submissions directory')
+    parser.add_argument('directory', help='Submissions directory')
+    parser.add_argument('--corpus', help='Corpus directory to persist to (default: in memory)')
+    parser.add_argument('--output', default='watch_results.json', help='Results JSON file')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls')
+    parser.add_argument('--mode', choices=('basic', 'hybrid'),
+                        help='Analysis mode of a new corpus (default: hybrid)')
+    parser.add_argument('--threshold', type=float,
+                        help='Cluster threshold (default: 0.75, or the corpus setting)')
+    parser.add_argument('--extensions', default='py', help='Comma-separated file extensions')
+    args = parser.parse_args()
+    
+    if args.corpus and os.path.exists(os.path.join(args.corpus, 'corpus.json')):
+        corpus = SubmissionCorpus.open(args.corpus)
+        if args.mode is not None and args.mode != corpus.mode:
+            parser.error(f"--mode {args.mode} conflicts with the {corpus.mode} corpus in "
+                         f"{args.corpus}; use a new --corpus directory")
+        if args.threshold is not None and args.threshold != corpus.threshold:
+            corpus.set_threshold(args.threshold)
+    else:
+        corpus = SubmissionCorpus(args.corpus, mode=args.mode or 'hybrid',
+                                  threshold=0.75 if args.threshold is None else args.threshold)
+    watcher = SubmissionWatcher(args.directory, corpus, extensions=args.extensions.split(','),
+                                output=args.output, interval=args.interval)
+    print(f"Watching {args.directory} (every {args.interval}s), results in {args.output}")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Test Suite for AST-based Code Similarity Analyzer
 Tests detection of disguised plagiarism through various obfuscation techniques.
 """
 
-from ast_analyzer import HybridSimilarityAnalyzer
+from ast_analyzer import HybridSimilarityAnalyzer, PreparedDocument
 from code_similarity import CodeSimilarityAnalyzer
 
 
@@ -314,6 +314,66 @@ def compute(x):
     print()
 
 
+def test_subtree_multiset_score():
+    """Subtree multiset score ignores reordering of functions and statements."""
+    print("=" * 70)
+    print("TEST 9: Order-insensitive subtree score")
+    print("=" * 70)
+    
+    original = """
+def load(path):
+    with open(path) as f:
+        return f.read()
+
+def count(items):
+    seen = {}
+    for item in items:
+        seen[item] = seen.get(item, 0) + 1
+    return seen
+
+total = 0
+names = []
+"""
+    
+    reordered = """
+names = []
+total = 0
+
+def tally(values):
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+def read(filename):
+    with open(filename) as handle:
+        return handle.read()
+"""
+    
+    analyzer = HybridSimilarityAnalyzer()
+    result = analyzer.analyze(original, reordered)
+    print(f"Sequence structure similarity: {result['structure_similarity']:.1%}")
+    print(f"Subtree similarity: {result['subtree_similarity']:.1%}")
+    assert result['subtree_similarity'] == 1.0
+    assert result['subtree_containment'] == 1.0
+    assert result['structure_similarity'] < 1.0
+    
+    subtree = HybridSimilarityAnalyzer(structure_metric='subtree')
+    reordered_result = subtree.analyze(original, reordered)
+    assert reordered_result['structure_similarity'] == 1.0
+    assert reordered_result['weighted_score'] > result['weighted_score']
+    
+    different = subtree.analyze(original, "class Point:\n    def __init__(self, x):\n        self.x = x\n")
+    assert different['subtree_similarity'] < 0.2
+    
+    # The multiset survives the fingerprint-store round trip
+    doc = analyzer.prepare(original)
+    restored = PreparedDocument.from_dict(original, doc.to_dict())
+    assert restored.subtree_hashes == doc.subtree_hashes
+    assert restored.subtree_weights == doc.subtree_weights
+    print()
+
+
 def main():
     """Run all tests."""
     print("\n")
@@ -332,6 +392,7 @@ def main():
         test_comparison_modes()
         test_class_similarity()
         test_extreme_obfuscation()
+        test_subtree_multiset_score()
         
         print("=" * 70)
         print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
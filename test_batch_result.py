@@ -0,0 +1,95 @@
+"""
+Test Suite for the Columnar Batch Result
+"""
+
+from array import array
+import json
+
+from batch_comparator import BatchComparator
+from batch_result import BatchResult
+
+
+SAMPLE_FILES = [
+    {'name': 'a.py', 'content': 'def f(x):\n    return x + 1\n'},
+    {'name': 'b.py', 'content': 'def g(y):\n    return y + 1\n'},
+    {'name': 'c.py', 'content': 'class A:\n    def m(self):\n        return 1\n'},
+]
+
+
+def test_dictionary_views():
+    """The result still reads like the old dictionary and serializes to JSON."""
+    print("=" * 70)
+    print("TEST 1: Dictionary views of a columnar result")
+    print("=" * 70)
+    
+    result = BatchComparator(mode='hybrid').compare_all_pairs(SAMPLE_FILES, 'python')
+    data = result.to_dict()
+    
+    assert data['file_count'] == 3
+    assert data['comparison_count'] == 3
+    assert data['matrix'][0][0] == 1.0
+    assert data['matrix'][0][1] == data['matrix'][1][0] == data['comparisons'][0]['similarity']
+    assert data['statistics']['most_similar_pair']['file1'] == 'a.py'
+    assert data['files'][2] == {'name': 'c.py', 'lines': 3}
+    assert [r['file'] for r in data['file_rankings']][:2] == ['a.py', 'b.py']
+    assert result['statistics'] == data['statistics']
+    
+    print(f"Average similarity: {result['statistics']['average_percentage']}")
+    json.dumps(data)
+    print()
+
+
+def test_compact_storage():
+    """In-order pairs keep implicit indices and stay well under 16 bytes each."""
+    print("=" * 70)
+    print("TEST 2: Memory per pair")
+    print("=" * 70)
+    
+    n = 200
+    result = BatchResult([f'f{i}.py' for i in range(n)], [1] * n, 'hybrid', 'python', True)
+    for i in range(n):
+        for j in range(i + 1, n):
+            result.append(i, j, 0.5, 0.25, False)
+    
+    per_pair = result.memory_bytes() / result.comparison_count
+    print(f"Bytes per pair: {per_pair:.1f}")
+    assert per_pair < 16
+    assert result.similarity(150, 3) == 0.5
+    print()
+
+
+def test_out_of_order_pairs():
+    """Pairs appended out of order fall back to explicit index columns."""
+    result = BatchResult(['a', 'b', 'c'], [1, 1, 1], 'basic', 'python', False)
+    result.append(0, 2, 0.3)
+    result.append(0, 1, 0.4)
+    
+    assert result.similarity(2, 0) == result.similarity(0, 2)
+    assert result.similarity(1, 2) == 0.0
+    # Scores and rows are looked up without a dense n*n matrix
+    assert list(result.row(1)) == [array('f', [0.4])[0], 1.0, 0.0]
+    assert result._dense is None
+    before = result.memory_bytes()
+    assert result['matrix'][0] == [1.0, 0.4, 0.3]
+    assert result.memory_bytes() >= before + 4 * 3 * 3
+    assert result['statistics']['most_similar_pair']['file2'] == 'b'
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 BATCH RESULT TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_dictionary_views()
+    test_compact_storage()
+    test_out_of_order_pairs()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Test Suite for Batch Sharding
+Checks that shard/merge over a shared directory reproduces compare_all_pairs.
+"""
+
+import os
+import tempfile
+
+from batch_comparator import BatchComparator, pair_cost, shard_pairs, shard_filename, read_shard
+
+
+SAMPLE_FILES = [
+    {'name': 'a.py', 'content': 'def f(x):\n    return x + 1\n'},
+    {'name': 'b.py', 'content': 'def g(y):\n    return y + 1\n'},
+    {'name': 'c.py', 'content': 'def h(z):\n    total = 0\n    for v in z:\n        total += v\n    return total\n'},
+    {'name': 'd.py', 'content': 'class A:\n    def m(self):\n        return 1\n'},
+    {'name': 'e.py', 'content': 'print("hello")\n'},
+]
+
+
+def test_shards_partition_upper_triangle():
+    """Every pair belongs to exactly one shard."""
+    print("=" * 70)
+    print("TEST 1: Shards partition the pair space")
+    print("=" * 70)
+    
+    sizes = [len(f['content']) for f in SAMPLE_FILES]
+    seen = []
+    for shard_index in range(3):
+        shard = list(shard_pairs(sizes, shard_index, 3))
+        print(f"Shard {shard_index}: {len(shard)} pairs")
+        seen.extend(shard)
+    
+    n = len(SAMPLE_FILES)
+    expected = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    assert sorted(seen) == expected
+    
+    # Same owners as assigning every pair by its cost midpoint directly
+    sizes = [(i * 37) % 11 * 50 for i in range(40)]
+    pairs = [(i, j) for i in range(40) for j in range(i + 1, 40)]
+    costs = [pair_cost(sizes[i], sizes[j]) for i, j in pairs]
+    total = sum(costs)
+    owners = []
+    cumulative = 0
+    for cost in costs:
+        owners.append(min(int((cumulative + cost / 2) * 7 / total), 6))
+        cumulative += cost
+    for shard_index in range(7):
+        expected = [pair for pair, owner in zip(pairs, owners) if owner == shard_index]
+        assert list(shard_pairs(sizes, shard_index, 7)) == expected
+    print()
+
+
+def test_shard_merge_matches_full_run():
+    """Merging all shard files gives the same result as one full run."""
+    print("=" * 70)
+    print("TEST 2: Shard + merge equals compare_all_pairs")
+    print("=" * 70)
+    
+    for mode in ('hybrid', 'basic'):
+        comparator = BatchComparator(mode=mode)
+        full = comparator.compare_all_pairs(SAMPLE_FILES, 'python')
+        
+        with tempfile.TemporaryDirectory() as shared_dir:
+            for shard_index in range(3):
+                BatchComparator(mode=mode).compare_shard(SAMPLE_FILES, shard_index, 3, shared_dir)
+            
+            path = os.path.join(shared_dir, shard_filename(0, 3))
+            assert read_shard(path)['shard_count'] == 3
+            
+            merged = comparator.merge_shards(SAMPLE_FILES, shared_dir, 3)
+        
+        print(f"{mode}: {merged['comparison_count']} pairs merged")
+        assert merged == full
+    print()
+
+
+def test_merge_rejects_other_batch():
+    """Shards computed for a different file list are refused."""
+    print("=" * 70)
+    print("TEST 3: Merge refuses shards of another batch")
+    print("=" * 70)
+    
+    comparator = BatchComparator(mode='basic')
+    changed = SAMPLE_FILES[:-1] + [{'name': 'e.py', 'content': 'print("bye")\n'}]
+    
+    with tempfile.TemporaryDirectory() as shared_dir:
+        for shard_index in range(2):
+            comparator.compare_shard(SAMPLE_FILES, shard_index, 2, shared_dir)
+        try:
+            comparator.merge_shards(changed, shared_dir, 2)
+        except ValueError as e:
+            print(f"Rejected: {e}")
+        else:
+            raise AssertionError('merge_shards accepted shards of another batch')
+        
+        # Same files, different scoring settings
+        for other in (BatchComparator(mode='basic', large_input_threshold=None),
+                      BatchComparator(mode='basic', pair_budget=1.0)):
+            try:
+                other.merge_shards(SAMPLE_FILES, shared_dir, 2)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('merge_shards accepted shards scored with other settings')
+    print()
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 BATCH SHARDING TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_shards_partition_upper_triangle()
+    test_shard_merge_matches_full_run()
+    test_merge_rejects_other_batch()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
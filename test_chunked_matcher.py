@@ -0,0 +1,114 @@
+"""
+Test Suite for Large-File Chunked Matching
+"""
+
+import random
+import time
+from difflib import SequenceMatcher
+
+from ast_analyzer import HybridSimilarityAnalyzer
+from batch_comparator import BatchComparator
+from chunked_matcher import chunked_ratio, sequence_ratio, text_chunks
+from code_similarity import CodeSimilarityAnalyzer
+
+
+def generated_source(lines: int, seed: int) -> str:
+    """Python-like generated code, one statement per line."""
+    rng = random.Random(seed)
+    return '\n'.join(f"value_{rng.randint(0, 999)} = compute(x{rng.randint(0, 99)}, "
+                     f"{rng.randint(0, 9999)})" for _ in range(lines))
+
+
+def edited(text: str, edits: int, seed: int) -> str:
+    """Copy of a text with some lines replaced."""
+    rng = random.Random(seed)
+    lines = text.split('\n')
+    for _ in range(edits):
+        lines[rng.randrange(len(lines))] = 'changed = 1'
+    return '\n'.join(lines)
+
+
+def test_chunks():
+    """Chunks cover the text and an edit only moves nearby boundaries."""
+    print("=" * 70)
+    print("TEST 1: Content-defined chunks")
+    print("=" * 70)
+    
+    text = generated_source(3000, 1)
+    chunks = text_chunks(text)
+    print(f"{len(text.splitlines())} lines -> {len(chunks)} chunks")
+    assert ''.join(chunks) == text
+    assert all(4 <= chunk.count('\n') <= 64 for chunk in chunks[:-1])
+    
+    # Inserting a line at the top keeps almost every later chunk
+    shifted = text_chunks('inserted = 0\n' + text)
+    assert len(set(chunks) & set(shifted)) >= len(chunks) - 3
+    print("✓ Chunks passed\n")
+
+
+def test_accuracy():
+    """The chunked ratio tracks the exact ratio."""
+    print("=" * 70)
+    print("TEST 2: Chunked ratio accuracy")
+    print("=" * 70)
+    
+    original = generated_source(200, 2)
+    for edits in (0, 5, 30):
+        copy = edited(original, edits, edits)
+        exact = SequenceMatcher(None, original, copy, autojunk=False).ratio()
+        approximate = chunked_ratio(original, copy)
+        print(f"  {edits} edits: exact {exact:.4f}, chunked {approximate:.4f}")
+        assert abs(exact - approximate) < 0.01
+    
+    assert chunked_ratio(original, generated_source(200, 3)) < 0.3
+    assert chunked_ratio('', '') == 1.0 and chunked_ratio(original, '') == 0.0
+    # Below the threshold nothing changes
+    assert sequence_ratio('abc\nd', 'abd\nd') == SequenceMatcher(None, 'abc\nd', 'abd\nd').ratio()
+    print("✓ Accuracy passed\n")
+
+
+def test_large_files():
+    """Large pairs switch to chunks automatically and stay fast."""
+    print("=" * 70)
+    print("TEST 3: Large files in the analyzers")
+    print("=" * 70)
+    
+    big = generated_source(5000, 4)
+    copy = edited(big, 50, 5)
+    
+    started = time.perf_counter()
+    basic = CodeSimilarityAnalyzer().compute_similarity(big, copy)
+    hybrid = HybridSimilarityAnalyzer().analyze(big, copy)
+    elapsed = time.perf_counter() - started
+    print(f"Basic {basic:.3f}, hybrid {hybrid['weighted_score']:.3f} in {elapsed:.2f}s")
+    assert basic > 0.95 and hybrid['large_input'] and hybrid['sequence_similarity'] > 0.95
+    assert elapsed < 30
+    
+    small = HybridSimilarityAnalyzer().analyze('x = 1\n', 'y = 2\n')
+    assert not small['large_input']
+    
+    files = [{'name': 'big.py', 'content': big}, {'name': 'copy.py', 'content': copy},
+             {'name': 'small.py', 'content': 'def f(x):\n    return x\n'}]
+    result = BatchComparator(mode='basic').compare_all_pairs(files)
+    assert result.similarity(0, 1) > 0.95 and result.similarity(0, 2) < 0.1
+    print("✓ Large files passed\n")
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 CHUNKED MATCHER TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_chunks()
+    test_accuracy()
+    test_large_files()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
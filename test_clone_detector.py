@@ -0,0 +1,126 @@
+"""
+Test Suite for the Subtree-Hash Clone Detector
+"""
+
+from clone_detector import CloneIndex, detect_clones
+
+
+ALICE = '''import math
+
+
+def area(radius):
+    """Circle area."""
+    return math.pi * radius ** 2
+
+
+def normalize(values):
+    total = sum(values)
+    if total == 0:
+        return [0.0 for _ in values]
+    result = []
+    for value in values:
+        result.append(value / total)
+    return result
+'''
+
+BOB = '''def helper():
+    print("hello")
+
+
+def scale(xs):
+    s = sum(xs)
+    if s == 0:
+        return [0.0 for _ in xs]
+    out = []
+    for x in xs:
+        out.append(x / s)
+    return out
+'''
+
+CAROL = '''def report(rows):
+    print("Report")
+    count = 0
+    for row in rows:
+        if row.valid and row.amount > 100:
+            count += 1
+            print(row.name, row.amount)
+    return count
+'''
+
+DAVE = '''def summary(entries, title):
+    header = title.upper()
+    tally = 0
+    for entry in entries:
+        if entry.valid and entry.amount > 100:
+            tally += 1
+            print(entry.name, entry.amount)
+    print(header, tally)
+'''
+
+
+def test_renamed_function_clone():
+    """A renamed, moved function is reported once, with its line ranges."""
+    print("=" * 70)
+    print("TEST 1: Renamed function clone")
+    print("=" * 70)
+    
+    report = detect_clones([
+        {'name': 'alice.py', 'content': ALICE},
+        {'name': 'bob.py', 'content': BOB},
+        {'name': 'broken.py', 'content': 'def oops(:\n'}
+    ])
+    print(f"Pairs: {report['clone_pairs']}")
+    
+    # Only the maximal fragment: not its statements or body block as well
+    assert report['clone_pairs'] == [{'file1': 'alice.py', 'lines1': [9, 16],
+                                      'file2': 'bob.py', 'lines2': [5, 12],
+                                      'nodes': report['clone_classes'][0]['nodes']}]
+    assert report['files'] == 3
+    print()
+
+
+def test_block_clone_and_threshold():
+    """Copied blocks inside different functions are found; small ones are not."""
+    index = CloneIndex(min_nodes=10)
+    index.add_document('carol.py', CAROL)
+    index.add_document('dave.py', DAVE)
+    
+    pairs = index.clone_pairs()
+    print(f"Block pairs: {pairs}")
+    assert [(p['lines1'], p['lines2']) for p in pairs] == [([4, 7], [4, 7])]
+    
+    strict = CloneIndex(min_nodes=500)
+    strict.add_document('carol.py', CAROL)
+    strict.add_document('dave.py', DAVE)
+    assert strict.clone_pairs() == []
+
+
+def test_repeats_within_file():
+    """Repeated code in one file is only reported when asked for."""
+    index = CloneIndex(min_nodes=10)
+    index.add_document('twice.py', CAROL + '\n\n' + CAROL.replace('report', 'report2'))
+    
+    assert index.clone_classes() == []
+    classes = index.clone_classes(cross_document=False)
+    assert len(classes) == 1
+    assert [f['start_line'] for f in classes[0]['fragments']] == [1, 11]
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 CLONE DETECTOR TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_renamed_function_clone()
+    test_block_clone_and_threshold()
+    test_repeats_within_file()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
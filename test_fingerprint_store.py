@@ -0,0 +1,92 @@
+"""
+Test Suite for the SQLite Fingerprint Store
+"""
+
+import os
+import tempfile
+
+from ast_analyzer import HybridSimilarityAnalyzer
+from batch_comparator import BatchComparator
+from code_similarity import CodeSimilarityAnalyzer
+from fingerprint_store import FingerprintStore, component_version
+
+
+SAMPLE_FILES = [
+    {'name': 'a.py', 'content': 'def f(x):\n    return x + 1\n'},
+    {'name': 'b.py', 'content': 'def g(y):\n    return y + 1\n'},
+    {'name': 'c.py', 'content': 'class A:\n    def m(self):\n        return 1\n'},
+]
+
+
+def test_cached_preparation_matches():
+    """Documents loaded from the store give the same scores as fresh ones."""
+    print("=" * 70)
+    print("TEST 1: Cached prepared documents")
+    print("=" * 70)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = FingerprintStore(os.path.join(tmp_dir, 'fingerprints.db'))
+        
+        fresh = BatchComparator(mode='hybrid').compare_all_pairs(SAMPLE_FILES)
+        first = BatchComparator(mode='hybrid', store=store).compare_all_pairs(SAMPLE_FILES)
+        misses = store.misses
+        second = BatchComparator(mode='hybrid', store=store).compare_all_pairs(SAMPLE_FILES)
+        
+        print(f"Store stats: {store.stats()}")
+        assert misses == len(SAMPLE_FILES)
+        assert store.hits == len(SAMPLE_FILES)
+        assert fresh == first == second
+        
+        analyzer = HybridSimilarityAnalyzer(store=store)
+        cached = analyzer.prepare(SAMPLE_FILES[0]['content'])
+        assert cached.structure == HybridSimilarityAnalyzer().prepare(SAMPLE_FILES[0]['content']).structure
+        store.close()
+    print()
+
+
+def test_basic_mode_uses_store():
+    """Preprocessed text is cached per language."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = FingerprintStore(os.path.join(tmp_dir, 'fingerprints.db'))
+        analyzer = CodeSimilarityAnalyzer(store=store)
+        
+        first = analyzer.analyze('int a = 1; // x', 'int b = 1;', language='c')
+        second = analyzer.analyze('int a = 1; // x', 'int b = 1;', language='c')
+        
+        assert first == second
+        assert store.hits == 2
+        store.close()
+
+
+def test_version_changes_with_source():
+    """Different components give different versions (automatic invalidation)."""
+    class RulesV1:
+        def apply(self, code):
+            return code
+    
+    class RulesV2:
+        def apply(self, code):
+            return code.lower()
+    
+    assert component_version(RulesV1) != component_version(RulesV2)
+    assert component_version(RulesV1) == component_version(RulesV1)
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 FINGERPRINT STORE TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_cached_preparation_matches()
+    test_basic_mode_uses_store()
+    test_version_changes_with_source()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
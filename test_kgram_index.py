@@ -0,0 +1,118 @@
+"""
+Test Suite for the K-gram Inverted Index
+"""
+
+import os
+import tempfile
+
+from kgram_index import (Fingerprinter, KGramIndex, KGramIndexWriter, build_index,
+                         decode_postings, encode_postings, winnow)
+
+
+ORIGINAL = '''
+def calculate_average(numbers):
+    total = 0
+    count = len(numbers)
+    for num in numbers:
+        total += num
+    average = total / count
+    return average
+'''
+
+RENAMED = '''
+def mean(data):
+    acc = 0
+    size = len(data)
+    for value in data:
+        acc += value
+    result = acc / size
+    return result
+'''
+
+DIFFERENT = '''
+class Stack:
+    def __init__(self):
+        self.items = []
+
+    def push(self, item):
+        self.items.append(item)
+'''
+
+
+def test_postings_codec():
+    """Delta + varint encoding round-trips and stays compact."""
+    doc_ids = [0, 1, 5, 130, 70000, 70001]
+    encoded = encode_postings(doc_ids)
+    assert decode_postings(encoded) == doc_ids
+    assert len(encoded) < 4 * len(doc_ids)
+
+
+def test_winnowing_keeps_window_minima():
+    """Every window contributes its rightmost minimum."""
+    selected = winnow([5, 3, 4, 3, 9, 1, 2, 7], 4)
+    assert selected == [(3, 3), (5, 1)]
+    assert winnow([], 4) == []
+
+
+def test_index_queries():
+    """Renamed copies share structure fingerprints; unrelated code does not."""
+    print("=" * 70)
+    print("TEST 1: Index build and candidate scoring")
+    print("=" * 70)
+    
+    fingerprinter = Fingerprinter(k=4, window=3)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'corpus.cki')
+        build_index(path, [('original.py', ORIGINAL), ('different.py', DIFFERENT)],
+                    fingerprinter=fingerprinter)
+        
+        with KGramIndex(path) as index:
+            assert index.document_count == 2
+            query = fingerprinter.fingerprints(RENAMED)
+            candidates = index.score_candidates(query, top_k=2)
+            print(f"Candidates: {candidates}")
+            assert candidates[0]['name'] == 'original.py'
+            
+            own = fingerprinter.fingerprints(ORIGINAL)
+            assert index.intersect(own[:5]) == [0]
+            assert index.postings(own[0]) == [0]
+    print()
+
+
+def test_spilled_build_is_identical():
+    """Building through sorted run files gives the same file as in memory."""
+    fingerprinter = Fingerprinter(k=4, window=3)
+    documents = [('a.py', ORIGINAL), ('b.py', RENAMED), ('c.py', DIFFERENT)]
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        in_memory = build_index(os.path.join(tmp_dir, 'a.cki'), documents,
+                                fingerprinter=fingerprinter)
+        writer = KGramIndexWriter(os.path.join(tmp_dir, 'b.cki'), k=4, window=3, buffer_pairs=10)
+        for name, content in documents:
+            writer.add_document(name, fingerprinter.fingerprints(content))
+        spilled = writer.finish()
+        
+        with open(in_memory, 'rb') as a, open(spilled, 'rb') as b:
+            assert a.read() == b.read()
+        assert sorted(os.listdir(tmp_dir)) == ['a.cki', 'b.cki']
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 K-GRAM INDEX TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_postings_codec()
+    test_winnowing_keeps_window_minima()
+    test_index_queries()
+    test_spilled_build_is_identical()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
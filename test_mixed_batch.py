@@ -0,0 +1,110 @@
+"""
+Test Suite for Mixed-Language Batches
+"""
+
+from batch_comparator import BatchComparator
+from lexers import language_for_filename
+from test_lexers import JAVA, JAVA_OTHER, JAVA_RENAMED
+
+
+PYTHON = '''
+def total(values):
+    result = 0
+    for value in values:
+        result += value
+    return result
+'''
+
+PYTHON_RENAMED = '''
+def add_all(xs):
+    acc = 0
+    for x in xs:
+        acc += x
+    return acc
+'''
+
+MIXED_FILES = [
+    {'name': 'total.py', 'content': PYTHON},
+    {'name': 'Grades.java', 'content': JAVA},
+    {'name': 'add_all.py', 'content': PYTHON_RENAMED},
+    {'name': 'Scores.java', 'content': JAVA_RENAMED},
+    {'name': 'Greeter.java', 'content': JAVA_OTHER},
+    {'name': 'notes.txt', 'content': 'sum of the values'}
+]
+
+
+def test_partitions():
+    """Every language group is scored with its own engine."""
+    print("=" * 70)
+    print("TEST 1: Per-language partitions")
+    print("=" * 70)
+    
+    assert language_for_filename('Main.JAVA') == 'java'
+    assert language_for_filename('README') == 'text'
+    
+    comparator = BatchComparator(mode='hybrid')
+    assert comparator.file_languages(MIXED_FILES) == ['python', 'java', 'python', 'java', 'java', 'text']
+    
+    result = comparator.compare_mixed(MIXED_FILES)
+    partitions = {p['language']: p for p in result['statistics']['partitions']}
+    print(f"Partitions: {partitions}")
+    assert result['language'] == 'mixed' and result.hybrid
+    assert result.comparison_count == 15
+    assert partitions['python']['engine'] == partitions['java']['engine'] == 'hybrid'
+    assert partitions['text']['engine'] == 'basic'
+    assert partitions['java']['comparison_count'] == 3
+    assert partitions['cross-language']['comparison_count'] == 11
+    assert [f['language'] for f in result['files']][:2] == ['python', 'java']
+    
+    # Scores inside a group match a single-language run of that group
+    java_only = comparator.compare_all_pairs([MIXED_FILES[1], MIXED_FILES[3]], 'java')
+    assert result.similarity(1, 3) == java_only.similarity(0, 1)
+    assert result.similarity(0, 2) > 0.8
+    
+    # A single-language batch is a plain compare_all_pairs run
+    single = comparator.compare_mixed(MIXED_FILES[1:2] + MIXED_FILES[3:5])
+    assert single['language'] == 'java' and len(single['statistics']['partitions']) == 1
+    assert single['matrix'] == comparator.compare_all_pairs(MIXED_FILES[1:2] + MIXED_FILES[3:5], 'java')['matrix']
+    print("✓ Partitions passed\n")
+
+
+def test_cross_language_and_workers():
+    """Cross-language pairs can be skipped; parallel groups give the same scores."""
+    print("=" * 70)
+    print("TEST 2: Cross-language pairs and parallel groups")
+    print("=" * 70)
+    
+    comparator = BatchComparator(mode='hybrid')
+    events = []
+    skipped = comparator.compare_mixed(MIXED_FILES, cross_language=False, progress=events.append)
+    cross = {p['language']: p for p in skipped['statistics']['partitions']}['cross-language']
+    assert skipped.comparison_count == 4 and cross['skipped_pairs'] == 11
+    assert skipped.similarity(0, 1) == 0.0
+    assert events[-1]['stage'] == 'done'
+    assert events[-1]['pairs_done'] == events[-1]['pairs_total'] == 4
+    assert events[-1]['files_prepared'] == len(MIXED_FILES)
+    
+    sequential = comparator.compare_mixed(MIXED_FILES)
+    parallel = comparator.compare_mixed(MIXED_FILES, workers=4)
+    assert parallel['matrix'] == sequential['matrix']
+    assert parallel['comparisons'] == sequential['comparisons']
+    print("✓ Cross-language pairs and workers passed\n")
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 MIXED-LANGUAGE BATCH TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_partitions()
+    test_cross_language_and_workers()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Test Suite for the Server-Side Result Store
+"""
+
+import os
+import tempfile
+
+from result_store import MemoryResultStore, SQLiteResultStore, _encode
+
+
+def sized_result(index: int, size: int = 1000) -> dict:
+    """Result dictionary of roughly ``size`` serialized bytes."""
+    return {'index': index, 'payload': 'x' * size}
+
+
+def test_memory_store():
+    """The memory store evicts least recently used results by size."""
+    print("=" * 70)
+    print("TEST 1: In-memory LRU store")
+    print("=" * 70)
+    
+    entry = len(_encode(sized_result(0)).encode('utf-8'))
+    store = MemoryResultStore(max_bytes=3 * entry)
+    ids = [store.put(sized_result(index)) for index in range(3)]
+    assert None not in ids and store.stats()['entries'] == 3
+    
+    # Touching the first result makes the second the oldest
+    store.get(ids[0])
+    ids.append(store.put(sized_result(3)))
+    stats = store.stats()
+    print(f"Stats: {stats}")
+    assert store.get(ids[1]) is None and store.get(ids[0])['index'] == 0
+    assert stats['entries'] == 3 and stats['bytes'] <= stats['max_bytes'] and stats['evictions'] == 1
+    
+    # Results are copies; too large ones and unknown ids are not stored
+    store.get(ids[0])['index'] = 99
+    assert store.get(ids[0])['index'] == 0
+    assert store.put(sized_result(9, 10 * entry)) is None
+    assert store.get(None) is None and store.get('missing') is None
+    assert store.delete(ids[0]) and not store.delete(ids[0])
+    print("✓ Memory store passed\n")
+
+
+def test_sqlite_store():
+    """The SQLite store has the same eviction and survives reopening."""
+    print("=" * 70)
+    print("TEST 2: SQLite store")
+    print("=" * 70)
+    
+    entry = len(_encode(sized_result(0)).encode('utf-8'))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.db')
+        store = SQLiteResultStore(path, max_bytes=3 * entry)
+        ids = [store.put(sized_result(index)) for index in range(3)]
+        store.get(ids[0])
+        ids.append(store.put(sized_result(3)))
+        stats = store.stats()
+        print(f"Stats: {stats}")
+        assert store.get(ids[1]) is None and store.get(ids[0])['index'] == 0
+        assert stats['entries'] == 3 and stats['evictions'] == 1
+        store.close()
+        
+        # Another process (here: another instance) sees the same results
+        reopened = SQLiteResultStore(path, max_bytes=3 * entry)
+        assert reopened.get(ids[3])['index'] == 3
+        assert reopened.delete(ids[3]) and reopened.get(ids[3]) is None
+        reopened.close()
+    print("✓ SQLite store passed\n")
+
+
+def test_app_session():
+    """The web app keeps only the result id in its session cookie."""
+    print("=" * 70)
+    print("TEST 3: Results out of the session cookie")
+    print("=" * 70)
+    
+    from io import BytesIO
+    
+    import app as web
+    
+    client = web.app.test_client()
+    code = 'def add(a, b):\n    return a + b\n' * 50
+    response = client.post('/analyze', data={
+        'file1': (BytesIO(code.encode('utf-8')), 'a.py'),
+        'file2': (BytesIO(code.encode('utf-8')), 'b.py'),
+        'mode': 'hybrid'
+    }, content_type='multipart/form-data')
+    result = response.get_json()
+    assert response.status_code == 200 and result['result_id']
+    
+    cookie = response.headers.get('Set-Cookie', '')
+    print(f"Session cookie: {len(cookie)} bytes")
+    assert len(cookie) < 500
+    with client.session_transaction() as session:
+        assert set(session) == {'last_analysis_id'}
+    
+    report = client.get('/download/report/json')
+    assert report.status_code == 200 and b'result_id' not in report.data
+    assert client.get('/download/report/json?result_id=missing').status_code == 400
+    
+    # Batch results are not kept for the pairwise report generators
+    batch_id = web.result_store.put({'matrix': [[1.0]], 'file_count': 1})
+    assert client.get(f'/download/report/json?result_id={batch_id}').status_code == 400
+    print("✓ App session passed\n")
+
+
+def test_batch_jobs():
+    """Background job results live in the store and expire with the job."""
+    print("=" * 70)
+    print("TEST 4: Batch job results")
+    print("=" * 70)
+    
+    import time
+    from io import BytesIO
+    
+    import app as web
+    
+    client = web.app.test_client()
+    response = client.post('/batch/jobs', data={
+        'file0': (BytesIO(b'def f(x):\n    return x + 1\n'), 'a.py'),
+        'file1': (BytesIO(b'def g(y):\n    return y + 1\n'), 'b.py'),
+        'mode': 'basic'
+    }, content_type='multipart/form-data')
+    job_id = response.get_json()['job_id']
+    
+    for _ in range(500):
+        polled = client.get(f'/batch/jobs/{job_id}').get_json()
+        if polled['status'] != 'running':
+            break
+        time.sleep(0.01)
+    assert polled['status'] == 'done' and polled['result']['file_count'] == 2
+    job = web.batch_jobs[job_id]
+    assert 'result' not in job and web.result_store.get(job['result_id']) is not None
+    
+    # Finished jobs are forgotten after the TTL, with their stored result
+    ttl = web.app.config['BATCH_JOB_TTL']
+    web.app.config['BATCH_JOB_TTL'] = 0
+    try:
+        web.expire_batch_jobs()
+    finally:
+        web.app.config['BATCH_JOB_TTL'] = ttl
+    assert job_id not in web.batch_jobs
+    assert web.result_store.get(job['result_id']) is None
+    assert client.get(f'/batch/jobs/{job_id}').status_code == 404
+    
+    # A result too large for the store fails the job instead of vanishing
+    job = {'token': web.CancellationToken(), 'progress': None, 'result_id': None,
+           'error': None, 'finished': None, 'status': 'running'}
+    files = [{'name': 'a.py', 'content': 'x = 1\n'}, {'name': 'b.py', 'content': 'y = 2\n'}]
+    store = web.result_store
+    web.result_store = MemoryResultStore(max_bytes=10)
+    try:
+        web.run_batch_job(job, files, 'basic')
+    finally:
+        web.result_store = store
+    assert job['status'] == 'failed' and 'too large' in job['error']
+    assert job['result_id'] is None
+    print("✓ Batch jobs passed\n")
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 RESULT STORE TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_memory_store()
+    test_sqlite_store()
+    test_app_session()
+    test_batch_jobs()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
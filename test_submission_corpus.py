@@ -0,0 +1,191 @@
+"""
+Test Suite for the Incremental Submission Corpus
+"""
+
+import tempfile
+
+from batch_comparator import BatchComparator
+from submission_corpus import SubmissionCorpus
+
+
+SAMPLE_FILES = [
+    {'name': 'a.py', 'content': 'def f(x):\n    return x + 1\n'},
+    {'name': 'b.py', 'content': 'def g(y):\n    return y + 1\n'},
+    {'name': 'c.py', 'content': 'class A:\n    def m(self):\n        return 1\n'},
+    {'name': 'd.py', 'content': 'total = 0\nfor v in range(10):\n    total += v\n'},
+]
+
+
+def test_incremental_matches_batch():
+    """Adding documents one by one gives the batch scores and rankings."""
+    print("=" * 70)
+    print("TEST 1: Incremental corpus vs. compare_all_pairs")
+    print("=" * 70)
+    
+    corpus = SubmissionCorpus(threshold=0.9)
+    for f in SAMPLE_FILES:
+        info = corpus.add_document(f['name'], f['content'])
+        print(f"Added {f['name']}: {info['comparisons']} comparisons")
+        assert info['comparisons'] == info['index']
+    
+    full = BatchComparator(mode='hybrid').compare_all_pairs(SAMPLE_FILES)
+    n = len(SAMPLE_FILES)
+    for i in range(n):
+        for j in range(n):
+            assert corpus.similarity(i, j) == full.similarity(i, j)
+    
+    assert [r['file'] for r in corpus.file_rankings()] == [r['file'] for r in full['file_rankings']]
+    assert corpus.clusters()[0]['files'] == ['a.py', 'b.py']
+    print()
+
+
+def test_persistence_round_trip():
+    """A saved corpus reloads and keeps growing on disk."""
+    print("=" * 70)
+    print("TEST 2: Persistence")
+    print("=" * 70)
+    
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = SubmissionCorpus(corpus_dir)
+        for f in SAMPLE_FILES[:3]:
+            corpus.add_document(f['name'], f['content'])
+        
+        reloaded = SubmissionCorpus.open(corpus_dir)
+        assert reloaded.names == corpus.names
+        assert reloaded.rows == corpus.rows
+        
+        late = SAMPLE_FILES[3]
+        reloaded.add_document(late['name'], late['content'])
+        again = SubmissionCorpus.open(corpus_dir)
+        
+        assert len(again) == 4
+        assert again.rows[3] == reloaded.rows[3]
+        assert again.to_batch_result().comparison_count == 6
+        print(f"Reloaded corpus with {len(again)} documents")
+    print()
+
+
+def test_interrupted_add():
+    """An add interrupted before its manifest swap is dropped on the next add."""
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = SubmissionCorpus(corpus_dir, mode='basic')
+        for f in SAMPLE_FILES[:2]:
+            corpus.add_document(f['name'], f['content'])
+        
+        # Crash after appending the data but before writing the manifest
+        original = corpus._write_manifest
+        corpus._write_manifest = lambda: None
+        corpus.add_document('stale.py', SAMPLE_FILES[2]['content'])
+        corpus._write_manifest = original
+        
+        reopened = SubmissionCorpus.open(corpus_dir)
+        assert reopened.names == ['a.py', 'b.py']
+        reopened.add_document('d.py', SAMPLE_FILES[3]['content'])
+        
+        again = SubmissionCorpus.open(corpus_dir)
+        assert again.names == ['a.py', 'b.py', 'd.py']
+        assert again.contents[2] == SAMPLE_FILES[3]['content']
+        assert again.rows == reopened.rows
+
+
+def test_duplicate_submission():
+    """Byte-identical submissions are flagged and scored 1.0 directly."""
+    corpus = SubmissionCorpus(mode='basic')
+    corpus.add_document('a.py', SAMPLE_FILES[0]['content'])
+    info = corpus.add_document('copy.py', SAMPLE_FILES[0]['content'])
+    
+    assert info['duplicate_of'] == 'a.py'
+    assert info['top_matches'][0]['similarity'] == 1.0
+
+
+def test_update_and_remove():
+    """Edits and withdrawals give the same state as a fresh batch run."""
+    corpus = SubmissionCorpus(threshold=0.9)
+    for f in SAMPLE_FILES:
+        corpus.add_document(f['name'], f['content'])
+    
+    edited = 'def h(z):\n    return z + 1\n'
+    info = corpus.update_document('c.py', edited)
+    assert info['comparisons'] == 3
+    assert corpus.update_document('c.py', edited)['comparisons'] == 0
+    corpus.remove_document('a.py')
+    
+    files = [{'name': 'b.py', 'content': SAMPLE_FILES[1]['content']},
+             {'name': 'c.py', 'content': edited},
+             {'name': 'd.py', 'content': SAMPLE_FILES[3]['content']}]
+    full = BatchComparator(mode='hybrid').compare_all_pairs(files)
+    assert corpus.names == ['b.py', 'c.py', 'd.py']
+    for i in range(3):
+        for j in range(3):
+            assert corpus.similarity(i, j) == full.similarity(i, j)
+    expected = [r['file'] for r in full['file_rankings']]
+    assert [r['file'] for r in corpus.file_rankings()] == expected
+    assert corpus.clusters()[0]['files'] == ['b.py', 'c.py']
+    
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        persisted = SubmissionCorpus(corpus_dir)
+        for f in SAMPLE_FILES:
+            persisted.add_document(f['name'], f['content'])
+        persisted.remove_document('b.py')
+        persisted.update_document('d.py', edited)
+        reloaded = SubmissionCorpus.open(corpus_dir)
+        assert reloaded.names == ['a.py', 'c.py', 'd.py']
+        assert reloaded.rows == persisted.rows
+        assert reloaded.contents[2] == edited
+
+
+def test_batched_changes():
+    """Changes inside changes() are rebuilt and saved once, with the same result."""
+    edited = 'def h(z):\n    return z + 1\n'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        single = SubmissionCorpus(tmp_dir + '/single', threshold=0.9)
+        batched = SubmissionCorpus(tmp_dir + '/batched', threshold=0.9)
+        for corpus in (single, batched):
+            for f in SAMPLE_FILES[:3]:
+                corpus.add_document(f['name'], f['content'])
+        
+        single.remove_document('a.py')
+        single.update_document('c.py', edited)
+        single.add_document('d.py', SAMPLE_FILES[3]['content'])
+        
+        saves = []
+        save = batched.save
+        batched.save = lambda: saves.append(save())
+        with batched.changes():
+            batched.remove_document('a.py')
+            batched.update_document('c.py', edited)
+            batched.add_document('d.py', SAMPLE_FILES[3]['content'])
+        assert len(saves) == 1
+        
+        assert batched.rows == single.rows and batched.totals == single.totals
+        assert batched.clusters() == single.clusters()
+        reloaded = SubmissionCorpus.open(tmp_dir + '/batched')
+        assert reloaded.names == single.names and reloaded.rows == single.rows
+        
+        # A new threshold rebuilds the clusters and is persisted
+        reloaded.set_threshold(0.99)
+        assert reloaded.clusters() == []
+        assert SubmissionCorpus.open(tmp_dir + '/batched').threshold == 0.99
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 SUBMISSION CORPUS TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_incremental_matches_batch()
+    test_persistence_round_trip()
+    test_interrupted_add()
+    test_duplicate_submission()
+    test_update_and_remove()
+    test_batched_changes()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
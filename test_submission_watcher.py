@@ -0,0 +1,108 @@
+"""
+Test Suite for the Submission Directory Watcher
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+from submission_corpus import SubmissionCorpus
+from submission_watcher import SubmissionWatcher, main as watcher_main
+
+
+def write(directory, name, content):
+    """Write one submission file."""
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_polling():
+    """Added, changed and removed files are applied incrementally."""
+    print("=" * 70)
+    print("TEST 1: Polling a submissions directory")
+    print("=" * 70)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        submissions = os.path.join(tmp_dir, 'submissions')
+        output = os.path.join(tmp_dir, 'results.json')
+        write(submissions, 'alice/main.py', 'def f(x):\n    return x + 1\n')
+        write(submissions, 'bob/main.py', 'def g(y):\n    return y + 1\n')
+        write(submissions, 'bob/notes.txt', 'not watched')
+        
+        corpus = SubmissionCorpus(os.path.join(tmp_dir, 'corpus'), threshold=0.9)
+        watcher = SubmissionWatcher(submissions, corpus, output=output)
+        
+        changes = watcher.poll()
+        print(f"First poll: {changes}")
+        assert changes['added'] == ['alice/main.py', 'bob/main.py']
+        with open(output, 'r', encoding='utf-8') as f:
+            assert json.load(f)['clusters'][0]['files'] == ['alice/main.py', 'bob/main.py']
+        
+        # Nothing happened: no work
+        assert not any(watcher.poll().values())
+        
+        # Touching a file without changing it is not a change
+        os.utime(os.path.join(submissions, 'alice', 'main.py'), ns=(1, 1))
+        assert not any(watcher.poll().values())
+        
+        write(submissions, 'bob/main.py', 'class B:\n    def run(self):\n        print("bob")\n')
+        write(submissions, 'carol/main.py', 'def f(x):\n    return x + 1\n')
+        os.remove(os.path.join(submissions, 'alice', 'main.py'))
+        changes = watcher.poll()
+        print(f"Second poll: {changes}")
+        assert changes == {'added': ['carol/main.py'], 'changed': ['bob/main.py'],
+                           'removed': ['alice/main.py']}
+        assert corpus.names == ['bob/main.py', 'carol/main.py']
+        assert corpus.clusters() == []
+        
+        with open(output, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        assert results['documents'] == 2
+        assert results['last_changes'] == changes
+        
+        # A restarted watcher on the reopened corpus finds nothing to do
+        reopened = SubmissionWatcher(submissions, SubmissionCorpus.open(corpus.path))
+        assert not any(reopened.poll().values())
+    print()
+
+
+def test_command_line_settings():
+    """An existing corpus rejects a conflicting --mode."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = os.path.join(tmp_dir, 'corpus')
+        corpus = SubmissionCorpus(corpus_dir, mode='basic')
+        corpus.add_document('a.py', 'x = 1\n')
+        
+        argv = sys.argv
+        sys.argv = ['submission_watcher.py', tmp_dir, '--corpus', corpus_dir, '--mode', 'hybrid']
+        try:
+            watcher_main()
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError('a conflicting --mode was accepted')
+        finally:
+            sys.argv = argv
+        assert SubmissionCorpus.open(corpus_dir).mode == 'basic'
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 SUBMISSION WATCHER TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_polling()
+    test_command_line_settings()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Test Suite for Per-Comparison Time Budgets
+"""
+
+import tempfile
+from difflib import SequenceMatcher
+
+from ast_analyzer import HybridSimilarityAnalyzer
+from batch_comparator import BatchComparator
+from chunked_matcher import chunked_ratio
+from code_similarity import CodeSimilarityAnalyzer
+from test_chunked_matcher import edited, generated_source
+from time_budget import BUDGET_METRICS, BudgetMetrics, TimeBudget
+
+
+ORIGINAL = '''
+def find_max(numbers):
+    best = numbers[0]
+    for n in numbers:
+        if n > best:
+            best = n
+    return best
+'''
+
+DISGUISED = '''
+def largest(values):
+    top = values[0]
+    for v in values:
+        if v > top:
+            top = v
+    return top
+'''
+
+
+class CountdownBudget(TimeBudget):
+    """Budget that runs out after a number of checks instead of seconds."""
+    
+    def __init__(self, checks: int):
+        super().__init__(3600, metrics=None)
+        self.checks = checks
+    
+    @property
+    def expired(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+def test_budget_and_metrics():
+    """Budgets record degradations; metrics count overruns."""
+    print("=" * 70)
+    print("TEST 1: Budgets and metrics")
+    print("=" * 70)
+    
+    metrics = BudgetMetrics()
+    relaxed = TimeBudget(60, metrics)
+    assert not relaxed.expired and relaxed.remaining() > 59
+    relaxed.finish()
+    
+    spent = TimeBudget(0, metrics)
+    assert spent.expired
+    spent.degrade('sequence_similarity', 'quick_ratio upper bound')
+    result = spent.annotate({})
+    assert result == {'approximate': True,
+                      'approximate_reasons': ['sequence_similarity: quick_ratio upper bound']}
+    spent.finish()
+    spent.finish()
+    
+    snapshot = metrics.snapshot()
+    print(f"Metrics: {snapshot}")
+    assert snapshot['budgeted_comparisons'] == 2 and snapshot['budget_overruns'] == 1
+    assert snapshot['degraded_stages'] == {'sequence_similarity': 1}
+    print("✓ Budgets and metrics passed\n")
+
+
+def test_analyzers():
+    """A spent budget gives marked, bounded results; a generous one changes nothing."""
+    print("=" * 70)
+    print("TEST 2: Analyzers under a budget")
+    print("=" * 70)
+    
+    before = BUDGET_METRICS.snapshot()['budget_overruns']
+    hybrid = HybridSimilarityAnalyzer()
+    exact = hybrid.analyze(ORIGINAL, DISGUISED)
+    degraded = hybrid.analyze(ORIGINAL, DISGUISED, time_budget=0)
+    relaxed = hybrid.analyze(ORIGINAL, DISGUISED, time_budget=60)
+    print(f"Exact {exact['weighted_score']:.3f}, degraded {degraded['weighted_score']:.3f}")
+    print(f"Reasons: {degraded['approximate_reasons']}")
+    
+    assert not exact['approximate'] and not relaxed['approximate']
+    assert relaxed['weighted_score'] == exact['weighted_score']
+    assert degraded['approximate'] and len(degraded['approximate_reasons']) == 2
+    # quick_ratio is an upper bound; the subtree score replaces structure matching
+    assert degraded['sequence_similarity'] >= exact['sequence_similarity']
+    assert degraded['structure_similarity'] == exact['subtree_similarity']
+    
+    tree_edit = HybridSimilarityAnalyzer(structure_metric='tree_edit').analyze(
+        ORIGINAL, DISGUISED, time_budget=0)
+    assert any('tree edit' in reason for reason in tree_edit['approximate_reasons'])
+    
+    basic = CodeSimilarityAnalyzer()
+    full = basic.analyze(ORIGINAL, DISGUISED)
+    bounded = basic.analyze(ORIGINAL, DISGUISED, time_budget=0)
+    assert 'approximate' not in full
+    assert bounded['approximate'] and bounded['similarity_score'] >= full['similarity_score']
+    assert basic.analyze(ORIGINAL, DISGUISED, mode='hybrid', language='python',
+                         time_budget=0)['approximate']
+    
+    assert BUDGET_METRICS.snapshot()['budget_overruns'] >= before + 4
+    print("✓ Analyzers passed\n")
+
+
+def test_chunk_gaps_and_batches():
+    """Chunk gaps after the deadline are bounded; batches count approximate pairs."""
+    print("=" * 70)
+    print("TEST 3: Large inputs and batches")
+    print("=" * 70)
+    
+    original = generated_source(600, 6)
+    copy = edited(original, 20, 7)
+    exact = chunked_ratio(original, copy)
+    budget = CountdownBudget(checks=3)
+    bounded = chunked_ratio(original, copy, budget)
+    quick = SequenceMatcher(None, original, copy).quick_ratio()
+    print(f"Chunked {exact:.4f}, after deadline {bounded:.4f}, quick_ratio {quick:.4f}")
+    assert exact <= bounded <= quick
+    assert budget.reasons == ['sequence_similarity: unmatched chunks bounded by shared characters']
+    
+    files = [{'name': f'f{i}.py', 'content': code}
+             for i, code in enumerate([ORIGINAL, DISGUISED, ORIGINAL + '\nprint(1)\n'])]
+    events = []
+    result = BatchComparator(pair_budget=0).compare_all_pairs(files, progress=events.append)
+    assert result['statistics']['approximate_pairs'] == result.comparison_count == 3
+    assert events[-1]['pairs_approximate'] == 3
+    
+    unlimited = BatchComparator().compare_all_pairs(files)
+    assert unlimited['statistics']['approximate_pairs'] == 0
+    
+    # Shards keep their approximate counts through the merge
+    with tempfile.TemporaryDirectory() as shared_dir:
+        budgeted = BatchComparator(pair_budget=0)
+        for shard_index in range(2):
+            budgeted.compare_shard(files, shard_index, 2, shared_dir)
+        merged = budgeted.merge_shards(files, shared_dir, 2)
+    assert merged['statistics']['approximate_pairs'] == 3
+    print("✓ Large inputs and batches passed\n")
+
+
+def test_analyze_route_single_budget():
+    """The web app derives its plagiarism verdict from one budgeted analysis."""
+    print("=" * 70)
+    print("TEST 4: One analysis per /analyze request")
+    print("=" * 70)
+    
+    from io import BytesIO
+    
+    from app import app
+    
+    calls = []
+    analyze = HybridSimilarityAnalyzer.analyze
+    
+    def counted(self, *args, **kwargs):
+        calls.append(args)
+        return analyze(self, *args, **kwargs)
+    
+    HybridSimilarityAnalyzer.analyze = counted
+    try:
+        response = app.test_client().post('/analyze', data={
+            'file1': (BytesIO(ORIGINAL.encode('utf-8')), 'a.py'),
+            'file2': (BytesIO(DISGUISED.encode('utf-8')), 'b.py'),
+            'mode': 'hybrid'
+        }, content_type='multipart/form-data')
+    finally:
+        HybridSimilarityAnalyzer.analyze = analyze
+    
+    result = response.get_json()
+    expected = HybridSimilarityAnalyzer().detect_plagiarism(ORIGINAL, DISGUISED)
+    assert len(calls) == 1
+    assert result['plagiarism']['plagiarism_type'] == expected['plagiarism_type']
+    assert result['plagiarism']['confidence'] == expected['confidence']
+    print("✓ Analyze route passed\n")
+
+
+def main():
+    """Run all tests."""
+    print("\n")
+    print("🔍 TIME BUDGET TEST SUITE")
+    print("=" * 70)
+    print()
+    
+    test_budget_and_metrics()
+    test_analyzers()
+    test_chunk_gaps_and_batches()
+    test_analyze_route_single_budget()
+    
+    print("=" * 70)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Time Budget Module
+==================
+Per-comparison deadlines with graceful degradation.
+
+A comparison given a TimeBudget checks it between its stages (text
+sequence, structure) and between the chunk gaps of a large-input
+comparison (see chunked_matcher). Once the budget is spent, the remaining
+stages use cheaper engines or bounds instead of running to completion:
+SequenceMatcher.quick_ratio() (an upper bound) instead of the full ratio,
+character-count bounds for unmatched chunk gaps, and the subtree multiset
+score instead of structure matching for Python. Every substitution is
+recorded as a reason and the result is marked approximate.
+
+Stages are not interrupted, so a comparison can overrun its budget by at
+most one stage; large inputs are chunked, which keeps single stages short.
+Budget use of all comparisons in the process is counted in BUDGET_METRICS.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class BudgetMetrics:
+    """
+    Thread-safe process-wide counters of budgeted comparisons.
+    
+    A comparison overruns when it degrades a stage or finishes after its
+    deadline; overrun_seconds sums the time spent past deadlines.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zero all counters."""
+        with self._lock:
+            self.comparisons = 0
+            self.overruns = 0
+            self.overrun_seconds = 0.0
+            self.degraded_stages: Dict[str, int] = {}
+    
+    def record(self, budget: 'TimeBudget') -> None:
+        """Count one finished comparison."""
+        with self._lock:
+            self.comparisons += 1
+            overrun = -budget.remaining()
+            if budget.reasons or overrun > 0:
+                self.overruns += 1
+            self.overrun_seconds += max(0.0, overrun)
+            for stage in budget.stages:
+                self.degraded_stages[stage] = self.degraded_stages.get(stage, 0) + 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters as a dictionary."""
+        with self._lock:
+            return {
+                'budgeted_comparisons': self.comparisons,
+                'budget_overruns': self.overruns,
+                'overrun_seconds': self.overrun_seconds,
+                'degraded_stages': dict(self.degraded_stages)
+            }
+
+
+# Counters of every budgeted comparison in this process
+BUDGET_METRICS = BudgetMetrics()
+
+
+class TimeBudget:
+    """
+    Deadline of one comparison and the degradations it caused.
+    """
+    
+    def __init__(self, seconds: float, metrics: Optional[BudgetMetrics] = BUDGET_METRICS):
+        """
+        Args:
+            seconds: Wall-clock time allowed for the comparison
+            metrics: Counters updated by finish() (None: not counted)
+        """
+        self.seconds = seconds
+        self.metrics = metrics
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        # Stage names and human-readable reasons of every degradation
+        self.stages: List[str] = []
+        self.reasons: List[str] = []
+        self._finished = False
+    
+    def remaining(self) -> float:
+        """Seconds left (negative once the budget is overrun)."""
+        return self.deadline - time.monotonic()
+    
+    @property
+    def expired(self) -> bool:
+        """Whether the budget is spent."""
+        return time.monotonic() >= self.deadline
+    
+    @property
+    def approximate(self) -> bool:
+        """Whether any stage was degraded."""
+        return bool(self.reasons)
+    
+    def degrade(self, stage: str, reason: str) -> None:
+        """
+        Record that a stage used a cheaper engine or bound.
+        
+        Args:
+            stage: Result key of the stage (e.g. 'sequence_similarity')
+            reason: What was used instead
+        """
+        if stage not in self.stages:
+            self.stages.append(stage)
+        self.reasons.append(f"{stage}: {reason}")
+    
+    def annotate(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Set a result's 'approximate' and 'approximate_reasons' keys."""
+        result['approximate'] = self.approximate
+        result['approximate_reasons'] = list(self.reasons)
+        return result
+    
+    def finish(self) -> None:
+        """Count the comparison in the metrics (once)."""
+        if not self._finished and self.metrics is not None:
+            self.metrics.record(self)
+        self._finished = True
+
+
+def make_budget(seconds: Optional[float]) -> Optional[TimeBudget]:
+    """TimeBudget for a number of seconds, or None for no budget."""
+    return TimeBudget(seconds) if seconds is not None else None
@@ -0,0 +1,264 @@
+"""
+Tree Edit Distance Module
+=========================
+Bounded Zhang-Shasha tree edit distance between normalized Python ASTs,
+used as a high-precision structure score for close calls (see
+HybridSimilarityAnalyzer's ``structure_metric='tree_edit'``).
+
+Trees are compared per function: every outermost function or method is one
+unit, and the remaining module code (with those functions collapsed to a
+leaf) is another. Functions are paired greedily by a cheap label-histogram
+lower bound; unpaired functions cost their full size. Node labels keep the
+node type, operators, attribute names and constant types, but not
+identifiers or constant values, matching ASTNormalizer.
+
+Costs stay predictable:
+
+- a unit larger than ``max_nodes`` is not compared at all (the caller falls
+  back to another score);
+- the distance budget implied by the threshold is checked before every
+  unit pair, using the histogram lower bound (max(n1, n2) minus shared
+  labels) before running the exact algorithm, so hopeless pairs stop early.
+"""
+
+import ast
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Largest unit (in tree nodes) the exact algorithm is run on
+DEFAULT_MAX_NODES = 1500
+
+# Nodes folded into their parent's label instead of becoming children
+FOLDED_NODES = (ast.expr_context, ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+
+# Fields holding identifiers, which renaming changes
+IDENTIFIER_FIELDS = frozenset({'id', 'name', 'arg', 'asname', 'type_comment'})
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class EditTree:
+    """
+    A tree in the postorder form Zhang-Shasha works on.
+    """
+    
+    def __init__(self):
+        self.labels: List[str] = []
+        # Postorder index of the leftmost leaf below each node
+        self.leftmost: List[int] = []
+        self.histogram: Counter = Counter()
+    
+    def __len__(self) -> int:
+        return len(self.labels)
+    
+    def add(self, label: str, leftmost: Optional[int]) -> int:
+        """Append a node after its children; returns its postorder index."""
+        index = len(self.labels)
+        self.labels.append(label)
+        self.leftmost.append(index if leftmost is None else leftmost)
+        self.histogram[label] += 1
+        return index
+    
+    def keyroots(self) -> List[int]:
+        """Highest node for every distinct leftmost leaf, ascending."""
+        highest = {}
+        for index, leftmost in enumerate(self.leftmost):
+            highest[leftmost] = index
+        return sorted(highest.values())
+
+
+def node_label(node: ast.AST) -> str:
+    """Normalized label of an AST node (folded operators included)."""
+    parts = [type(node).__name__]
+    for field, value in ast.iter_fields(node):
+        if isinstance(value, FOLDED_NODES):
+            parts.append(type(value).__name__)
+        elif isinstance(value, list):
+            parts.extend(type(item).__name__ for item in value if isinstance(item, FOLDED_NODES))
+        elif isinstance(value, ast.AST) or value is None or field in IDENTIFIER_FIELDS:
+            continue
+        elif isinstance(node, ast.Constant) and field == 'value':
+            parts.append(type(value).__name__)
+        elif field != 'kind':
+            parts.append(f'{field}={value!r}')
+    return ':'.join(parts)
+
+
+def _children(node: ast.AST) -> List[ast.AST]:
+    """Child nodes that become tree children, in field order."""
+    return [child for child in ast.iter_child_nodes(node) if not isinstance(child, FOLDED_NODES)]
+
+
+class EditUnits:
+    """
+    Per-function trees of one document plus the rest of the module.
+    """
+    
+    def __init__(self, tree: ast.Module):
+        self.functions: List[EditTree] = []
+        self.rest = EditTree()
+        self._build(tree, self.rest)
+    
+    @property
+    def node_count(self) -> int:
+        """Total nodes over all units."""
+        return len(self.rest) + sum(len(unit) for unit in self.functions)
+    
+    def _build(self, node: ast.AST, target: EditTree) -> int:
+        """Add a subtree to ``target`` in postorder; outermost functions become units."""
+        if isinstance(node, FUNCTION_NODES):
+            unit = EditTree()
+            self._build_plain(node, unit)
+            self.functions.append(unit)
+            return target.add('Function', None)
+        
+        leftmost = None
+        for child in _children(node):
+            index = self._build(child, target)
+            if leftmost is None:
+                leftmost = target.leftmost[index]
+        return target.add(node_label(node), leftmost)
+    
+    def _build_plain(self, node: ast.AST, target: EditTree) -> int:
+        """Add a subtree to ``target`` in postorder without splitting it."""
+        leftmost = None
+        for child in _children(node):
+            index = self._build_plain(child, target)
+            if leftmost is None:
+                leftmost = target.leftmost[index]
+        return target.add(node_label(node), leftmost)
+
+
+def lower_bound(tree1: EditTree, tree2: EditTree) -> int:
+    """Histogram lower bound of the unit-cost edit distance."""
+    shared = sum((tree1.histogram & tree2.histogram).values())
+    return max(len(tree1), len(tree2)) - shared
+
+
+def zhang_shasha(tree1: EditTree, tree2: EditTree) -> int:
+    """
+    Unit-cost tree edit distance (insert, delete, relabel).
+    
+    O(n1 * n2 * min(depth, leaves)^2) time and O(n1 * n2) memory; callers
+    cap the tree sizes.
+    """
+    labels1, labels2 = tree1.labels, tree2.labels
+    leftmost1, leftmost2 = tree1.leftmost, tree2.leftmost
+    if not labels1 or not labels2:
+        return len(labels1) + len(labels2)
+    
+    treedist = [[0] * len(labels2) for _ in labels1]
+    for i in tree1.keyroots():
+        li = leftmost1[i]
+        for j in tree2.keyroots():
+            lj = leftmost2[j]
+            rows, cols = i - li + 2, j - lj + 2
+            forest = [[0] * cols for _ in range(rows)]
+            for x in range(1, rows):
+                forest[x][0] = x
+            for y in range(1, cols):
+                forest[0][y] = y
+            for x in range(1, rows):
+                i1 = li + x - 1
+                subtree1 = leftmost1[i1] == li
+                row, previous = forest[x], forest[x - 1]
+                for y in range(1, cols):
+                    j1 = lj + y - 1
+                    if subtree1 and leftmost2[j1] == lj:
+                        cost = previous[y - 1] + (labels1[i1] != labels2[j1])
+                        value = min(previous[y] + 1, row[y - 1] + 1, cost)
+                        row[y] = value
+                        treedist[i1][j1] = value
+                    else:
+                        p = leftmost1[i1] - li
+                        q = leftmost2[j1] - lj
+                        row[y] = min(previous[y] + 1, row[y - 1] + 1,
+                                     forest[p][q] + treedist[i1][j1])
+    return treedist[-1][-1]
+
+
+def _pair_functions(functions1: List[EditTree],
+                    functions2: List[EditTree]) -> Tuple[List[Tuple[int, EditTree, EditTree]], int]:
+    """
+    Greedy one-to-one pairing of functions by ascending lower bound.
+    
+    Returns:
+        ([(lower bound, function1, function2)], cost of unpaired functions)
+    """
+    candidates = sorted((lower_bound(a, b), i, j)
+                        for i, a in enumerate(functions1) for j, b in enumerate(functions2))
+    used1, used2 = set(), set()
+    pairs = []
+    for bound, i, j in candidates:
+        if i in used1 or j in used2:
+            continue
+        used1.add(i)
+        used2.add(j)
+        pairs.append((bound, functions1[i], functions2[j]))
+    unpaired = (sum(len(f) for i, f in enumerate(functions1) if i not in used1) +
+                sum(len(f) for j, f in enumerate(functions2) if j not in used2))
+    return pairs, unpaired
+
+
+def bounded_distance(units1: EditUnits, units2: EditUnits, bound: Optional[int] = None,
+                     max_nodes: int = DEFAULT_MAX_NODES) -> Dict[str, Any]:
+    """
+    Per-function tree edit distance with early termination.
+    
+    Args:
+        units1: Units of the first document
+        units2: Units of the second document
+        bound: Stop as soon as the distance is known to exceed this
+            (None: no bound)
+        max_nodes: Largest unit the exact algorithm is run on
+    
+    Returns:
+        Dictionary with 'status' ('exact', 'exceeded' or 'too_large'),
+        'distance' (exact distance, or the lower bound that exceeded the
+        budget; None if too large), 'nodes' (max of the two node counts)
+        and 'pairs_compared'
+    """
+    nodes = max(units1.node_count, units2.node_count)
+    pairs, distance = _pair_functions(units1.functions, units2.functions)
+    pairs.append((lower_bound(units1.rest, units2.rest), units1.rest, units2.rest))
+    result = {'status': 'exact', 'distance': None, 'nodes': nodes, 'pairs_compared': 0}
+    
+    if any(len(a) > max_nodes or len(b) > max_nodes for _, a, b in pairs):
+        result['status'] = 'too_large'
+        return result
+    
+    # Cheapest pairs first; the sum of the pending lower bounds is checked
+    # against the budget before every exact computation
+    pairs.sort(key=lambda pair: pair[0])
+    pending = sum(pair[0] for pair in pairs)
+    for pair_bound, tree1, tree2 in pairs:
+        if bound is not None and distance + pending > bound:
+            result['status'] = 'exceeded'
+            result['distance'] = distance + pending
+            return result
+        pending -= pair_bound
+        identical = (not pair_bound and tree1.labels == tree2.labels and
+                     tree1.leftmost == tree2.leftmost)
+        distance += 0 if identical else zhang_shasha(tree1, tree2)
+        result['pairs_compared'] += 1
+    
+    if bound is not None and distance > bound:
+        result['status'] = 'exceeded'
+    result['distance'] = distance
+    return result
+
+
+def edit_units(doc) -> Optional[EditUnits]:
+    """
+    Edit trees of a PreparedDocument, built on first use and kept on it.
+    
+    Returns:
+        EditUnits, or None if the code does not parse
+    """
+    if doc.edit_units is None:
+        try:
+            doc.edit_units = EditUnits(ast.parse(doc.code))
+        except (SyntaxError, ValueError):
+            doc.edit_units = False
+    return doc.edit_units or None